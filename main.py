@@ -50,18 +50,11 @@ def run_worker(args):
         config = json.loads(args[0])
         
         from src.core.splitter import separate_audio
-        separate_audio(
-            config['input_file'],
-            config['output_dir'],
-            config['stem_count'],
-            config['quality'],
-            config['export_zip'],
-            config['keep_original'],
-            export_mp3=config.get('export_mp3', False),
-            mode=config.get('mode', 'standard'),
-            dereverb=config.get('dereverb', False),
-            invert=config.get('invert', False)
-        )
+        positional = ('input_file', 'output_dir', 'stem_count', 'quality', 'export_zip', 'keep_original')
+        # Every other option (format, pattern, enhancements, analysis...) goes through as kwargs
+        options = {k: v for k, v in config.items() if k not in positional}
+        options.setdefault('mode', 'standard')
+        separate_audio(*(config[k] for k in positional), **options)
     except Exception as e:
         print(f"WORKER ERROR: {e}", file=sys.stderr)
         sys.exit(1)
@@ -73,6 +66,11 @@ def main():
         run_worker(sys.argv[idx+1:])
         return
 
+    if "--watch" in sys.argv or "--queue" in sys.argv:
+        # Headless modes (no GUI): hot folders, shared queue
+        from src.core.headless import main as run_headless
+        sys.exit(run_headless(sys.argv[1:]))
+
     app = QApplication(sys.argv)
     app.setApplicationName("BeatDeStack")
     
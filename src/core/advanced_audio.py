@@ -1,25 +1,33 @@
 import os
 import shutil
 import logging
-import time
-import torch
-import torchaudio
 import soundfile as sf
 import numpy as np
 from audio_separator.separator import Separator
 from src.utils.logger import logger
 import src.core.dsp as dsp
 from src.core import constants
+from src.core.resampler import ResampledBlockReader
+from src.core.workspace import JobWorkspace
 
 class AdvancedAudioProcessor:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, workspace=None):
         self.output_dir = output_dir
+        # Model outputs and intermediates go to the job's scratch workspace, never the output folder
+        self._owns_workspace = workspace is None
+        self.workspace = workspace or JobWorkspace(output_dir, "advanced")
+        self.scratch_dir = self.workspace.subdir("advanced")
         self.separator = Separator(
             log_level=logging.INFO,
-            output_dir=output_dir,
+            output_dir=self.scratch_dir,
             output_format="wav"
         )
 
+    def cleanup(self):
+        """Remove intermediates if this processor created its own workspace."""
+        if self._owns_workspace:
+            self.workspace.cleanup()
+
     def run_mdx(self, input_file, model_name):
         """
         Runs a specific MDX model using audio-separator.
@@ -37,33 +45,39 @@ class AdvancedAudioProcessor:
         # We need to identify which is which.
         # Usually audio-separator names them like "{filename}_(Vocals)_{model}.wav"
         
-        return [os.path.join(self.output_dir, f) for f in output_files]
+        return self.workspace.track([os.path.join(self.scratch_dir, f) for f in output_files])
+
+    def _stream_combine(self, primary_file, secondary_file, output_path, combine, block_size=65536):
+        """
+        Reads both files in aligned blocks (secondary resampled on the fly to the
+        primary rate), combines each pair and appends it to output_path.
+        Output length is the shorter of the two, as before.
+        """
+        primary_sr = sf.info(primary_file).samplerate
+        primary = ResampledBlockReader(primary_file, primary_sr, block_size)
+        secondary = ResampledBlockReader(secondary_file, primary_sr, block_size)
+        channels = max(primary.channels, secondary.channels)
+        
+        try:
+            with sf.SoundFile(output_path, 'w', samplerate=primary_sr, channels=channels) as out:
+                while True:
+                    a = primary.read(block_size)
+                    b = secondary.read(len(a))
+                    n = min(len(a), len(b))
+                    if n == 0:
+                        break
+                    out.write(combine(a[:n], b[:n]))
+        finally:
+            primary.close()
+            secondary.close()
+        return output_path
 
     def ensemble_blend(self, file1, file2, output_path):
         """
         Blends two audio files by averaging them.
         """
         logger.info(f"Blending {os.path.basename(file1)} and {os.path.basename(file2)}")
-        
-        data1, sr1 = sf.read(file1)
-        data2, sr2 = sf.read(file2)
-        
-        # Resample if sample rates differ
-        if sr1 != sr2:
-            import librosa
-            logger.info(f"Resampling {os.path.basename(file2)} from {sr2}Hz to {sr1}Hz")
-            data2 = librosa.resample(data2.T, orig_sr=sr2, target_sr=sr1).T
-        
-        # Ensure same length
-        min_len = min(len(data1), len(data2))
-        data1 = data1[:min_len]
-        data2 = data2[:min_len]
-        
-        # Average
-        blended = (data1 + data2) / 2
-        
-        sf.write(output_path, blended, sr1)
-        return output_path
+        return self._stream_combine(file1, file2, output_path, lambda a, b: (a + b) / 2)
 
     def invert_audio(self, original_file, stem_file, output_path):
         """
@@ -71,27 +85,7 @@ class AdvancedAudioProcessor:
         Instrumental = Original - Stem
         """
         logger.info("Performing Audio Inversion...")
-        
-        orig, sr_orig = sf.read(original_file)
-        stem, sr_stem = sf.read(stem_file)
-        
-        # Resample stem if sample rates don't match
-        if sr_orig != sr_stem:
-            logger.info(f"Resampling stem from {sr_stem}Hz to {sr_orig}Hz for inversion...")
-            stem_tensor = torch.tensor(stem.T if len(stem.shape) > 1 else stem).float().unsqueeze(0)
-            resampler = torchaudio.transforms.Resample(sr_stem, sr_orig)
-            stem_resampled = resampler(stem_tensor)
-            stem = stem_resampled.squeeze(0).numpy().T if len(stem.shape) > 1 else stem_resampled.squeeze().numpy()
-            
-        min_len = min(len(orig), len(stem))
-        orig = orig[:min_len]
-        stem = stem[:min_len]
-        
-        # Invert
-        inverted = orig - stem
-        
-        sf.write(output_path, inverted, sr_orig)
-        return output_path
+        return self._stream_combine(original_file, stem_file, output_path, lambda orig, stem: orig - stem)
 
     def process_vocals_ultra_clean(self, input_file, demucs_vocals):
         """
@@ -119,7 +113,7 @@ class AdvancedAudioProcessor:
                         break
                 
                 if mdx_vocals:
-                    ensemble_vocals = os.path.join(self.output_dir, "vocals_ensemble.wav")
+                    ensemble_vocals = self.workspace.path(os.path.join("advanced", "vocals_ensemble.wav"))
                     # Blend 50/50
                     self.ensemble_blend(demucs_vocals, mdx_vocals, ensemble_vocals)
                     current_vocals = ensemble_vocals
@@ -166,30 +160,6 @@ class AdvancedAudioProcessor:
             except Exception as e:
                  logger.warning(f"Ultra Clean De-Reverb failed: {e}")
                  
-        # AGGRESSIVE CLEANUP
-        # Scan for temp files and model outputs to delete.
-        cleanup_patterns = constants.CLEANUP_PATTERNS
-        
-        for f in os.listdir(self.output_dir):
-            full_path = os.path.join(self.output_dir, f)
-            
-            # Skip the current desired result
-            if os.path.normpath(full_path) == os.path.normpath(current_vocals):
-                continue
-                
-            # Check pattern
-            if any(p in f for p in cleanup_patterns):
-                for attempt in range(3):
-                    try:
-                        if os.path.exists(full_path):
-                            os.remove(full_path)
-                            logger.info(f"Ultra Clean: Cleaned up temp file {f}")
-                        break
-                    except PermissionError:
-                        time.sleep(0.5)
-                    except Exception:
-                        break
-
         return current_vocals
 
 
@@ -197,10 +167,12 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                              denoise_intensity=0, clarity_intensity=0, ensemble_intensity=0,
                              bass_boost=0, stereo_width=100,
                              low_cut=False, eq_low=0, eq_mid=0, eq_high=0,
-                             compressor_intensity=0, exciter_intensity=0):
+                             compressor_intensity=0, exciter_intensity=0, workspace=None):
     """
     Apply audio enhancements to vocals file.
     ...
+    Model outputs and intermediates are written to `workspace` (a JobWorkspace);
+    a private one is created and removed when none is given.
     Returns path to enhanced file.
     """
     any_effect = (dereverb_intensity > 0 or deecho_intensity > 0 or denoise_intensity > 0 or
@@ -210,6 +182,11 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
     if not any_effect:
         return None
     
+    owns_workspace = workspace is None
+    if owns_workspace:
+        workspace = JobWorkspace(output_dir, "enhance")
+    scratch_dir = workspace.subdir("enhance")
+    
     try:
         import traceback
         
@@ -218,7 +195,7 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
         try:
             separator = Separator(
                 log_level=logging.INFO,
-                output_dir=output_dir,
+                output_dir=scratch_dir,
                 output_format="wav"
             )
         except Exception as sep_err:
@@ -226,10 +203,9 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
             logger.debug(traceback.format_exc())
             # Continue without AI models - DSP fallbacks will be used
         
-        # Read vocals for blending
-        original_data, sr = sf.read(vocals_file)
+        # Read vocals for blending (float32, owned buffer - effects may modify it in place)
+        current_data, sr = sf.read(vocals_file, dtype='float32')
         current_file = vocals_file
-        current_data = original_data.copy()
         
         # Apply De-Reverb if requested
         if dereverb_intensity > 0:
@@ -248,7 +224,7 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                     # Find the processed output (usually the "no reverb" stem)
                     dereverbed_file = None
                     for f in outputs:
-                        full_path = os.path.join(output_dir, f) if not os.path.isabs(f) else f
+                        full_path = os.path.join(scratch_dir, f) if not os.path.isabs(f) else f
                         lower_f = f.lower()
                         
                         # Check for various naming patterns
@@ -266,13 +242,13 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                     # If still nothing found, use first output
                     if not dereverbed_file and outputs:
                         first_output = outputs[0]
-                        full_path = os.path.join(output_dir, first_output) if not os.path.isabs(first_output) else first_output
+                        full_path = os.path.join(scratch_dir, first_output) if not os.path.isabs(first_output) else first_output
                         if os.path.exists(full_path):
                             dereverbed_file = full_path
                             logger.info(f"Using first output as de-reverb result: {first_output}")
                     
                     if dereverbed_file and os.path.exists(dereverbed_file):
-                        dereverbed_data, _ = sf.read(dereverbed_file)
+                        dereverbed_data, _ = sf.read(dereverbed_file, dtype='float32')
                         # Blend based on intensity
                         blend = dereverb_intensity / 100.0
                         min_len = min(len(current_data), len(dereverbed_data))
@@ -315,7 +291,7 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                 try:
                     # Save intermediate if we processed dereverb
                     if dereverb_intensity > 0:
-                        temp_file = os.path.join(output_dir, "_temp_dereverbed.wav")
+                        temp_file = workspace.path(os.path.join("enhance", "_temp_dereverbed.wav"))
                         sf.write(temp_file, current_data, sr)
                         current_file = temp_file
                     
@@ -325,13 +301,13 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                     
                     deechoed_file = None
                     for f in outputs:
-                        full_path = os.path.join(output_dir, f) if not os.path.isabs(f) else f
+                        full_path = os.path.join(scratch_dir, f) if not os.path.isabs(f) else f
                         if os.path.exists(full_path):
                             deechoed_file = full_path
                             break
                     
                     if deechoed_file and os.path.exists(deechoed_file):
-                        deechoed_data, _ = sf.read(deechoed_file)
+                        deechoed_data, _ = sf.read(deechoed_file, dtype='float32')
                         blend = deecho_intensity / 100.0
                         min_len = min(len(current_data), len(deechoed_data))
                         current_data = current_data[:min_len] * (1 - blend) + deechoed_data[:min_len] * blend
@@ -368,7 +344,7 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                 try:
                     # Save intermediate if we processed earlier
                     if dereverb_intensity > 0 or deecho_intensity > 0:
-                        temp_file = os.path.join(output_dir, "_temp_intermediate.wav")
+                        temp_file = workspace.path(os.path.join("enhance", "_temp_intermediate.wav"))
                         sf.write(temp_file, current_data, sr)
                         current_file = temp_file
                     
@@ -378,13 +354,13 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                     
                     denoised_file = None
                     for f in outputs:
-                        full_path = os.path.join(output_dir, f) if not os.path.isabs(f) else f
+                        full_path = os.path.join(scratch_dir, f) if not os.path.isabs(f) else f
                         if os.path.exists(full_path):
                             denoised_file = full_path
                             break
                     
                     if denoised_file and os.path.exists(denoised_file):
-                        denoised_data, _ = sf.read(denoised_file)
+                        denoised_data, _ = sf.read(denoised_file, dtype='float32')
                         blend = denoise_intensity / 100.0
                         min_len = min(len(current_data), len(denoised_data))
                         current_data = current_data[:min_len] * (1 - blend) + denoised_data[:min_len] * blend
@@ -414,7 +390,7 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
             if separator:
                 try:
                     # Save intermediate
-                    temp_file = os.path.join(output_dir, "_temp_clarity_input.wav")
+                    temp_file = workspace.path(os.path.join("enhance", "_temp_clarity_input.wav"))
                     sf.write(temp_file, current_data, sr)
                     
                     # Use Kim_Vocal_2 model for vocal enhancement
@@ -423,13 +399,13 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                     
                     clarity_file = None
                     for f in outputs:
-                        full_path = os.path.join(output_dir, f) if not os.path.isabs(f) else f
+                        full_path = os.path.join(scratch_dir, f) if not os.path.isabs(f) else f
                         if os.path.exists(full_path) and ("Vocals" in f or "Kim_Vocal" in f):
                             clarity_file = full_path
                             break
                     
                     if clarity_file and os.path.exists(clarity_file):
-                        clarity_data, _ = sf.read(clarity_file)
+                        clarity_data, _ = sf.read(clarity_file, dtype='float32')
                         blend = clarity_intensity / 100.0
                         min_len = min(len(current_data), len(clarity_data))
                         current_data = current_data[:min_len] * (1 - blend) + clarity_data[:min_len] * blend
@@ -463,13 +439,13 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
                 
                 mdx_vocals = None
                 for f in outputs:
-                    full_path = os.path.join(output_dir, f) if not os.path.isabs(f) else f
+                    full_path = os.path.join(scratch_dir, f) if not os.path.isabs(f) else f
                     if os.path.exists(full_path) and "Vocal" in f:
                         mdx_vocals = full_path
                         break
                 
                 if mdx_vocals and os.path.exists(mdx_vocals):
-                    mdx_data, _ = sf.read(mdx_vocals)
+                    mdx_data, _ = sf.read(mdx_vocals, dtype='float32')
                     blend = ensemble_intensity / 100.0
                     min_len = min(len(current_data), len(mdx_data))
                     # Ensemble by averaging with MDX result
@@ -547,37 +523,11 @@ def apply_audio_enhancement(vocals_file, output_dir, input_file=None, dereverb_i
         output_file = os.path.join(output_dir, "vocals_enhanced.wav")
         sf.write(output_file, current_data, sr)
         
-        # AGGRESSIVE CLEANUP
-        # We scan for any leftovers similar to our known patterns. 
-        # We also added retry logic for file locks.
-        import time
-        
-        cleanup_patterns = constants.CLEANUP_PATTERNS
-        
-        for f in os.listdir(output_dir):
-            full_path = os.path.join(output_dir, f)
-            
-            # Skip the output file we just wrote
-            if os.path.normpath(full_path) == os.path.normpath(output_file):
-                continue
-                
-            # Check pattern
-            if any(p in f for p in cleanup_patterns):
-                for attempt in range(3): # Retry 3 times
-                    try:
-                        if os.path.exists(full_path):
-                            os.remove(full_path)
-                            logger.info(f"Cleaned up temp file: {f}")
-                        break
-                    except PermissionError:
-                        logger.warning(f"File lock on {f}, retrying cleanup in 0.5s...")
-                        time.sleep(0.5)
-                    except Exception as e:
-                        logger.warning(f"Cleanup error for {f}: {e}")
-                        break
-
         return output_file
         
     except Exception as e:
         logger.error(f"Audio enhancement error: {e}")
         return None
+    finally:
+        if owns_workspace:
+            workspace.cleanup()
@@ -1,8 +1,17 @@
 """
 Audio Analysis Module - BPM and Key Detection
 Uses librosa for tempo estimation and key detection via chroma features.
+
+Two tiers are available:
+- "full": beat tracking + CQT chroma at 22050 Hz (reference quality)
+- "fast": onset-envelope autocorrelation + STFT chroma at 11025 Hz, with the
+  key picked by correlating against all 24 major/minor profiles at once
+
+After separation, StemAnalysis derives tempo from the drums stem and key from
+the harmonic stems already in memory (results cached as tier "stems").
 """
 import os
+import time
 import numpy as np
 from src.utils.logger import logger
 
@@ -19,26 +28,156 @@ except ImportError:
 KEY_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 MODE_NAMES = {0: 'min', 1: 'maj'}  # Minor, Major
 
+ANALYSIS_TIERS = ('full', 'fast')
+
+# Fast tier: decimated audio, one STFT shared by onset envelope and chroma
+FAST_SR = 11025
+FAST_N_FFT = 2048
+FAST_HOP = 256  # ~43 envelope frames/s, same rate as the full path's beat tracker
+FAST_TEMPO_RANGE = (60.0, 200.0)
+
+# Krumhansl-Kessler key profiles (tonic first)
+_MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+_MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+
+def _zscore(x: np.ndarray, axis: int = -1) -> np.ndarray:
+    x = x - x.mean(axis=axis, keepdims=True)
+    return x / (x.std(axis=axis, keepdims=True) + 1e-12)
+
+
+def _build_key_templates() -> np.ndarray:
+    """(24, 12) z-scored templates: rows 0-11 major keys C..B, rows 12-23 minor keys C..B."""
+    rows = [np.roll(_MAJOR_PROFILE, k) for k in range(12)]
+    rows += [np.roll(_MINOR_PROFILE, k) for k in range(12)]
+    return _zscore(np.stack(rows))
+
+
+_KEY_TEMPLATES = _build_key_templates()
+
+
+def _estimate_full(y: np.ndarray, sr: int):
+    """Reference path: beat tracker tempo + CQT chroma root/third heuristic."""
+    # ---- BPM Detection ----
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
+    # tempo can be array or scalar depending on librosa version
+    bpm = float(tempo[0]) if hasattr(tempo, '__iter__') else float(tempo)
+    
+    # ---- Key Detection ----
+    # Use chroma features for key detection
+    chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
+    
+    # Average chroma across time
+    chroma_avg = np.mean(chroma, axis=1)
+    
+    # Find the strongest pitch class (0-11)
+    root_note = int(np.argmax(chroma_avg))
+    
+    # Estimate major vs minor using simple heuristic:
+    # Compare strength of major 3rd (4 semitones) vs minor 3rd (3 semitones)
+    major_third_idx = (root_note + 4) % 12
+    minor_third_idx = (root_note + 3) % 12
+    
+    if chroma_avg[major_third_idx] > chroma_avg[minor_third_idx]:
+        mode = 1  # Major
+    else:
+        mode = 0  # Minor
+    
+    key = f"{KEY_NAMES[root_note]} {MODE_NAMES[mode]}"
+    
+    # Confidence is based on how much the root dominates
+    confidence = float(chroma_avg[root_note] / np.sum(chroma_avg))
+    return bpm, key, confidence
+
+
+def _fast_tempo(onset_env: np.ndarray, frame_rate: float) -> float:
+    """
+    Tempo from the autocorrelation of an onset envelope, weighted by a
+    log-normal prior around 120 BPM (as librosa does) and refined to
+    sub-frame lag by parabolic interpolation.
+    """
+    env = onset_env - onset_env.mean()
+    n = len(env)
+    if n < 4 or not np.any(env):
+        return 0.0
+    spec = np.fft.rfft(env, n=2 * n)
+    ac = np.fft.irfft(spec * np.conj(spec))[:n]
+    
+    min_bpm, max_bpm = FAST_TEMPO_RANGE
+    lo = max(1, int(np.floor(frame_rate * 60.0 / max_bpm)))
+    hi = min(n - 2, int(np.ceil(frame_rate * 60.0 / min_bpm)))
+    if hi <= lo:
+        return 0.0
+    lags = np.arange(lo, hi + 1)
+    prior = np.exp(-0.5 * np.log2((60.0 * frame_rate / lags) / 120.0) ** 2)
+    k = int(lags[np.argmax(ac[lags] * prior)])
+    
+    # Parabolic refinement of the peak position
+    a, b, c = ac[k - 1], ac[k], ac[k + 1]
+    denom = a - 2 * b + c
+    shift = 0.5 * (a - c) / denom if denom < 0 else 0.0
+    return 60.0 * frame_rate / (k + float(np.clip(shift, -0.5, 0.5)))
+
+
+def _fast_key(chroma_avg: np.ndarray):
+    """Pick the key by correlating the chroma profile with all 24 templates in one product."""
+    scores = _KEY_TEMPLATES @ _zscore(chroma_avg) / 12.0  # Pearson r per key
+    best = int(np.argmax(scores))
+    key = f"{KEY_NAMES[best % 12]} {MODE_NAMES[0 if best >= 12 else 1]}"
+    return key, float(max(scores[best], 0.0))
+
+
+def _fast_stft(y: np.ndarray) -> np.ndarray:
+    return np.abs(librosa.stft(y, n_fft=FAST_N_FFT, hop_length=FAST_HOP))
+
+
+def _tempo_from_stft(S: np.ndarray, sr: int) -> float:
+    # Onset strength: half-wave rectified spectral flux of the log magnitude
+    log_S = np.log1p(100.0 * S)
+    onset_env = np.maximum(0.0, np.diff(log_S, axis=1)).mean(axis=0)
+    return _fast_tempo(onset_env, sr / FAST_HOP)
+
+
+def _key_from_stft(S: np.ndarray, sr: int):
+    # Tuning estimation is skipped: it costs more than the chroma itself
+    chroma = librosa.feature.chroma_stft(S=S ** 2, sr=sr, n_fft=FAST_N_FFT, tuning=0.0)
+    return _fast_key(chroma.mean(axis=1))
+
+
+def _estimate_fast(y: np.ndarray, sr: int):
+    """Fast path: one STFT feeds both the onset envelope and the chroma."""
+    S = _fast_stft(y)
+    key, confidence = _key_from_stft(S, sr)
+    return _tempo_from_stft(S, sr), key, confidence
+
 
-def analyze_audio(file_path: str, duration: float = 60.0) -> dict:
+def analyze_audio(file_path: str, duration: float = 60.0, tier: str = 'full') -> dict:
     """
     Analyze audio file for BPM and musical key.
     
     Args:
         file_path: Path to audio file
         duration: Max seconds to analyze (for speed, default 60s)
+        tier: 'full' (beat tracking + CQT chroma) or 'fast' (onset autocorrelation
+              + STFT chroma key profiles). The confidence scales differ: 'full'
+              reports the root's share of the chroma, 'fast' the profile correlation.
     
     Returns:
-        dict with keys: 'bpm', 'key', 'key_confidence', 'success'
+        dict with keys: 'bpm', 'key', 'key_confidence', 'tier', 'success'
     """
     result = {
         'bpm': None,
         'key': None,
         'key_confidence': 0.0,
+        'tier': tier,
         'success': False,
         'error': None
     }
     
+    if tier not in ANALYSIS_TIERS:
+        result['error'] = f'Unknown analysis tier: {tier}'
+        return result
+    
     if not LIBROSA_AVAILABLE:
         result['error'] = 'librosa not installed'
         return result
@@ -48,44 +187,20 @@ def analyze_audio(file_path: str, duration: float = 60.0) -> dict:
         return result
     
     try:
-        # Load audio (mono, limited duration for speed)
-        y, sr = librosa.load(file_path, sr=22050, mono=True, duration=duration)
-        
-        # ---- BPM Detection ----
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        # tempo can be array or scalar depending on librosa version
-        bpm = float(tempo[0]) if hasattr(tempo, '__iter__') else float(tempo)
-        result['bpm'] = round(bpm, 1)
-        
-        # ---- Key Detection ----
-        # Use chroma features for key detection
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        
-        # Average chroma across time
-        chroma_avg = np.mean(chroma, axis=1)
-        
-        # Find the strongest pitch class (0-11)
-        root_note = int(np.argmax(chroma_avg))
-        
-        # Estimate major vs minor using simple heuristic:
-        # Compare strength of major 3rd (4 semitones) vs minor 3rd (3 semitones)
-        major_third_idx = (root_note + 4) % 12
-        minor_third_idx = (root_note + 3) % 12
-        
-        if chroma_avg[major_third_idx] > chroma_avg[minor_third_idx]:
-            mode = 1  # Major
+        if tier == 'fast':
+            # Decimated load: half the samples, cheap resampler
+            y, sr = librosa.load(file_path, sr=FAST_SR, mono=True, duration=duration, res_type='soxr_lq')
+            bpm, key, confidence = _estimate_fast(y, sr)
         else:
-            mode = 0  # Minor
-        
-        key_name = KEY_NAMES[root_note]
-        mode_name = MODE_NAMES[mode]
-        result['key'] = f"{key_name} {mode_name}"
-        
-        # Confidence is based on how much the root dominates
-        result['key_confidence'] = float(chroma_avg[root_note] / np.sum(chroma_avg))
+            # Load audio (mono, limited duration for speed)
+            y, sr = librosa.load(file_path, sr=22050, mono=True, duration=duration)
+            bpm, key, confidence = _estimate_full(y, sr)
         
+        result['bpm'] = round(bpm, 1)
+        result['key'] = key
+        result['key_confidence'] = confidence
         result['success'] = True
-        logger.info(f"Analysis complete: {result['bpm']} BPM, {result['key']}")
+        logger.info(f"Analysis complete ({tier}): {result['bpm']} BPM, {result['key']}")
         
     except Exception as e:
         result['error'] = str(e)
@@ -94,6 +209,219 @@ def analyze_audio(file_path: str, duration: float = 60.0) -> dict:
     return result
 
 
+def _cache_params(duration: float, tier: str = 'full') -> str:
+    """Cache key component describing how a result was computed."""
+    if tier == 'stems':
+        return 'stems'  # Always covers the whole track
+    return f"{tier}:{duration:g}"
+
+
+def analyze_audio_cached(file_path: str, duration: float = 60.0, tier: str = 'full') -> dict:
+    """
+    Same as analyze_audio, but served from / stored in the persistent
+    analysis cache (see analysis_cache.py).
+    """
+    from src.core.analysis_cache import get_analysis_cache
+    cache = get_analysis_cache()
+    params = _cache_params(duration, tier)
+    
+    if cache is not None:
+        # Results from separated stems are the most accurate, prefer them
+        cached = cache.get(file_path, _cache_params(0, 'stems')) or cache.get(file_path, params)
+        if cached is not None:
+            logger.debug(f"Analysis cache hit: {os.path.basename(file_path)}")
+            return cached
+    
+    result = analyze_audio(file_path, duration=duration, tier=tier)
+    if cache is not None and result.get('success'):
+        cache.put(file_path, result, params)
+    return result
+
+
+def store_analysis(file_path: str, result: dict, duration: float = 60.0, tier: str = 'full'):
+    """Save a result computed elsewhere (e.g. in a worker process) to the cache."""
+    from src.core.analysis_cache import get_analysis_cache
+    cache = get_analysis_cache()
+    if cache is not None and result.get('success'):
+        cache.put(file_path, result, _cache_params(duration, tier))
+
+
+def get_cached_analyses(file_paths: list, duration: float = 60.0, tier: str = 'full') -> dict:
+    """
+    Batch cache lookup without analyzing anything.
+    
+    Returns {file_path: analysis} for the files that already have results.
+    Results computed from separated stems take precedence over `tier`.
+    """
+    from src.core.analysis_cache import get_analysis_cache
+    cache = get_analysis_cache()
+    if cache is None:
+        return {}
+    hashes = {}  # shared by both lookups: each file is hashed at most once
+    hits = cache.get_many(file_paths, _cache_params(0, 'stems'), hashes)
+    rest = [p for p in file_paths if os.path.abspath(p) not in hits]
+    if rest:
+        hits.update(cache.get_many(rest, _cache_params(duration, tier), hashes))
+    # Map back to the caller's spelling of each path
+    return {p: hits[os.path.abspath(p)] for p in file_paths if os.path.abspath(p) in hits}
+
+
+class StemAnalysis:
+    """
+    BPM/Key from separated stems while they are still in memory.
+    
+    Feed each stem with `add()` as it comes out of the separator; `result()`
+    then estimates tempo from the drums (clean transients) and key from the
+    harmonic stems (no drums/vocals smearing the chroma), using the fast-tier
+    estimators. Falls back to the accompaniment stem for 2-stem models.
+    """
+    
+    DRUM_STEMS = ('drums',)
+    HARMONIC_STEMS = ('bass', 'other', 'piano', 'guitar')
+    ACCOMPANIMENT_STEMS = ('no_vocals', 'instrumental', 'no_drums', 'no_bass', 'no_guitar', 'no_piano')
+    
+    def __init__(self):
+        self._drums = None
+        self._harmonic = None
+        self._accompaniment = None
+    
+    @staticmethod
+    def _to_mono(audio, sr: int) -> np.ndarray:
+        """(channels, time) tensor/array -> mono float32 at FAST_SR."""
+        if hasattr(audio, 'detach'):
+            audio = audio.detach().cpu().numpy()
+        audio = np.asarray(audio, dtype=np.float32)
+        mono = audio.mean(axis=0) if audio.ndim == 2 else audio
+        if sr != FAST_SR:
+            mono = librosa.resample(mono, orig_sr=sr, target_sr=FAST_SR, res_type='soxr_lq')
+        return mono
+    
+    @staticmethod
+    def _mix(acc, y):
+        if acc is None:
+            return y
+        n = min(len(acc), len(y))
+        return acc[:n] + y[:n]
+    
+    def add(self, stem_name: str, audio, sr: int):
+        """Register one separated stem ((channels, time) torch tensor or numpy array)."""
+        if not LIBROSA_AVAILABLE:
+            return
+        if stem_name in self.DRUM_STEMS:
+            self._drums = self._mix(self._drums, self._to_mono(audio, sr))
+        elif stem_name in self.HARMONIC_STEMS:
+            self._harmonic = self._mix(self._harmonic, self._to_mono(audio, sr))
+        elif stem_name in self.ACCOMPANIMENT_STEMS:
+            self._accompaniment = self._mix(self._accompaniment, self._to_mono(audio, sr))
+    
+    def result(self) -> dict:
+        """Analysis dict in the same format as analyze_audio (tier 'stems')."""
+        result = {
+            'bpm': None,
+            'key': None,
+            'key_confidence': 0.0,
+            'tier': 'stems',
+            'success': False,
+            'error': None
+        }
+        tempo_src = self._drums if self._drums is not None else self._accompaniment
+        key_src = self._harmonic if self._harmonic is not None else self._accompaniment
+        if tempo_src is None or key_src is None:
+            result['error'] = 'No drum/harmonic stems to analyze'
+            return result
+        
+        try:
+            tempo_S = _fast_stft(tempo_src)
+            key_S = tempo_S if key_src is tempo_src else _fast_stft(key_src)
+            bpm = _tempo_from_stft(tempo_S, FAST_SR)
+            key, confidence = _key_from_stft(key_S, FAST_SR)
+            result['bpm'] = round(bpm, 1)
+            result['key'] = key
+            result['key_confidence'] = confidence
+            result['success'] = True
+            logger.info(f"Stem analysis: {result['bpm']} BPM, {result['key']}")
+        except Exception as e:
+            result['error'] = str(e)
+            logger.error(f"Stem analysis failed: {e}")
+        return result
+    
+    def beat_grid(self):
+        """Beat grid (see beatgrid.py) tracked on the drums, sections from the mix."""
+        from src.core.beatgrid import compute_beat_grid
+        beat_src = self._drums if self._drums is not None else self._accompaniment
+        if beat_src is None:
+            return None
+        if self._accompaniment is not None:
+            mix = self._accompaniment
+        else:
+            mix = self._mix(self._drums, self._harmonic) if self._harmonic is not None else self._drums
+        try:
+            return compute_beat_grid(beat_src, FAST_SR, energy_y=mix)
+        except Exception as e:
+            logger.error(f"Beat grid from stems failed: {e}")
+            return None
+
+
+def _bpm_agrees(a: float, b: float, tolerance: float = 0.04) -> bool:
+    """Same tempo within tolerance, allowing half/double-time octave errors."""
+    if not a or not b:
+        return False
+    return any(abs(a * f - b) <= tolerance * b for f in (1.0, 2.0, 0.5))
+
+
+def _relative_key(key: str) -> str:
+    """Relative major/minor of a key name like 'A min' -> 'C maj'."""
+    name, mode = key.split()
+    idx = KEY_NAMES.index(name)
+    if mode == 'min':
+        return f"{KEY_NAMES[(idx + 3) % 12]} maj"
+    return f"{KEY_NAMES[(idx - 3) % 12]} min"
+
+
+def compare_analysis_tiers(file_paths: list, duration: float = 30.0) -> dict:
+    """
+    Accuracy/speed report of the fast tier against the full (CQT) tier.
+    
+    Returns:
+        dict with 'files' (per-file results and timings) and 'summary'
+        (agreement rates, total seconds per tier, speedup).
+    """
+    files = []
+    totals = {'full': 0.0, 'fast': 0.0}
+    for path in file_paths:
+        entry = {'path': path}
+        for tier in ANALYSIS_TIERS:
+            start = time.perf_counter()
+            entry[tier] = analyze_audio(path, duration=duration, tier=tier)
+            entry[f'{tier}_seconds'] = time.perf_counter() - start
+            totals[tier] += entry[f'{tier}_seconds']
+        full, fast = entry['full'], entry['fast']
+        ok = full.get('success') and fast.get('success')
+        entry['bpm_match'] = bool(ok and _bpm_agrees(fast['bpm'], full['bpm']))
+        entry['key_match'] = bool(ok and fast['key'] == full['key'])
+        entry['key_related'] = bool(ok and fast['key'] in (full['key'], _relative_key(full['key'])))
+        files.append(entry)
+    
+    compared = [f for f in files if f['full'].get('success') and f['fast'].get('success')]
+    n = len(compared) or 1
+    summary = {
+        'files': len(files),
+        'compared': len(compared),
+        'bpm_agreement': sum(f['bpm_match'] for f in compared) / n,
+        'key_agreement': sum(f['key_match'] for f in compared) / n,
+        'key_related_agreement': sum(f['key_related'] for f in compared) / n,
+        'full_seconds': totals['full'],
+        'fast_seconds': totals['fast'],
+        'speedup': totals['full'] / totals['fast'] if totals['fast'] > 0 else 0.0,
+    }
+    logger.info(
+        f"Tier comparison on {summary['compared']} files: BPM {summary['bpm_agreement']:.0%}, "
+        f"key {summary['key_agreement']:.0%} ({summary['key_related_agreement']:.0%} incl. relative), "
+        f"{summary['speedup']:.1f}x faster"
+    )
+    return {'files': files, 'summary': summary}
+
+
 def format_analysis_string(analysis: dict) -> str:
     """
     Format analysis result for display.
@@ -112,6 +440,22 @@ def format_analysis_string(analysis: dict) -> str:
     return " • ".join(parts) if parts else ""
 
 
+def transpose_analysis(analysis: dict, semitones: int = 0, speed: float = 1.0) -> dict:
+    """
+    Analysis of the audio after pitch shift / time stretch
+    (key moved by `semitones`, BPM scaled by `speed`).
+    """
+    if not analysis.get('success'):
+        return analysis
+    shifted = dict(analysis)
+    if analysis.get('bpm') and speed != 1.0:
+        shifted['bpm'] = round(analysis['bpm'] * speed, 1)
+    if analysis.get('key') and semitones:
+        name, mode = analysis['key'].split()
+        shifted['key'] = f"{KEY_NAMES[(KEY_NAMES.index(name) + int(semitones)) % 12]} {mode}"
+    return shifted
+
+
 def get_filename_suffix(analysis: dict) -> str:
     """
     Get analysis info formatted for filename.
@@ -0,0 +1,176 @@
+"""
+Persistent Analysis Cache - BPM/Key results stored in SQLite
+Results are keyed by path + size + mtime for instant hits, with a quick
+content hash as fallback so renamed/moved or touched files are still found.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Any
+from src.utils.logger import logger
+from src.utils.hashing import quick_content_hash
+
+# Bump when analysis output changes so stale rows are ignored
+ANALYSIS_VERSION = 1
+
+CACHE_FILENAME = "analysis_cache.sqlite3"
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_CHUNK = 500
+
+
+def _get_cache_path() -> str:
+    """Cache database lives next to the user presets."""
+    from src.core.presets import _get_presets_dir
+    return os.path.join(_get_presets_dir(), CACHE_FILENAME)
+
+
+def _stat_key(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class AnalysisCache:
+    """Thread-safe SQLite store for analysis results."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or _get_cache_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis (
+                path TEXT NOT NULL,
+                params TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (path, params)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_hash ON analysis (content_hash, size, params)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_size ON analysis (size, params)")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, path: str, params: str = "") -> Optional[Dict[str, Any]]:
+        """Return the cached result for one file, or None."""
+        return self.get_many([path], params).get(os.path.abspath(path))
+
+    def get_many(self, paths: Iterable[str], params: str = "",
+                 hashes: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch lookup. Returns {abspath: result} for every path with a valid entry.
+        Files whose size/mtime changed are re-checked by content hash, but only
+        when some entry has the same size. Pass the same `hashes` dict to
+        several lookups to hash each file at most once.
+        """
+        if hashes is None:
+            hashes = {}
+        paths = [os.path.abspath(p) for p in paths]
+        rows = {}
+        with self._lock:
+            for i in range(0, len(paths), _LOOKUP_CHUNK):
+                chunk = paths[i:i + _LOOKUP_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT path, size, mtime_ns, content_hash, result FROM analysis "
+                    f"WHERE params = ? AND version = ? AND path IN ({marks})",
+                    [params, ANALYSIS_VERSION, *chunk],
+                )
+                for path, size, mtime_ns, content_hash, result in cur:
+                    rows[path] = (size, mtime_ns, content_hash, result)
+
+        hits = {}
+        for path in paths:
+            try:
+                size, mtime_ns = _stat_key(path)
+            except OSError:
+                continue
+            row = rows.get(path)
+            if row and row[0] == size and row[1] == mtime_ns:
+                hits[path] = json.loads(row[3])
+                continue
+            # Stat changed or unknown path: fall back to content identity
+            if not self._has_size_match(size, params):
+                continue
+            result = self._lookup_by_hash(path, size, mtime_ns, params, hashes)
+            if result is not None:
+                hits[path] = result
+        return hits
+
+    def _has_size_match(self, size, params) -> bool:
+        """Cheap pre-check before hashing: any entry of this size for these params?"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM analysis WHERE size = ? AND params = ? AND version = ? LIMIT 1",
+                (size, params, ANALYSIS_VERSION),
+            ).fetchone() is not None
+
+    def _lookup_by_hash(self, path, size, mtime_ns, params, hashes):
+        content_hash = hashes.get(path)
+        if content_hash is None:
+            try:
+                content_hash = hashes[path] = quick_content_hash(path)
+            except OSError:
+                return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM analysis WHERE content_hash = ? AND size = ? AND params = ? AND version = ? LIMIT 1",
+                (content_hash, size, params, ANALYSIS_VERSION),
+            ).fetchone()
+            if row is None:
+                return None
+            # Re-key under the new path/stat so the next lookup is a fast hit
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, params, size, mtime_ns, content_hash, ANALYSIS_VERSION, row[0], time.time()),
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, path: str, result: Dict[str, Any], params: str = ""):
+        """Store a successful analysis result."""
+        if not result.get('success'):
+            return
+        path = os.path.abspath(path)
+        try:
+            size, mtime_ns = _stat_key(path)
+            content_hash = quick_content_hash(path)
+        except OSError as e:
+            logger.debug(f"Analysis cache: cannot stat {path}: {e}")
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, params, size, mtime_ns, content_hash, ANALYSIS_VERSION, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+
+_cache_instance: Optional[AnalysisCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Shared cache instance (None if the database cannot be opened)."""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            try:
+                _cache_instance = AnalysisCache()
+            except Exception as e:
+                logger.warning(f"Analysis cache unavailable: {e}")
+                return None
+        return _cache_instance
@@ -0,0 +1,146 @@
+"""
+Batch Analysis Service - pooled BPM/Key detection
+Runs analyze_audio in a process pool sized to the CPU, streaming results
+back as they complete. Cache hits are served without touching the pool.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Callable, Dict, Iterable, Optional
+from src.utils.logger import logger
+
+# Shared on-disk cache for librosa's CQT/chroma filter banks (joblib), so every
+# pool process reuses the same precomputed kernels instead of rebuilding them.
+KERNEL_CACHE_DIRNAME = "librosa_cache"
+
+
+def _get_kernel_cache_dir() -> str:
+    from src.core.presets import _get_presets_dir
+    path = os.path.join(_get_presets_dir(), KERNEL_CACHE_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _init_worker(tier: str = 'full'):
+    """Pool initializer: warm up the kernels of the pool's tier once per process."""
+    try:
+        import numpy as np
+        if tier == 'fast':
+            # STFT only: no CQT filter bank or beat tracker to build
+            from src.core.analysis import _estimate_fast, FAST_SR
+            y = (np.random.default_rng(0).standard_normal(FAST_SR * 2) * 0.01).astype(np.float32)
+            _estimate_fast(y, FAST_SR)
+            return
+        import librosa
+        y = (np.random.default_rng(0).standard_normal(22050 * 2) * 0.01).astype(np.float32)
+        librosa.beat.beat_track(y=y, sr=22050)
+        librosa.feature.chroma_cqt(y=y, sr=22050)
+    except Exception as e:
+        logger.debug(f"Analysis worker warm-up skipped: {e}")
+
+
+def _analyze_in_worker(file_path: str, duration: float, tier: str) -> dict:
+    from src.core.analysis import analyze_audio
+    try:
+        return analyze_audio(file_path, duration=duration, tier=tier)
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+class BatchAnalysisService:
+    """
+    Process-pool analysis of many files.
+
+    `submit()` answers cache hits immediately and schedules the rest;
+    `on_result(file_path, result)` is called (from a pool callback thread)
+    as each file completes. Removed items are cancelled with `cancel()`.
+    `tier` ('full' or 'fast') may be changed between submissions.
+    """
+
+    def __init__(self, on_result: Callable[[str, dict], None], duration: float = 30.0,
+                 max_workers: Optional[int] = None, tier: str = 'full'):
+        self.on_result = on_result
+        self.duration = duration
+        self.tier = tier
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._futures: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Child processes inherit the environment: point librosa at the shared kernel cache
+            os.environ.setdefault("LIBROSA_CACHE_DIR", _get_kernel_cache_dir())
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.tier,),
+            )
+            logger.info(f"Analysis pool started with {self.max_workers} processes ({self.tier} tier)")
+        return self._executor
+
+    def submit(self, file_paths: Iterable[str]) -> Dict[str, dict]:
+        """
+        Queue files for analysis. Returns {file_path: result} for cache hits;
+        everything else is analyzed in the pool and reported via on_result.
+        """
+        from src.core.analysis import get_cached_analyses
+        file_paths = list(dict.fromkeys(file_paths))
+        tier = self.tier
+        cached = get_cached_analyses(file_paths, duration=self.duration, tier=tier)
+
+        with self._lock:
+            missing = [p for p in file_paths if p not in cached and p not in self._futures]
+            if missing:
+                executor = self._get_executor()
+                for path in missing:
+                    future = executor.submit(_analyze_in_worker, path, self.duration, tier)
+                    self._futures[path] = future
+                    future.add_done_callback(lambda f, p=path: self._on_done(p, f, tier))
+        if cached or missing:
+            logger.info(f"Analysis ({tier}): {len(cached)} cached, {len(missing)} queued")
+        return cached
+
+    def _on_done(self, file_path: str, future, tier: str):
+        with self._lock:
+            if self._futures.get(file_path) is not future:
+                return
+            del self._futures[file_path]
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        from src.core.analysis import store_analysis
+        store_analysis(file_path, result, duration=self.duration, tier=tier)
+        self.on_result(file_path, result)
+
+    def cancel(self, file_path: str) -> bool:
+        """Drop a file from the queue. Already-running analyses finish but are not reported."""
+        with self._lock:
+            future = self._futures.pop(file_path, None)
+        if future is None:
+            return False
+        future.cancel()
+        return True
+
+    def cancel_all(self):
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            future.cancel()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,114 @@
+"""
+Streaming Archive - zip outputs while the job is still writing
+Each output is appended to the final archive by a background thread as soon
+as it is written, so zipping overlaps with encoding the remaining stems and
+nothing is re-read in a pass at the end. Already-compressed formats are
+STORED; everything else is DEFLATED.
+"""
+import os
+import queue
+import threading
+import zipfile
+from typing import Optional
+from src.utils.logger import logger
+from src.core.workspace import SCRATCH_DIRNAME
+
+# Deflating these only costs time: they are compressed already
+STORED_EXTENSIONS = {".mp3", ".ogg", ".m4a", ".aac", ".flac", ".opus", ".zip", ".png", ".jpg"}
+
+_STOP = object()
+
+
+def compression_for(path: str) -> int:
+    if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class StreamingArchive:
+    """
+    Zip archive of an output folder, filled while the folder is written.
+
+    `add()` queues a finished file (optionally under a different archive
+    name) and returns immediately. `close()` adds whatever else ended up in
+    the folder and moves the archive into place; until then it only exists
+    as `<zip_path>.part`.
+    """
+
+    def __init__(self, zip_path: str, root: str):
+        self.zip_path = zip_path
+        self.root = root
+        self._part = zip_path + ".part"
+        self._zip = zipfile.ZipFile(self._part, "w", allowZip64=True)
+        self._names = set()
+        self._error = None  # set when the archive can no longer be trusted
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="zip-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, path: str, arcname: Optional[str] = None):
+        """Queue a finished file; `arcname` defaults to its path relative to the root."""
+        self._queue.put((path, arcname or os.path.relpath(path, self.root)))
+
+    def flush(self):
+        """Wait until every queued file is in the archive (before files are renamed or moved)."""
+        self._queue.join()
+        self._raise_if_broken()
+
+    def _raise_if_broken(self):
+        if self._error is not None:
+            raise RuntimeError(f"Archive {os.path.basename(self.zip_path)} failed: {self._error}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                path, arcname = item
+                arcname = arcname.replace(os.sep, "/")
+                if arcname not in self._names and self._error is None:
+                    self._zip.write(path, arcname, compress_type=compression_for(path))
+                    self._names.add(arcname)
+            except OSError as e:
+                logger.warning(f"Failed to add {item[1]} to archive: {e}")
+            except Exception as e:
+                # The zip may be inconsistent now: keep draining the queue, fail on flush/close
+                logger.error(f"Archive writer failed on {item[1]}: {e}")
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """Add the remaining files of the folder and publish the archive."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            self.discard()
+            self._raise_if_broken()
+        added = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d != SCRATCH_DIRNAME)
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                arcname = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if arcname not in self._names:
+                    self._zip.write(path, arcname, compress_type=compression_for(path))
+                    self._names.add(arcname)
+                    added += 1
+        self._zip.close()
+        os.replace(self._part, self.zip_path)
+        logger.info(f"Wrote archive {self.zip_path} ({len(self._names)} files, {added} added at the end)")
+
+    def discard(self):
+        """Stop and delete the partial archive (failed job)."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        try:
+            self._zip.close()
+        except Exception as e:
+            logger.debug(f"Closing discarded archive: {e}")
+        try:
+            os.remove(self._part)
+        except OSError:
+            pass
@@ -0,0 +1,301 @@
+"""
+Beat Grid - beats, downbeats and coarse sections stored as a sidecar
+Computed once per track and saved as compact JSON so the player and the
+preview slicer can use beat positions without running librosa again.
+"""
+import os
+import json
+import numpy as np
+from typing import Optional
+from src.utils.logger import logger
+from src.utils.hashing import quick_content_hash
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+    logger.warning("librosa not installed. Beat grid analysis unavailable.")
+
+# Bump when the grid format or algorithm changes so old sidecars are recomputed
+BEATGRID_VERSION = 1
+
+SIDECAR_SUFFIX = ".beatgrid.json"   # <track>.beatgrid.json next to the audio file
+FOLDER_SIDECAR = "beatgrid.json"    # One grid for a whole stems folder
+STORE_DIRNAME = "beatgrids"         # Fallback store when the track folder is read-only
+
+GRID_SR = 11025
+GRID_HOP = 256
+PHRASE_BARS = 4  # Section boundaries snap to 4-bar phrases
+
+
+def _round_times(times) -> list:
+    return [round(float(t), 3) for t in times]
+
+
+def _grid_bpm(beats: np.ndarray, fallback: float) -> float:
+    """
+    BPM from the mean beat interval, which is finer than the tempogram's
+    lag resolution. Skipped/doubled beats (intervals far from the median) are ignored.
+    """
+    if len(beats) < 4:
+        return fallback
+    intervals = np.diff(beats)
+    median = np.median(intervals)
+    regular = intervals[np.abs(intervals - median) < 0.25 * median]
+    return 60.0 / regular.mean() if len(regular) else fallback
+
+
+def _downbeat_phase(beat_frames: np.ndarray, kick_env: np.ndarray, beats_per_bar: int) -> int:
+    """Bar phase whose beats carry the most low-frequency (kick) onset energy."""
+    if len(beat_frames) < beats_per_bar:
+        return 0
+    strength = kick_env[np.minimum(beat_frames, len(kick_env) - 1)]
+    scores = [strength[p::beats_per_bar].mean() for p in range(beats_per_bar)]
+    return int(np.argmax(scores))
+
+
+def _label_sections(high: np.ndarray) -> list:
+    """Label runs of high/low-energy phrases: intro, drop, breakdown, outro."""
+    runs = []
+    start = 0
+    for i in range(1, len(high) + 1):
+        if i == len(high) or high[i] != high[start]:
+            runs.append((start, i, bool(high[start])))
+            start = i
+
+    labels = []
+    for idx, (s, e, is_high) in enumerate(runs):
+        if not is_high:
+            if idx == 0:
+                label = "intro"
+            elif idx == len(runs) - 1:
+                label = "outro"
+            else:
+                label = "breakdown"
+        else:
+            label = "drop" if idx > 0 else "main"
+        labels.append((s, e, label))
+    return labels
+
+
+def _sections(downbeats: np.ndarray, energy_y: np.ndarray, sr: int, duration: float) -> list:
+    """Coarse sections from per-phrase loudness of the mix."""
+    if len(downbeats) < 2 * PHRASE_BARS:
+        return [{"label": "main", "start": 0.0, "end": round(duration, 3)}]
+
+    rms = librosa.feature.rms(y=energy_y, frame_length=2048, hop_length=GRID_HOP)[0]
+    frame_times = librosa.frames_to_time(np.arange(len(rms)), sr=sr, hop_length=GRID_HOP)
+
+    # Phrase boundaries: every PHRASE_BARS-th downbeat, closed by the track end
+    bounds = list(downbeats[::PHRASE_BARS])
+    if bounds[0] > 0.5:
+        bounds.insert(0, 0.0)
+    else:
+        bounds[0] = 0.0
+    bounds.append(duration)
+    bounds = np.array(bounds)
+
+    idx = np.searchsorted(frame_times, bounds)
+    level = np.array([
+        rms[a:b].mean() if b > a else 0.0 for a, b in zip(idx[:-1], idx[1:])
+    ])
+    level_db = 20 * np.log10(level + 1e-8)
+    lo, hi = np.percentile(level_db, [20, 80])
+    if hi - lo < 3.0:
+        # Flat dynamics: no meaningful sections
+        return [{"label": "main", "start": 0.0, "end": round(duration, 3)}]
+    high = level_db > (lo + hi) / 2
+
+    return [
+        {"label": label, "start": round(float(bounds[s]), 3), "end": round(float(bounds[e]), 3)}
+        for s, e, label in _label_sections(high)
+    ]
+
+
+def compute_beat_grid(y: np.ndarray, sr: int, energy_y: Optional[np.ndarray] = None,
+                      beats_per_bar: int = 4) -> dict:
+    """
+    Beat grid from mono audio.
+
+    Args:
+        y: Signal to track beats on (the drums stem when available)
+        sr: Sample rate of `y` and `energy_y`
+        energy_y: Signal used for section loudness (defaults to `y`)
+        beats_per_bar: Assumed meter
+
+    Returns:
+        dict with 'bpm', 'beats' (seconds), 'beats_per_bar', 'downbeat_phase',
+        'sections' and 'duration'
+    """
+    energy_y = y if energy_y is None else energy_y
+    duration = len(y) / sr
+
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=GRID_HOP)
+    tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=GRID_HOP)
+    beats = librosa.frames_to_time(beat_frames, sr=sr, hop_length=GRID_HOP)
+    bpm = _grid_bpm(beats, float(np.atleast_1d(tempo)[0]))
+
+    kick_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=GRID_HOP, fmax=150.0, n_mels=32)
+    phase = _downbeat_phase(beat_frames, kick_env, beats_per_bar)
+    downbeats = beats[phase::beats_per_bar]
+
+    grid = {
+        "version": BEATGRID_VERSION,
+        "bpm": round(bpm, 2),
+        "duration": round(duration, 3),
+        "beats_per_bar": beats_per_bar,
+        "downbeat_phase": phase,
+        "beats": _round_times(beats),
+        "sections": _sections(downbeats, energy_y, sr, duration),
+    }
+    logger.info(f"Beat grid: {len(beats)} beats @ {grid['bpm']} BPM, "
+                f"{len(grid['sections'])} sections ({', '.join(s['label'] for s in grid['sections'])})")
+    return grid
+
+
+def analyze_beat_grid(file_path: str) -> Optional[dict]:
+    """Decode a file and compute its beat grid (None on failure)."""
+    if not LIBROSA_AVAILABLE:
+        return None
+    try:
+        y, sr = librosa.load(file_path, sr=GRID_SR, mono=True, res_type='soxr_lq')
+        return compute_beat_grid(y, sr)
+    except Exception as e:
+        logger.error(f"Beat grid analysis failed for {file_path}: {e}")
+        return None
+
+
+def stretch_beat_grid(grid: dict, speed: float) -> dict:
+    """Grid of the same audio played `speed` times faster (time stretch)."""
+    if speed == 1.0:
+        return grid
+    stretched = dict(grid)
+    stretched["bpm"] = round(grid["bpm"] * speed, 2)
+    stretched["duration"] = round(grid["duration"] / speed, 3)
+    stretched["beats"] = _round_times(np.asarray(grid["beats"]) / speed)
+    stretched["sections"] = [
+        {**s, "start": round(s["start"] / speed, 3), "end": round(s["end"] / speed, 3)}
+        for s in grid["sections"]
+    ]
+    return stretched
+
+
+# ---- Accessors ----
+
+def downbeats(grid: dict) -> list:
+    """Downbeat times in seconds."""
+    return grid["beats"][grid["downbeat_phase"]::grid["beats_per_bar"]]
+
+
+def snap_to_downbeat(grid: dict, t: float) -> float:
+    """Nearest downbeat to `t` (or `t` itself if the grid has none)."""
+    marks = downbeats(grid)
+    if not marks:
+        return t
+    return min(marks, key=lambda d: abs(d - t))
+
+
+def find_section(grid: dict, label: str) -> Optional[dict]:
+    """First section with the given label, e.g. 'drop'."""
+    for section in grid.get("sections", []):
+        if section["label"] == label:
+            return section
+    return None
+
+
+# ---- Sidecar storage ----
+
+def sidecar_path(audio_path: str) -> str:
+    return audio_path + SIDECAR_SUFFIX
+
+
+def _store_path(content_hash: str) -> str:
+    from src.core.presets import _get_presets_dir
+    return os.path.join(_get_presets_dir(), STORE_DIRNAME, f"{content_hash}.json")
+
+
+def _write_json(path: str, data: dict):
+    """Atomic write: readers never see a half-written sidecar."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_beat_grid(audio_path: str, grid: dict) -> Optional[str]:
+    """
+    Store the grid next to the track, or in the shared store if the
+    track's folder is not writable. Returns the sidecar path.
+    """
+    try:
+        content_hash = quick_content_hash(audio_path)
+    except OSError as e:
+        logger.warning(f"Cannot hash {audio_path} for beat grid: {e}")
+        return None
+    data = {**grid, "content_hash": content_hash}
+
+    for path in (sidecar_path(audio_path), _store_path(content_hash)):
+        try:
+            _write_json(path, data)
+            logger.debug(f"Saved beat grid: {path}")
+            return path
+        except OSError as e:
+            logger.debug(f"Beat grid not writable at {path}: {e}")
+    logger.warning(f"Could not save beat grid for {audio_path}")
+    return None
+
+
+def save_folder_beat_grid(folder: str, grid: dict) -> Optional[str]:
+    """One grid shared by every file in a stems folder."""
+    path = os.path.join(folder, FOLDER_SIDECAR)
+    try:
+        _write_json(path, grid)
+        return path
+    except OSError as e:
+        logger.warning(f"Could not save beat grid to {folder}: {e}")
+        return None
+
+
+def load_beat_grid(audio_path: str) -> Optional[dict]:
+    """
+    Stored grid for a track: its own sidecar, the shared store (by content
+    hash), or the grid of the stems folder it lives in. Never computes.
+    """
+    content_hash = None
+    own = _read_json(sidecar_path(audio_path))
+    try:
+        content_hash = quick_content_hash(audio_path)
+    except OSError:
+        pass
+
+    candidates = [own]
+    if content_hash:
+        candidates.append(_read_json(_store_path(content_hash)))
+    for grid in candidates:
+        if grid and grid.get("version") == BEATGRID_VERSION and grid.get("content_hash") == content_hash:
+            return grid
+
+    folder_grid = _read_json(os.path.join(os.path.dirname(audio_path), FOLDER_SIDECAR))
+    if folder_grid and folder_grid.get("version") == BEATGRID_VERSION:
+        return folder_grid
+    return None
+
+
+def get_beat_grid(audio_path: str) -> Optional[dict]:
+    """Stored grid, computing and saving it on first use."""
+    grid = load_beat_grid(audio_path)
+    if grid is None:
+        grid = analyze_beat_grid(audio_path)
+        if grid is not None:
+            save_beat_grid(audio_path, grid)
+    return grid
@@ -33,8 +33,5 @@ MODEL_DEECHO_DEREVERB = "UVR-DeEcho-DeReverb.pth"
 # Model Checkpoint Filenames (for detection)
 CHECKPOINT_EXTENSIONS = [".yaml", ".pth", ".ckpt", ".onnx"]
 
-# --- Cleanup Patterns ---
-CLEANUP_PATTERNS = ["_temp_", "(No Reverb)", "(Reverb)", "vocals_ensemble", "Kim_Vocal", "deverb"]
-
 # --- Preset Names ---
 PRESET_DEFAULT = "Default (Balanced)"
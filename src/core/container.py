@@ -0,0 +1,186 @@
+"""
+Stem Container - all stems of a track in one multichannel file
+Stems (and their bands) are written side by side as channel groups of a
+single WAV/RF64, FLAC, AIFF or CAF file, with the channel map stored in the
+file's comment tag. One file per track instead of dozens keeps batch jobs
+cheap on network storage; `StemContainer` reads single stems back, memory
+mapping uncompressed WAV data instead of decoding the whole file.
+"""
+import io
+import os
+import json
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import soundfile as sf
+from src.utils.logger import logger
+
+# Output extension -> libsndfile container format
+CONTAINER_FORMATS = {
+    "wav": "WAV",
+    "flac": "FLAC",
+    "aiff": "AIFF",
+    "caf": "CAF",
+}
+
+MAX_FLAC_CHANNELS = 8
+
+# Plain RIFF sizes are 32-bit; larger files are written as RF64
+MAX_RIFF_BYTES = 0xFFFFFFFF - (1 << 20)
+
+CONTAINER_SUFFIX = "_stems"
+MAP_VERSION = 1
+
+# Sample formats that can be memory-mapped as they are stored
+_MAPPABLE_SUBTYPES = {"PCM_16": "<i2", "PCM_32": "<i4", "FLOAT": "<f4", "DOUBLE": "<f8"}
+
+
+def supports_container(ext: str) -> bool:
+    return ext.lower() in CONTAINER_FORMATS
+
+
+def _sf_format(ext: str, channels: int, frames: int, subtype: Optional[str]) -> Tuple[str, str]:
+    """(file extension, libsndfile format) for a container of this size."""
+    fmt = CONTAINER_FORMATS[ext]
+    if fmt == "FLAC" and channels > MAX_FLAC_CHANNELS:
+        # FLAC stops at 8 channels; CAF keeps the bit depth without a size limit
+        logger.warning(f"FLAC supports at most {MAX_FLAC_CHANNELS} channels, writing a CAF container")
+        return "caf", "CAF"
+    if fmt == "WAV":
+        width = {"PCM_16": 2, "PCM_24": 3}.get(subtype, 4)
+        if frames * channels * width > MAX_RIFF_BYTES:
+            return ext, "RF64"
+    return ext, fmt
+
+
+def write_container(path: str, stems: List[Tuple[str, np.ndarray]], sr: int,
+                    subtype: Optional[str] = None) -> Tuple[str, dict]:
+    """
+    Write (name, (time, channels)) stems into one file; stems are cut to a
+    common length. The extension of `path` picks the format (it may change
+    to .caf, see `_sf_format`). Returns (written path, channel map).
+    """
+    length = min(data.shape[0] for _, data in stems)
+    entries = []
+    start = 0
+    for name, data in stems:
+        channels = 1 if data.ndim == 1 else data.shape[1]
+        entries.append({"name": name, "start": start, "channels": channels})
+        start += channels
+
+    root, ext = os.path.splitext(path)
+    ext, fmt = _sf_format(ext.lstrip(".").lower(), start, length, subtype)
+    path = f"{root}.{ext}"
+
+    interleaved = np.empty((length, start), dtype=np.float32)
+    for entry, (_, data) in zip(entries, stems):
+        cols = slice(entry["start"], entry["start"] + entry["channels"])
+        interleaved[:, cols] = data[:length].reshape(length, -1)
+
+    channel_map = {"version": MAP_VERSION, "sample_rate": int(sr), "frames": int(length),
+                   "channels": start, "stems": entries}
+    with sf.SoundFile(path, "w", int(sr), start, subtype, format=fmt) as f:
+        # Strings go in before the audio (required for FLAC)
+        f.comment = json.dumps(channel_map, separators=(",", ":"))
+        f.write(interleaved)
+    logger.info(f"Wrote stem container {os.path.basename(path)}: {len(entries)} stems, "
+                f"{start} channels ({fmt})")
+    return path, channel_map
+
+
+def _wav_data_chunk(path: str) -> Optional[Tuple[int, int]]:
+    """(offset, size) of the sample data in a RIFF/RF64 WAV, or None."""
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] not in (b"RIFF", b"RF64") or header[8:12] != b"WAVE":
+            return None
+        data_size64 = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"ds64":
+                body = f.read(size)
+                data_size64 = struct.unpack("<Q", body[8:16])[0]
+                f.seek(size & 1, 1)
+            elif chunk_id == b"data":
+                if size == 0xFFFFFFFF and data_size64 is not None:
+                    size = data_size64
+                return f.tell(), size
+            else:
+                f.seek(size + (size & 1), 1)
+
+
+class StemContainer:
+    """
+    Read access to a stem container.
+
+    `stem(name)` returns a (frames, channels) float32 array. For
+    uncompressed WAV containers the file is memory-mapped and only the pages
+    of the requested channels are touched; other formats are decoded once
+    and kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with sf.SoundFile(path) as f:
+            self.sample_rate = f.samplerate
+            self.channels = f.channels
+            self.frames = f.frames
+            self.subtype = f.subtype
+            self.format = f.format
+            comment = f.comment
+        try:
+            self.channel_map = json.loads(comment)
+            self._entries = {e["name"]: e for e in self.channel_map["stems"]}
+        except (TypeError, ValueError, KeyError):
+            raise ValueError(f"{path} is not a stem container (no channel map)")
+        self._samples = None
+
+    @property
+    def names(self) -> List[str]:
+        return [e["name"] for e in self.channel_map["stems"]]
+
+    def _all_samples(self) -> np.ndarray:
+        if self._samples is None:
+            dtype = _MAPPABLE_SUBTYPES.get(self.subtype)
+            chunk = _wav_data_chunk(self.path) if self.format in ("WAV", "WAVEX", "RF64") and dtype else None
+            if chunk is not None:
+                offset, _ = chunk
+                self._samples = np.memmap(self.path, dtype=dtype, mode="r", offset=offset,
+                                          shape=(self.frames, self.channels))
+            else:
+                self._samples, _ = sf.read(self.path, dtype="float32", always_2d=True)
+        return self._samples
+
+    def stem(self, name: str) -> np.ndarray:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No stem '{name}' in {os.path.basename(self.path)} ({self.names})")
+        view = self._all_samples()[:, entry["start"]:entry["start"] + entry["channels"]]
+        if view.dtype == np.float32:
+            return view
+        if view.dtype.kind == "i":
+            return view.astype(np.float32) / float(np.iinfo(view.dtype).max + 1)
+        return view.astype(np.float32)
+
+    def stems(self) -> Dict[str, np.ndarray]:
+        return {name: self.stem(name) for name in self.names}
+
+    def wav_bytes(self, name: str) -> bytes:
+        """One stem as an in-memory float WAV (e.g. for a media player)."""
+        buf = io.BytesIO()
+        sf.write(buf, self.stem(name), self.sample_rate, subtype="FLOAT", format="WAV")
+        return buf.getvalue()
+
+
+def is_container(path: str) -> bool:
+    """True for files written by `write_container` (checks the channel map tag)."""
+    if os.path.splitext(path)[1].lstrip(".").lower() not in CONTAINER_FORMATS:
+        return False
+    try:
+        with sf.SoundFile(path) as f:
+            return "stems" in json.loads(f.comment or "{}")
+    except Exception:
+        return False
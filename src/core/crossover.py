@@ -0,0 +1,95 @@
+"""
+Multi-Band Crossover - Linkwitz-Riley band splitting
+Splits audio into N bands at configurable crossover frequencies with
+4th-order Linkwitz-Riley filters. Lower bands get all-pass compensation
+for the crossovers above them, so all bands share one phase response and
+sum back to a flat (all-pass) version of the input.
+"""
+from typing import List, Sequence
+import numpy as np
+from src.utils.logger import logger
+
+try:
+    from scipy.signal import butter, sosfilt
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+    logger.warning("scipy not installed. Band splitting unavailable.")
+
+DEFAULT_CROSSOVERS = (300.0, 4000.0)
+
+
+def band_names(n_bands: int) -> List[str]:
+    """Low/High, Low/Mid/High, then Low/Mid1../High for more bands."""
+    if n_bands == 2:
+        return ["Low", "High"]
+    if n_bands == 3:
+        return ["Low", "Mid", "High"]
+    return ["Low"] + [f"Mid{i}" for i in range(1, n_bands - 1)] + ["High"]
+
+
+def parse_crossovers(value) -> List[float]:
+    """Crossover list from a setting: '300, 4000' or a list of numbers."""
+    if isinstance(value, str):
+        value = [v for v in value.replace(";", ",").split(",") if v.strip()]
+    try:
+        return sorted(float(v) for v in value) or list(DEFAULT_CROSSOVERS)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid crossover frequencies {value!r}, using {DEFAULT_CROSSOVERS}")
+        return list(DEFAULT_CROSSOVERS)
+
+
+def _lr4(fc: float, sr: int, btype: str) -> np.ndarray:
+    """LR4 = two cascaded 2nd-order Butterworth sections."""
+    sos = butter(2, fc, btype=btype, fs=sr, output='sos')
+    return np.vstack([sos, sos])
+
+
+def _allpass(fc: float, sr: int) -> np.ndarray:
+    """LR4 lowpass + highpass at `fc` as one 2nd-order all-pass section."""
+    a = butter(2, fc, btype='low', fs=sr, output='sos')[0, 3:]
+    return np.concatenate([a[::-1], a])[None, :]
+
+
+class Crossover:
+    """
+    N-band Linkwitz-Riley crossover for one sample rate.
+
+    Band k is the LR4 lowpass at f_k of the signal that passed all lower
+    highpasses, followed by the all-passes of the higher crossovers.
+    """
+
+    def __init__(self, sr: int, crossovers: Sequence[float] = DEFAULT_CROSSOVERS):
+        nyquist = sr / 2
+        self.sr = sr
+        self.crossovers = [f for f in sorted(crossovers) if 0 < f < nyquist]
+        if len(self.crossovers) < len(crossovers):
+            logger.warning(f"Crossovers outside 0-{nyquist:g} Hz ignored: {list(crossovers)}")
+        self.names = band_names(len(self.crossovers) + 1)
+        self._low = [_lr4(f, sr, 'low') for f in self.crossovers]
+        self._high = [_lr4(f, sr, 'high') for f in self.crossovers]
+        self._phase = [_allpass(f, sr) for f in self.crossovers]
+
+    def split(self, audio: np.ndarray) -> List[np.ndarray]:
+        """Bands of a (channels, time) buffer, lowest first; they sum to an all-passed input."""
+        rest = np.asarray(audio, dtype=np.float32)
+        bands = []
+        for k in range(len(self.crossovers)):
+            sos = np.vstack([self._low[k], *self._phase[k + 1:]])
+            bands.append(sosfilt(sos, rest, axis=-1).astype(np.float32, copy=False))
+            rest = sosfilt(self._high[k], rest, axis=-1).astype(np.float32, copy=False)
+        bands.append(rest)
+        return bands
+
+    def split_batch(self, stems: List[np.ndarray]) -> List[List[np.ndarray]]:
+        """
+        Split several (channels, time) stems in one pass: all channels are
+        filtered together. Returns the bands of each stem, lowest first.
+        """
+        if not stems:
+            return []
+        length = min(s.shape[-1] for s in stems)
+        counts = np.cumsum([s.shape[0] for s in stems])[:-1]
+        batch = np.concatenate([np.asarray(s[:, :length], dtype=np.float32) for s in stems])
+        bands = [np.split(band, counts) for band in self.split(batch)]
+        return [list(per_stem) for per_stem in zip(*bands)]
@@ -0,0 +1,184 @@
+"""
+Input Deduplication - one separation per distinct recording
+Batch inputs are grouped by decoded audio, not by file bytes, so the same
+recording with different names or tags is separated once. Only files whose
+headers (rate, channels, length) collide are decoded and hashed, in
+parallel; the outputs of the kept file are then hard-linked (or copied)
+into each duplicate's output folder.
+"""
+import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import soundfile as sf
+from src.utils.logger import logger
+from src.utils.hashing import quick_content_hash
+from src.core.manifest import MANIFEST_FILENAME
+from src.core.workspace import SCRATCH_DIRNAME
+
+# Decoding and hashing release the GIL, so threads scale across files
+MAX_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+PCM_BLOCK_FRAMES = 1 << 16
+
+
+def _header_key(path: str) -> Optional[tuple]:
+    """(sample rate, channels, frames) from the header; None if libsndfile can't read it."""
+    try:
+        info = sf.info(path)
+        return info.samplerate, info.channels, info.frames
+    except Exception:
+        return None
+
+
+def pcm_hash(path: str) -> str:
+    """
+    Hash of the decoded samples. Samples are read as int32, so the same audio
+    in WAV, FLAC or AIFF (at any bit depth it was padded to) hashes the same.
+    Files libsndfile can't decode fall back to a hash of their bytes.
+    """
+    try:
+        h = hashlib.blake2b(digest_size=16)
+        with sf.SoundFile(path) as f:
+            h.update(f"{f.samplerate}:{f.channels}".encode())
+            for block in f.blocks(PCM_BLOCK_FRAMES, dtype="int32", always_2d=True):
+                h.update(np.ascontiguousarray(block))
+        return f"pcm:{h.hexdigest()}"
+    except Exception as e:
+        logger.debug(f"PCM hash unavailable for {os.path.basename(path)} ({e}), hashing bytes")
+        return f"file:{quick_content_hash(path)}"
+
+
+class DuplicateTracker:
+    """
+    Duplicate detection for inputs that arrive in batches (e.g. from a
+    folder scan). Files are compared with everything added before them; the
+    first file of a recording is the one that is kept.
+    """
+
+    def __init__(self, workers: int = MAX_HASH_WORKERS):
+        self.workers = max(1, workers)
+        self._by_header: Dict[tuple, List[str]] = {}
+        self._hashes: Dict[str, str] = {}
+        self._kept: Dict[str, str] = {}  # {pcm hash: kept path}
+        self.hashed = 0
+
+    def add(self, paths: List[str]) -> Dict[str, str]:
+        """Add a batch in order. Returns {duplicate path: kept path} for this batch."""
+        paths = [p for p in dict.fromkeys(paths) if p not in self._hashes]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            keys = dict(zip(paths, pool.map(_header_key, paths)))
+
+            # A file can only duplicate another with the same header (unreadable ones are all candidates)
+            groups = [self._by_header.setdefault(keys[p] or ("undecodable",), []) for p in paths]
+            earlier = [g[0] for g in groups if len(g) == 1 and g[0] not in self._hashes]
+            for path, group in zip(paths, groups):
+                group.append(path)
+            # First files of earlier batches that only now have company need hashing too
+            candidates = list(dict.fromkeys(earlier + [p for p, g in zip(paths, groups) if len(g) > 1]))
+            self._hashes.update(zip(candidates, pool.map(pcm_hash, candidates)))
+            self.hashed += len(candidates)
+
+        # Earlier files come first: they keep their place as the kept copy
+        for path in earlier:
+            self._kept.setdefault(self._hashes[path], path)
+        duplicates = {}
+        for path in paths:
+            digest = self._hashes.get(path)
+            if digest is None:
+                continue
+            kept = self._kept.setdefault(digest, path)
+            if kept != path:
+                duplicates[path] = kept
+        return duplicates
+
+
+def find_duplicates(paths: List[str], workers: int = MAX_HASH_WORKERS) -> Dict[str, List[str]]:
+    """
+    {kept path: [duplicate paths]} for every group of inputs with identical
+    audio. The kept file is the group's first in input order, so the result
+    only depends on the order of `paths`.
+    """
+    tracker = DuplicateTracker(workers)
+    duplicates: Dict[str, List[str]] = {}
+    for dup, kept in tracker.add(paths).items():
+        duplicates.setdefault(kept, []).append(dup)
+    if duplicates:
+        logger.info(f"Dedup: {sum(len(d) for d in duplicates.values())} duplicate inputs of "
+                    f"{len(duplicates)} recordings ({tracker.hashed} of {len(paths)} files hashed)")
+    return duplicates
+
+
+def unique_inputs(paths: List[str], duplicates: Dict[str, List[str]]) -> List[str]:
+    """`paths` without the duplicates (kept files stay in place)."""
+    dropped = {p for dups in duplicates.values() for p in dups}
+    return [p for p in dict.fromkeys(paths) if p not in dropped]
+
+
+def _rename_track(rel: str, src_base: str, dst_base: str) -> str:
+    """Swap the track name where a path component starts with it ({track}_{stem}, {track}/...)."""
+    parts = []
+    for part in rel.replace(os.sep, "/").split("/"):
+        if part == src_base or (part.startswith(src_base) and part[len(src_base)] in "_ .-"):
+            part = dst_base + part[len(src_base):]
+        parts.append(part)
+    return "/".join(parts)
+
+
+def _link_or_copy(src: str, dst: str):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Other volume, or no hard links on this filesystem
+        shutil.copy2(src, dst)
+
+
+def replicate_outputs(src_dir: str, dst_dir: str, src_input: str, dst_input: str) -> int:
+    """
+    Give a duplicate input the outputs of the job that was actually run.
+    Files are hard-linked where possible; the track name in file names is
+    swapped for the duplicate's, and its manifest points back to the source.
+    Returns the number of files placed.
+    """
+    src_base = os.path.splitext(os.path.basename(src_input))[0]
+    dst_base = os.path.splitext(os.path.basename(dst_input))[0]
+    placed = 0
+    for root, dirnames, filenames in os.walk(src_dir):
+        dirnames[:] = [d for d in dirnames if d != SCRATCH_DIRNAME]
+        rel_root = os.path.relpath(root, src_dir)
+        for name in filenames:
+            rel = _rename_track(os.path.normpath(os.path.join(rel_root, name)), src_base, dst_base)
+            dst = os.path.join(dst_dir, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            src = os.path.join(root, name)
+            if name == MANIFEST_FILENAME and rel_root == ".":
+                _write_duplicate_manifest(src, dst, src_base, dst_base, src_input, dst_input)
+            else:
+                _link_or_copy(src, dst)
+            placed += 1
+    if os.path.exists(f"{src_dir}.zip"):
+        _link_or_copy(f"{src_dir}.zip", f"{dst_dir}.zip")
+        placed += 1
+    logger.info(f"Dedup: placed {placed} outputs of {os.path.basename(src_input)} for {os.path.basename(dst_input)}")
+    return placed
+
+
+def _write_duplicate_manifest(src, dst, src_base, dst_base, src_input, dst_input):
+    try:
+        with open(src, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        _link_or_copy(src, dst)
+        return
+    data["input"] = os.path.abspath(dst_input)
+    data["duplicate_of"] = os.path.abspath(src_input)
+    data["outputs"] = {_rename_track(k, src_base, dst_base): v for k, v in data.get("outputs", {}).items()}
+    tmp = f"{dst}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, dst)
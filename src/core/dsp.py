@@ -32,7 +32,7 @@ def highpass_filter(data: np.ndarray, cutoff: float, fs: int, order: int = 5) ->
         nyq = 0.5 * fs
         normal_cutoff = cutoff / nyq
         b, a = butter(order, normal_cutoff, btype='high', analog=False)
-        return lfilter(b, a, data, axis=0)
+        return lfilter(b, a, data, axis=0).astype(data.dtype, copy=False)
     except Exception as e:
         logger.error(f"High-pass filter error: {e}")
         return data
@@ -47,7 +47,7 @@ def lowpass_filter(data: np.ndarray, cutoff: float, fs: int, order: int = 5) ->
         nyq = 0.5 * fs
         normal_cutoff = cutoff / nyq
         b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        return lfilter(b, a, data, axis=0)
+        return lfilter(b, a, data, axis=0).astype(data.dtype, copy=False)
     except Exception as e:
         logger.error(f"Low-pass filter error: {e}")
         return data
@@ -69,33 +69,78 @@ def remove_echo(data: np.ndarray, sr: int, delay_ms: float = 100.0, decay: float
         return data
 
 
-def spectral_gate(data: np.ndarray, sr: int, threshold_factor: float = 0.1) -> np.ndarray:
-    """Simple spectral gating for noise reduction."""
-    if not SCIPY_AVAILABLE:
-        return data
-        
+def _frame_block(data: np.ndarray, start: int, length: int) -> np.ndarray:
+    """Copy data[start:start + length] (time, channels), zero-padding outside the signal."""
+    seg = np.zeros((length, data.shape[1]), dtype=data.dtype)
+    lo = max(start, 0)
+    hi = min(start + length, data.shape[0])
+    if hi > lo:
+        seg[lo - start:hi - start] = data[lo:hi]
+    return seg
+
+
+def spectral_gate(data: np.ndarray, sr: int, threshold_factor: float = 0.1,
+                  n_fft: int = 2048, block_frames: int = 256, floor_smoothing: float = 0.8) -> np.ndarray:
+    """
+    Streaming spectral gate for noise reduction.
+    
+    Works on (time,) or (time, channels) input. The STFT is computed in blocks of
+    `block_frames` overlapping frames for all channels at once, and the noise floor
+    (10th percentile magnitude per bin) is tracked as a running estimate across
+    blocks, so memory stays bounded by the block size instead of the file length.
+    """
     try:
-        # Compute STFT
-        f, t, Zxx = signal.stft(data, fs=sr, nperseg=2048)
+        mono = data.ndim == 1
+        x = data[:, None] if mono else data
+        n_samples, n_channels = x.shape
+        dtype = np.float32 if x.dtype == np.float32 else np.float64
         
-        # Estimate noise floor from quietest parts
-        mag = np.abs(Zxx)
-        noise_floor = np.percentile(mag, 10, axis=1, keepdims=True)
+        hop = n_fft // 4
+        overlap = n_fft // hop
+        window = np.hanning(n_fft + 1)[:-1].astype(dtype)  # periodic Hann
+        norm = np.sum(window ** 2) / hop
         
-        # Apply gate
-        mask = mag > (noise_floor * (1 + threshold_factor * 10))
-        Zxx_cleaned = Zxx * mask
+        # Frame f starts at f * hop - (n_fft - hop) so every sample is covered by `overlap` frames
+        first_start = -(n_fft - hop)
+        n_frames = -(-(n_samples - first_start) // hop)
+        block_frames = max(block_frames - block_frames % overlap, overlap)
         
-        # Inverse STFT
-        _, cleaned = signal.istft(Zxx_cleaned, fs=sr, nperseg=2048)
+        out = np.zeros((n_samples, n_channels), dtype=dtype)
+        noise_floor = None
+        gate_scale = 1 + threshold_factor * 10
         
-        # Match length
-        if len(cleaned) > len(data):
-            cleaned = cleaned[:len(data)]
-        elif len(cleaned) < len(data):
-            cleaned = np.pad(cleaned, (0, len(data) - len(cleaned)))
+        for f0 in range(0, n_frames, block_frames):
+            f1 = min(f0 + block_frames, n_frames)
+            seg_start = first_start + f0 * hop
+            seg = _frame_block(x, seg_start, (f1 - f0 - 1) * hop + n_fft)
+            
+            # (frames, channels, n_fft) strided view -> one rfft over every channel
+            frames = np.lib.stride_tricks.sliding_window_view(seg, n_fft, axis=0)[::hop]
+            spec = np.fft.rfft(frames * window, axis=-1)
+            mag = np.abs(spec)
+            
+            # Running noise floor estimate (per channel, per bin)
+            block_floor = np.percentile(mag, 10, axis=0)
+            if noise_floor is None:
+                noise_floor = block_floor
+            else:
+                noise_floor = floor_smoothing * noise_floor + (1 - floor_smoothing) * block_floor
             
-        return cleaned
+            spec *= mag > noise_floor * gate_scale
+            cleaned = np.fft.irfft(spec, n=n_fft, axis=-1).astype(dtype, copy=False) * window
+            
+            # Overlap-add: frames r, r + overlap, ... tile a contiguous span without overlapping
+            for r in range(min(overlap, f1 - f0)):
+                tiles = cleaned[r::overlap]
+                span = tiles.transpose(0, 2, 1).reshape(-1, n_channels)
+                pos = seg_start + r * hop
+                lo = max(pos, 0)
+                hi = min(pos + len(span), n_samples)
+                if hi > lo:
+                    out[lo:hi] += span[lo - pos:hi - pos]
+        
+        out /= norm
+        return out[:, 0] if mono else out
     except Exception as e:
         logger.error(f"Spectral gate error: {e}")
         return data
@@ -107,26 +152,14 @@ def apply_noise_reduction(data: np.ndarray, sr: int, blend: float = 0.5) -> np.n
         try:
             if len(data.shape) == 1:
                 return nr.reduce_noise(y=data, sr=sr, prop_decrease=blend)
-            else:
-                # Process each channel
-                reduced = np.zeros_like(data)
-                for ch in range(data.shape[1]):
-                    reduced[:, ch] = nr.reduce_noise(y=data[:, ch], sr=sr, prop_decrease=blend)
-                return reduced
+            # noisereduce takes (channels, time) and handles every channel in one pass
+            return nr.reduce_noise(y=data.T, sr=sr, prop_decrease=blend).T
         except Exception as e:
             logger.warning(f"noisereduce failed: {e}, falling back to spectral gate")
             
-    # Fallback
-    if len(data.shape) == 1:
-        cleaned = spectral_gate(data, sr, blend)
-        return data * (1 - blend) + cleaned * blend
-    else:
-        # Process each channel
-        result = data.copy()
-        for ch in range(data.shape[1]):
-            cleaned = spectral_gate(data[:, ch], sr, blend)
-            result[:, ch] = data[:, ch] * (1 - blend) + cleaned * blend
-        return result
+    # Fallback (all channels at once)
+    cleaned = spectral_gate(data, sr, blend)
+    return data * (1 - blend) + cleaned * blend
 
 
 def apply_eq(data: np.ndarray, sr: int, low_gain_db: float, mid_gain_db: float, high_gain_db: float) -> np.ndarray:
@@ -138,13 +171,14 @@ def apply_eq(data: np.ndarray, sr: int, low_gain_db: float, mid_gain_db: float,
         import torch
         import torchaudio
         
-        # Convert to Torch tensor -> Apply EQ -> Convert back to numpy
+        # Share the float32 buffer with torch -> Apply EQ -> Convert back to numpy
         # Handle 1D (time) or 2D (time, channels) inputs appropriately
         original_shape = data.shape
+        tensor = torch.from_numpy(np.asarray(data, dtype=np.float32))
         if len(original_shape) == 1:
-            tensor = torch.tensor(data).float().unsqueeze(0) # (1, time)
+            tensor = tensor.unsqueeze(0) # (1, time)
         else:
-            tensor = torch.tensor(data.T).float()  # (channels, time)
+            tensor = tensor.t()  # (channels, time)
         
         if low_gain_db != 0:
             tensor = torchaudio.functional.equalizer_biquad(tensor, sr, center_freq=100, gain=low_gain_db, Q=1.0)
@@ -165,18 +199,115 @@ def apply_eq(data: np.ndarray, sr: int, low_gain_db: float, mid_gain_db: float,
         return data
 
 
+class Compressor:
+    """
+    Feed-forward envelope-follower compressor / limiter.
+    
+    The gain computer (soft knee, dB domain) is evaluated for a whole block at once
+    on the channel-linked peak level. Gain reduction is smoothed with two one-pole
+    lfilter recursions (attack and release); taking their maximum gives fast
+    attack on rising reduction and slow release on falling reduction.
+    Filter states are carried between calls to `process`, so a file can be fed
+    block by block with the same result as processing it in one go.
+    """
+    
+    def __init__(self, sr: int, threshold_db: float = -18.0, ratio: float = 4.0, attack_ms: float = 10.0,
+                 release_ms: float = 150.0, knee_db: float = 6.0, makeup_db: float = 0.0):
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self.knee_db = knee_db
+        self.makeup_db = makeup_db
+        self.attack_coef = self._time_coef(attack_ms, sr)
+        self.release_coef = self._time_coef(release_ms, sr)
+        self._attack_zi = np.zeros(1)
+        self._release_zi = np.zeros(1)
+    
+    @staticmethod
+    def _time_coef(time_ms: float, sr: int) -> float:
+        if time_ms <= 0:
+            return 0.0
+        return float(np.exp(-1.0 / (time_ms * 0.001 * sr)))
+    
+    def gain_reduction_db(self, level_db: np.ndarray) -> np.ndarray:
+        """Static curve: positive dB of gain reduction for each input level."""
+        slope = 1.0 - 1.0 / self.ratio if np.isfinite(self.ratio) else 1.0
+        over = level_db - self.threshold_db
+        knee = self.knee_db
+        if knee > 0:
+            in_knee = np.abs(over) <= knee / 2
+            reduction = np.where(over > 0, slope * over, 0.0)
+            reduction = np.where(in_knee, slope * (over + knee / 2) ** 2 / (2 * knee), reduction)
+        else:
+            reduction = np.maximum(over, 0.0) * slope
+        return reduction
+    
+    def _smooth(self, target: np.ndarray, coef: float, zi: np.ndarray):
+        if coef == 0.0:
+            return target, zi
+        return lfilter([1.0 - coef], [1.0, -coef], target, zi=zi)
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Compress one (time,) or (time, channels) block, keeping envelope state."""
+        if len(block) == 0:
+            return block
+        peak = np.abs(block) if block.ndim == 1 else np.max(np.abs(block), axis=1)
+        level_db = 20.0 * np.log10(np.maximum(peak, 1e-9))
+        target = self.gain_reduction_db(level_db)
+        
+        fast, self._attack_zi = self._smooth(target, self.attack_coef, self._attack_zi)
+        slow, self._release_zi = self._smooth(target, self.release_coef, self._release_zi)
+        reduction = np.maximum(fast, slow)
+        
+        gain = np.power(10.0, (self.makeup_db - reduction) / 20.0).astype(block.dtype, copy=False)
+        return block * (gain if block.ndim == 1 else gain[:, None])
+    
+    def process_array(self, data: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Run `process` over a whole array in blocks to bound temporary memory."""
+        out = np.empty_like(data)
+        for start in range(0, len(data), block_size):
+            out[start:start + block_size] = self.process(data[start:start + block_size])
+        return out
+
+
+def make_limiter(sr: int, ceiling_db: float = -0.3, release_ms: float = 50.0) -> Compressor:
+    """Brickwall peak limiter (instant attack, infinite ratio, hard knee)."""
+    return Compressor(sr, threshold_db=ceiling_db, ratio=np.inf, attack_ms=0.0,
+                      release_ms=release_ms, knee_db=0.0)
+
+
+def apply_limiter(data: np.ndarray, sr: int, ceiling_db: float = -0.3, release_ms: float = 50.0) -> np.ndarray:
+    """Apply brickwall peak limiting so no sample exceeds `ceiling_db`."""
+    if not SCIPY_AVAILABLE:
+        return np.clip(data, -1.0, 1.0)
+    try:
+        return make_limiter(sr, ceiling_db, release_ms).process_array(data)
+    except Exception as e:
+        logger.warning(f"Limiter failed: {e}")
+        return np.clip(data, -1.0, 1.0)
+
+
 def apply_compressor(data: np.ndarray, sr: int, intensity: float = 0) -> np.ndarray:
-    """Apply soft-knee compression/limiting (Tanh saturation)."""
+    """Apply attack/release compression followed by a peak limiter ("Punch")."""
     if intensity <= 0: return data
     
+    if not SCIPY_AVAILABLE:
+        # Legacy static saturation (no envelope follower without scipy)
+        return np.tanh(data * (1.0 + intensity / 50.0))
+    
     try:
-        # Pre-gain based on intensity
-        pre_gain = 1.0 + (intensity / 50.0) # 1x to 3x gain
-        
-        # Soft clipping (Tanh)
-        compressed = np.tanh(data * pre_gain)
+        # Intensity 0-100 -> threshold 0 to -30 dB, ratio 1:1 to 5:1
+        comp = Compressor(sr, threshold_db=-0.3 * intensity, ratio=1.0 + intensity / 25.0,
+                          attack_ms=10.0, release_ms=150.0)
+        # Auto make-up: recover half of the reduction a full-scale peak would receive
+        comp.makeup_db = float(comp.gain_reduction_db(np.array(0.0))) * 0.5
         
-        return compressed
+        limiter = make_limiter(sr)
+        out = np.empty_like(data)
+        block_size = 65536
+        for start in range(0, len(data), block_size):
+            block = comp.process(data[start:start + block_size])
+            out[start:start + block_size] = limiter.process(block)
+        return out
     except Exception as e:
         logger.warning(f"Compressor failed: {e}")
         return data
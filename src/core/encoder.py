@@ -0,0 +1,102 @@
+"""
+Audio Encoder - lossy formats through an FFmpeg pipe
+Float PCM is streamed from memory into FFmpeg's stdin, so MP3/OGG/AAC
+outputs never go through an intermediate WAV. A bounded pool of encoder
+processes lets several stems encode at the same time.
+"""
+import os
+import shutil
+import threading
+import subprocess
+from typing import Optional
+import numpy as np
+from src.utils.logger import logger
+
+# Output extension -> (FFmpeg codec, default bitrate)
+PIPE_CODECS = {
+    "mp3": ("libmp3lame", "320k"),
+    "ogg": ("libvorbis", "256k"),
+    "m4a": ("aac", "256k"),
+    "aac": ("aac", "256k"),
+}
+
+BITRATES = ["128k", "192k", "256k", "320k"]
+
+# Concurrent FFmpeg processes (each is single-threaded for these codecs)
+MAX_ENCODERS = max(2, (os.cpu_count() or 2) // 2)
+
+_encoder_slots = threading.BoundedSemaphore(MAX_ENCODERS)
+_ffmpeg_path: Optional[str] = None
+
+
+class EncoderError(RuntimeError):
+    """FFmpeg could not encode an output."""
+
+
+def _startupinfo():
+    if os.name != 'nt':
+        return None
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return startupinfo
+
+
+def ffmpeg_available() -> bool:
+    """True if an FFmpeg binary (bundled or on PATH) can be found."""
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        from src.utils.resource_utils import get_ffmpeg_path
+        path = get_ffmpeg_path()
+        _ffmpeg_path = path if os.path.isfile(path) or shutil.which(path) else ""
+    return bool(_ffmpeg_path)
+
+
+def is_pipe_format(ext: str) -> bool:
+    return ext.lower() in PIPE_CODECS
+
+
+def _codec_args(path: str, bitrate: Optional[str]) -> list:
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext not in PIPE_CODECS:
+        raise EncoderError(f"No pipe encoder for .{ext}")
+    codec, default_bitrate = PIPE_CODECS[ext]
+    return ["-c:a", codec, "-b:a", bitrate or default_bitrate]
+
+
+def pcm_command(path: str, sr: int, channels: int, bitrate: Optional[str] = None) -> list:
+    """FFmpeg command line reading raw float32 PCM from stdin."""
+    ffmpeg_available()
+    return [
+        _ffmpeg_path or "ffmpeg", "-y", "-v", "error",
+        "-f", "f32le", "-ar", str(int(sr)), "-ac", str(int(channels)), "-i", "pipe:0",
+        *_codec_args(path, bitrate), path,
+    ]
+
+
+def _run(cmd: list, stdin_data=None):
+    with _encoder_slots:
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, startupinfo=_startupinfo(),
+        )
+        _, stderr = proc.communicate(input=stdin_data)
+    if proc.returncode != 0:
+        raise EncoderError(stderr.decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+
+
+def encode_pcm(data: np.ndarray, sr: int, path: str, bitrate: Optional[str] = None):
+    """Encode a (time,) or (time, channels) float buffer to `path` (format from the extension)."""
+    if not ffmpeg_available():
+        raise EncoderError("FFmpeg not found")
+    if data.ndim == 1:
+        data = data[:, None]
+    pcm = np.ascontiguousarray(data, dtype='<f4')
+    _run(pcm_command(path, sr, pcm.shape[1], bitrate), memoryview(pcm).cast("B"))
+    logger.debug(f"Encoded {os.path.basename(path)} via FFmpeg pipe ({bitrate or 'default bitrate'})")
+
+
+def transcode_file(src: str, path: str, bitrate: Optional[str] = None):
+    """Encode an existing audio file (e.g. a processor's WAV) to `path`."""
+    if not ffmpeg_available():
+        raise EncoderError("FFmpeg not found")
+    _run([_ffmpeg_path, "-y", "-v", "error", "-i", src, *_codec_args(path, bitrate), path])
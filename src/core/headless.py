@@ -0,0 +1,387 @@
+"""
+Headless Runner - separation jobs without the GUI
+Watch mode keeps input folders under observation (see watcher.py) and
+separates every file that settles there with the settings of a preset.
+Outputs and the job manifest go to the same relative folder under an
+output root; finished inputs are recorded in the completed-job index, so a
+restarted runner only picks up what is new. Queued jobs are journaled, and
+the ones a crash interrupted are resumed first on the next start.
+
+Distributed mode puts the jobs in a shared queue folder instead (see
+shared_queue.py): any number of nodes submit to it and work off it, each
+writing a job's outputs into a private staging folder that is renamed into
+place when the job is done.
+"""
+import os
+import sys
+import queue
+import signal
+import shutil
+import argparse
+import threading
+from typing import Iterable, List, Optional, Tuple
+from src.utils.logger import logger
+from src.core.presets import get_preset_names, load_preset, preset_job_options
+from src.core.job_index import CompletedJobIndex, get_job_index, settings_fingerprint
+from src.core.journal import JobJournal, get_journal, job_key, STAGE_QUEUED
+from src.core.watcher import HotFolderWatcher, POLL_INTERVAL, SETTLE_SECONDS
+from src.core.scanner import iter_audio_files
+from src.core.shared_queue import SharedQueue, QueuedJob, Lease, staging_dir, discard_staging, publish
+
+DEFAULT_PRESET = "Full Stems (DJ)"
+
+# Arguments of separate_audio() that aren't passed as options
+POSITIONAL_OPTIONS = ('stem_count', 'quality', 'export_zip', 'keep_original')
+
+
+def _root_of(path: str, folders: Iterable[str]) -> Optional[str]:
+    """Innermost watched folder that contains `path`."""
+    roots = [f for f in folders if os.path.commonpath([f, path]) == f]
+    return max(roots, key=len) if roots else None
+
+
+def mirrored_output_dir(input_file: str, output_root: Optional[str], root: Optional[str] = None) -> str:
+    """
+    "<track> - Stems" next to the input, or at the input's path relative
+    to `root` under `output_root` (mirrored tree).
+    """
+    input_file = os.path.abspath(input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    parent = os.path.dirname(input_file)
+    if output_root is not None:
+        rel = os.path.relpath(parent, root) if root else ""
+        parent = os.path.normpath(os.path.join(os.path.abspath(output_root), rel))
+    return os.path.join(parent, f"{base_name} - Stems")
+
+
+def _expand_inputs(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """(audio file, folder its output path is mirrored from) for files and folders."""
+    inputs = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            inputs.extend((p, path) for p, _, _ in iter_audio_files([path]))
+        else:
+            inputs.append((path, os.path.dirname(path)))
+    return inputs
+
+
+def _preset_options(preset: str) -> dict:
+    settings = load_preset(preset)
+    if settings is None:
+        raise ValueError(f"Unknown preset '{preset}' (available: {', '.join(get_preset_names())})")
+    options = preset_job_options(settings)
+    options["preset"] = preset
+    return options
+
+
+def _install_stop_handlers(request_stop):
+    """
+    SIGTERM and the first Ctrl+C call `request_stop` (the running job is
+    finished first); a second Ctrl+C interrupts the job.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def on_interrupt(*args):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        request_stop(*args)
+        logger.info("Press Ctrl+C again to abort the running job")
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, on_interrupt)
+
+
+class HeadlessRunner:
+    """
+    Runs separation jobs in this process, one after another. Jobs are
+    submitted as (input, output folder, options) to `jobs`.
+    """
+
+    def __init__(self, options: dict, output_root: Optional[str] = None,
+                 index: Optional[CompletedJobIndex] = None, journal: Optional[JobJournal] = None):
+        self.options = dict(options)
+        self.output_root = os.path.abspath(output_root) if output_root else None
+        self.index = index
+        self.journal = journal
+        self.fingerprint = settings_fingerprint(self.options)
+        self.jobs = queue.Queue()
+        self.last_error: Optional[str] = None
+        self._active = set()  # journal keys of queued and running jobs
+        self._lock = threading.Lock()
+
+    def output_dir_for(self, input_file: str, root: Optional[str] = None) -> str:
+        return mirrored_output_dir(input_file, self.output_root, root)
+
+    def pending(self, paths: List[str]) -> List[str]:
+        """`paths` without the inputs already done with these settings."""
+        if self.index is None or not paths:
+            return list(paths)
+        entries = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime_ns))
+        done = self.index.completed(entries, self.fingerprint)
+        if done:
+            logger.info(f"Skipping {len(done)} file(s) already separated with these settings")
+        return [p for p, _, _ in entries if os.path.abspath(p) not in done]
+
+    def submit(self, input_file: str, output_dir: str, options: Optional[dict] = None) -> bool:
+        """Journal and queue a job; False if the same job is already queued or running."""
+        key = job_key(input_file, output_dir)
+        with self._lock:
+            if key in self._active:
+                return False
+            self._active.add(key)
+        options = options or self.options
+        if self.journal is not None:
+            self.journal.enqueue(input_file, output_dir, options, source="headless")
+        self.jobs.put((input_file, output_dir, options))
+        return True
+
+    def resume(self) -> int:
+        """Queue the jobs an earlier run left unfinished, with the settings they started with."""
+        if self.journal is None:
+            return 0
+        resumed = 0
+        for job in self.journal.unfinished(source="headless"):
+            if not os.path.exists(job["input"]):
+                self.journal.remove([job["key"]])
+                continue
+            if self.submit(job["input"], job["output_dir"], job["options"]):
+                resumed += 1
+                if job["stage"] != STAGE_QUEUED:
+                    logger.info(f"Resuming {os.path.basename(job['input'])} after stage '{job['stage']}'")
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished job(s) from the journal")
+        return resumed
+
+    def run_job(self, input_file: str, output_dir: str, options: Optional[dict] = None) -> Optional[str]:
+        """Separate one file. Returns its output folder, or None if the job failed."""
+        from src.core.splitter import separate_audio
+
+        options = options or self.options
+        key = job_key(input_file, output_dir)
+        kwargs = {k: v for k, v in options.items() if k not in POSITIONAL_OPTIONS}
+        if self.journal is not None:
+            kwargs["journal_id"] = key
+        logger.info(f"Headless job: {input_file} -> {output_dir}")
+        try:
+            separate_audio(input_file, output_dir, *(options[k] for k in POSITIONAL_OPTIONS), **kwargs)
+        except Exception as e:
+            logger.error(f"Job failed for {os.path.basename(input_file)}: {e}")
+            self.last_error = str(e)
+            return None
+        finally:
+            with self._lock:
+                self._active.discard(key)
+        if self.index is not None:
+            self.index.record(input_file, settings_fingerprint(options), output_dir)
+        return output_dir
+
+
+def watch(folders: List[str], output_root: Optional[str], preset: str = DEFAULT_PRESET,
+          settle_seconds: float = SETTLE_SECONDS, poll_interval: float = POLL_INTERVAL,
+          use_inotify: bool = True) -> int:
+    """
+    Separate files as they arrive in `folders` until interrupted (Ctrl+C or
+    SIGTERM; a running job is finished first). Returns the number of failed jobs.
+    """
+    options = _preset_options(preset)
+    folders = [os.path.abspath(f) for f in folders]
+    runner = HeadlessRunner(options, output_root, get_job_index(), get_journal())
+    runner.resume()
+    watcher = HotFolderWatcher(folders, settle_seconds, poll_interval, use_inotify=use_inotify)
+
+    def watch_loop():
+        # Keeps debouncing new arrivals while a job is running
+        while not watcher.stopped:
+            try:
+                for path in runner.pending(watcher.poll()):
+                    runner.submit(path, runner.output_dir_for(path, _root_of(path, folders)))
+            except Exception as e:
+                logger.error(f"Watcher error: {e}")
+
+    def request_stop(*_):
+        logger.info("Stopping watch mode after the current job")
+        watcher.stop()
+
+    _install_stop_handlers(request_stop)
+    thread = threading.Thread(target=watch_loop, name="hot-folder", daemon=True)
+    thread.start()
+    logger.info(f"Watch mode: preset '{preset}', outputs to {runner.output_root or 'input folders'}")
+
+    done = failed = 0
+    try:
+        while not watcher.stopped:
+            try:
+                job = runner.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if runner.run_job(*job) is None:
+                failed += 1
+            else:
+                done += 1
+    except KeyboardInterrupt:
+        request_stop()
+    finally:
+        watcher.stop()
+        thread.join()
+        watcher.close()
+    logger.info(f"Watch mode ended: {done} job(s) done, {failed} failed, {runner.jobs.qsize()} left queued")
+    return failed
+
+
+def run_claimed(runner: HeadlessRunner, shared: SharedQueue, job: QueuedJob, lease: Lease) -> bool:
+    """Run a job claimed from the shared queue and publish its outputs. True if it succeeded."""
+    staging = staging_dir(job.output_dir, shared.node)
+    # Whatever nodes that held this job before (and died) left behind
+    discard_staging(job.output_dir, keep=staging)
+    if runner.journal is not None:
+        # Same node restarted: resume from the stage its last run reached
+        runner.journal.enqueue(job.input, staging, job.options, source="queue")
+
+    if runner.run_job(job.input, staging, job.options) is None:
+        if not shared.retry(job, lease, runner.last_error or "separation failed"):
+            discard_staging(job.output_dir)
+        return False
+    if lease.lost or not lease.held():
+        # Another node took the job over meanwhile; its outputs will be published instead
+        logger.warning(f"Lease on {os.path.basename(job.input)} lost, discarding this node's outputs")
+        shutil.rmtree(staging, ignore_errors=True)
+        if os.path.exists(f"{staging}.zip"):
+            os.remove(f"{staging}.zip")
+        lease.release()
+        return False
+    publish(staging, job.output_dir)
+    shared.complete(job, lease)
+    return True
+
+
+def work(shared: SharedQueue, runner: HeadlessRunner, stop: threading.Event, drain: bool = False,
+         poll_interval: float = POLL_INTERVAL) -> Tuple[int, int]:
+    """Claim and run jobs until `stop` is set (or, with `drain`, nothing is left to claim)."""
+    done = failed = 0
+    while not stop.is_set():
+        claimed = shared.claim()
+        if claimed is None:
+            if drain:
+                break
+            stop.wait(poll_interval)
+            continue
+        if run_claimed(runner, shared, *claimed):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def distribute(queue_dir: str, node: Optional[str] = None, submit: Optional[List[str]] = None,
+               watch_folders: Optional[List[str]] = None, output_root: Optional[str] = None,
+               preset: str = DEFAULT_PRESET, run_jobs: bool = False, drain: bool = False,
+               settle_seconds: float = SETTLE_SECONDS, poll_interval: float = POLL_INTERVAL,
+               use_inotify: bool = True) -> int:
+    """
+    Distributed mode on a shared queue folder: submit files, watch folders
+    into the queue and/or work off it. Returns the number of failed jobs.
+    """
+    shared = SharedQueue(queue_dir, node)
+    options = _preset_options(preset) if (submit or watch_folders) else None
+    if submit:
+        shared.submit([(p, mirrored_output_dir(p, output_root, root)) for p, root in _expand_inputs(submit)], options)
+
+    stop = threading.Event()
+    watcher = thread = None
+    if watch_folders:
+        folders = [os.path.abspath(f) for f in watch_folders]
+        watcher = HotFolderWatcher(folders, settle_seconds, poll_interval, use_inotify=use_inotify)
+
+        def watch_loop():
+            while not watcher.stopped:
+                try:
+                    ready = watcher.poll()
+                    if ready:
+                        shared.submit([(p, mirrored_output_dir(p, output_root, _root_of(p, folders)))
+                                       for p in ready], options)
+                except Exception as e:
+                    logger.error(f"Watcher error: {e}")
+
+        thread = threading.Thread(target=watch_loop, name="hot-folder", daemon=True)
+        thread.start()
+
+    def request_stop(*_):
+        logger.info(f"Stopping node {shared.node} after the current job")
+        stop.set()
+        if watcher is not None:
+            watcher.stop()
+
+    _install_stop_handlers(request_stop)
+    logger.info(f"Node {shared.node} on queue {shared.root}: {shared.counts()}")
+
+    done = failed = 0
+    try:
+        if run_jobs:
+            # Outputs are tracked in the queue's done/ folder, not the local job index
+            runner = HeadlessRunner({}, journal=get_journal())
+            done, failed = work(shared, runner, stop, drain, poll_interval)
+        elif watcher is not None:
+            while not stop.wait(0.5):
+                pass
+    except KeyboardInterrupt:
+        request_stop()
+    finally:
+        if watcher is not None:
+            watcher.stop()
+            thread.join()
+            watcher.close()
+    logger.info(f"Node {shared.node} stopped: {done} job(s) done, {failed} failed; queue {shared.counts()}")
+    return failed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="BeatDeStack", description="Run separation jobs without the GUI.")
+    parser.add_argument("--watch", nargs="+", metavar="DIR",
+                        help="input folders to watch for new audio files")
+    parser.add_argument("--output", metavar="DIR",
+                        help="output root; outputs mirror the input tree (default: next to each input)")
+    parser.add_argument("--preset", default=DEFAULT_PRESET, help=f"preset to use (default: {DEFAULT_PRESET})")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help="seconds between folder rescans when polling")
+    parser.add_argument("--polling", action="store_true", help="always poll, even where inotify is available")
+
+    distributed = parser.add_argument_group("distributed mode (several nodes sharing one queue folder)")
+    distributed.add_argument("--queue", metavar="DIR",
+                             help="shared queue folder; --watch and --submit add jobs to it instead of running them")
+    distributed.add_argument("--submit", nargs="+", metavar="PATH", help="queue these audio files / folders")
+    distributed.add_argument("--work", action="store_true", help="run jobs from the queue until stopped")
+    distributed.add_argument("--drain", action="store_true", help="with --work: exit when nothing is left to claim")
+    distributed.add_argument("--node", help="name of this node in the queue (default: host name)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.queue is None and (args.submit or args.work):
+        parser.error("--submit and --work need --queue")
+    if args.queue is None and not args.watch:
+        parser.error("nothing to do: give --watch, or --queue with --submit/--watch/--work")
+    if args.queue is not None and not (args.submit or args.watch or args.work):
+        parser.error("--queue needs --submit, --watch or --work")
+    try:
+        if args.queue is not None:
+            failed = distribute(args.queue, args.node, args.submit, args.watch, args.output, args.preset,
+                                args.work, args.drain, args.settle, args.poll_interval,
+                                use_inotify=not args.polling)
+        else:
+            failed = watch(args.watch, args.output, args.preset, args.settle, args.poll_interval,
+                           use_inotify=not args.polling)
+    except ValueError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
@@ -0,0 +1,170 @@
+"""
+Completed Job Index - which inputs were already separated with which settings
+Finished jobs are recorded in SQLite under the input's content and a
+fingerprint of the options that shape the outputs. Folder scans look files
+up by path + size + mtime first (no I/O beyond the scan's own stat), with
+the quick content hash as fallback for renamed or moved files (copies,
+whose original still exists, get their own outputs). A known path whose
+size or mtime changed counts as changed.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Iterable, Optional, Set, Tuple
+from src.utils.logger import logger
+from src.utils.hashing import quick_content_hash
+
+INDEX_FILENAME = "completed_jobs.sqlite3"
+
+# Bump when the pipeline's outputs change so old entries no longer count
+INDEX_VERSION = 1
+
+# Options that don't change what a job writes
+FINGERPRINT_IGNORED = {"output_dir", "scratch_tmpfs", "export_midi", "jobs", "journal_id"}
+
+_LOOKUP_CHUNK = 500
+
+
+def _get_index_path() -> str:
+    """Index database lives next to the user presets (like the analysis cache)."""
+    from src.core.presets import _get_presets_dir
+    return os.path.join(_get_presets_dir(), INDEX_FILENAME)
+
+
+def settings_fingerprint(options: dict) -> str:
+    """Stable short hash of the job options that affect its outputs."""
+    relevant = {k: v for k, v in options.items() if k not in FINGERPRINT_IGNORED}
+    blob = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.blake2b(f"{INDEX_VERSION}:{blob}".encode(), digest_size=12).hexdigest()
+
+
+class CompletedJobIndex:
+    """Thread-safe SQLite store of finished jobs."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or _get_index_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completed (
+                path TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                output_dir TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (path, fingerprint)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completed_hash ON completed (content_hash, size, fingerprint)"
+        )
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, path: str, fingerprint: str, output_dir: str):
+        """Mark `path` as separated with these settings into `output_dir`."""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            content_hash = quick_content_hash(path)
+        except OSError as e:
+            logger.debug(f"Job index: cannot stat {path}: {e}")
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, fingerprint, st.st_size, st.st_mtime_ns, content_hash,
+                 os.path.abspath(output_dir), time.time()),
+            )
+            self._conn.commit()
+
+    def completed(self, entries: Iterable[Tuple[str, int, int]], fingerprint: str) -> Set[str]:
+        """
+        Paths among (path, size, mtime_ns) entries that are already done with
+        this fingerprint and whose outputs still exist.
+        """
+        entries = [(os.path.abspath(p), size, mtime) for p, size, mtime in entries]
+        rows = {}
+        with self._lock:
+            for i in range(0, len(entries), _LOOKUP_CHUNK):
+                chunk = [p for p, _, _ in entries[i:i + _LOOKUP_CHUNK]]
+                marks = ",".join("?" * len(chunk))
+                cur = self._conn.execute(
+                    f"SELECT path, size, mtime_ns, output_dir FROM completed "
+                    f"WHERE fingerprint = ? AND path IN ({marks})",
+                    [fingerprint, *chunk],
+                )
+                for path, size, mtime_ns, output_dir in cur:
+                    rows[path] = (size, mtime_ns, output_dir)
+
+        done = set()
+        for path, size, mtime_ns in entries:
+            row = rows.get(path)
+            if row is not None:
+                # Edited in place (the quick hash only samples head and tail): process again
+                if row[:2] == (size, mtime_ns) and os.path.isdir(row[2]):
+                    done.add(path)
+                continue
+            if self._has_hash_match(path, size, fingerprint):
+                # Renamed or moved: done if the content matches and the old path is gone
+                if self._rekey_by_hash(path, size, mtime_ns, fingerprint):
+                    done.add(path)
+        return done
+
+    def _has_hash_match(self, path, size, fingerprint) -> bool:
+        """Cheap pre-check before hashing: any finished job with this size and settings?"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM completed WHERE size = ? AND fingerprint = ? LIMIT 1", (size, fingerprint)
+            ).fetchone() is not None
+
+    def _rekey_by_hash(self, path, size, mtime_ns, fingerprint) -> bool:
+        try:
+            content_hash = quick_content_hash(path)
+        except OSError:
+            return False
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, output_dir FROM completed WHERE content_hash = ? AND size = ? AND fingerprint = ? "
+                "ORDER BY updated DESC",
+                (content_hash, size, fingerprint),
+            ).fetchall()
+            # Only a move counts: a copy (the original still exists) needs its own outputs
+            moved = next((r for r in rows if not os.path.exists(r[0]) and os.path.isdir(r[1])), None)
+            if moved is None:
+                return False
+            # Re-key under the current path/stat so the next scan is a fast hit
+            self._conn.execute("DELETE FROM completed WHERE path = ? AND fingerprint = ?", (moved[0], fingerprint))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, fingerprint, size, mtime_ns, content_hash, moved[1], time.time()),
+            )
+            self._conn.commit()
+        return True
+
+
+_index_instance: Optional[CompletedJobIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_job_index() -> Optional[CompletedJobIndex]:
+    """Shared index instance (None if the database cannot be opened)."""
+    global _index_instance
+    with _index_lock:
+        if _index_instance is None:
+            try:
+                _index_instance = CompletedJobIndex()
+            except Exception as e:
+                logger.warning(f"Completed job index unavailable: {e}")
+                return None
+        return _index_instance
@@ -0,0 +1,311 @@
+"""
+Job Journal - durable record of queued and running jobs
+Every job is journaled in SQLite (WAL) with its options, the last stage it
+reached, the outputs written so far and the duplicate inputs waiting for
+its outputs, so a queue survives a crash of the app or the machine. A resumed job that got past separation reads the model
+outputs saved in its output folder instead of running the models again, and
+outputs that are already on disk are not written a second time. Model
+outputs are only saved when scratch shares the output folder's volume
+(moving them is a rename); with scratch on tmpfs or another disk, a crash
+after separation runs the models again.
+"""
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+from src.utils.logger import logger
+from src.core.job_index import settings_fingerprint
+
+JOURNAL_FILENAME = "job_journal.sqlite3"
+
+# Model outputs of a separated job are kept here (inside its output folder) until it is done
+RESUME_DIRNAME = ".bds_resume"
+
+# Pipeline stages, in order
+STAGE_QUEUED = "queued"
+STAGE_SEPARATED = "separated"
+STAGE_WRITTEN = "written"
+STAGE_DONE = "done"
+STAGES = (STAGE_QUEUED, STAGE_SEPARATED, STAGE_WRITTEN, STAGE_DONE)
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+# Finished jobs are kept this long as history
+DONE_RETENTION_DAYS = 30
+
+
+def _get_journal_path() -> str:
+    """Journal database lives next to the user presets (like the job index)."""
+    from src.core.presets import _get_presets_dir
+    return os.path.join(_get_presets_dir(), JOURNAL_FILENAME)
+
+
+def _same_volume(path: str, other: str) -> bool:
+    """Whether `path` and `other` (or its nearest existing parent) are on the same filesystem."""
+    other = os.path.abspath(other)
+    while not os.path.exists(other) and os.path.dirname(other) != other:
+        other = os.path.dirname(other)
+    try:
+        return os.stat(path).st_dev == os.stat(other).st_dev
+    except OSError:
+        return False
+
+
+def job_key(input_file: str, output_dir: str) -> str:
+    """Journal id of a job: the same input into the same folder is the same job."""
+    blob = f"{os.path.abspath(input_file)}\0{os.path.abspath(output_dir)}"
+    return hashlib.blake2b(blob.encode(), digest_size=12).hexdigest()
+
+
+class JobJournal:
+    """Thread- and process-safe SQLite store of jobs and their progress."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or _get_journal_path()
+        self._lock = threading.Lock()
+        # The GUI and its worker processes write to the same journal
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                input TEXT NOT NULL,
+                output_dir TEXT NOT NULL,
+                source TEXT NOT NULL,
+                options TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                state TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                outputs TEXT NOT NULL,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                duplicates TEXT NOT NULL DEFAULT '[]'
+            )
+        """)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "duplicates" not in columns:
+            # Journals written before duplicates were tracked
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN duplicates TEXT NOT NULL DEFAULT '[]'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, source, created)")
+        self._conn.execute("DELETE FROM jobs WHERE state = ? AND updated < ?",
+                           (STATE_DONE, time.time() - DONE_RETENTION_DAYS * 86400))
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cur
+
+    def enqueue(self, input_file: str, output_dir: str, options: dict, source: str = "gui") -> str:
+        """
+        Journal a job (or requeue a known one). A job that was interrupted
+        with the same settings keeps its progress; with other settings it
+        starts over.
+        """
+        key = job_key(input_file, output_dir)
+        fingerprint = settings_fingerprint(options)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint, state, duplicates FROM jobs WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None and row["fingerprint"] == fingerprint and row["state"] != STATE_DONE:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, source = ?, options = ?, error = NULL, updated = ? WHERE key = ?",
+                    (STATE_QUEUED, source, json.dumps(options, default=str), now, key),
+                )
+            else:
+                # Duplicates are the same audio whatever the settings: they stay attached
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+                    (key, os.path.abspath(input_file), os.path.abspath(output_dir), source,
+                     json.dumps(options, default=str), fingerprint, STATE_QUEUED, STAGE_QUEUED, "{}", now, now,
+                     row["duplicates"] if row is not None else "[]"),
+                )
+            self._conn.commit()
+        if row is not None and row["fingerprint"] != fingerprint:
+            # Saved model outputs were made with other settings
+            shutil.rmtree(os.path.join(output_dir, RESUME_DIRNAME), ignore_errors=True)
+        return key
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def unfinished(self, source: Optional[str] = None) -> List[dict]:
+        """Jobs that were queued or running when the journal was last written, oldest first."""
+        sql = "SELECT * FROM jobs WHERE state IN (?, ?)"
+        params = [STATE_QUEUED, STATE_RUNNING]
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY created", params).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def start(self, key: str):
+        self._execute("UPDATE jobs SET state = ?, updated = ? WHERE key = ?", (STATE_RUNNING, time.time(), key))
+
+    def reach(self, key: str, stage: str):
+        self._execute("UPDATE jobs SET stage = ?, updated = ? WHERE key = ?", (stage, time.time(), key))
+
+    def add_output(self, key: str, rel: str, record: dict):
+        """Journal one written output (read-modify-write under the SQLite write lock)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT outputs FROM jobs WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    outputs = json.loads(row["outputs"])
+                    outputs[rel] = record
+                    self._conn.execute("UPDATE jobs SET outputs = ?, updated = ? WHERE key = ?",
+                                       (json.dumps(outputs, default=float), time.time(), key))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def set_duplicates(self, key: str, paths: Iterable[str]):
+        """Inputs with the same audio as this job's; they get its outputs once it is done."""
+        self._execute("UPDATE jobs SET duplicates = ?, updated = ? WHERE key = ?",
+                      (json.dumps([os.path.abspath(p) for p in paths]), time.time(), key))
+
+    def finish(self, key: str):
+        self._execute("UPDATE jobs SET state = ?, stage = ?, error = NULL, updated = ? WHERE key = ?",
+                      (STATE_DONE, STAGE_DONE, time.time(), key))
+
+    def fail(self, key: str, error: str):
+        """Mark a job failed; a retry runs the models again (written outputs are still reused)."""
+        self._execute("UPDATE jobs SET state = ?, stage = ?, error = ?, updated = ? WHERE key = ?",
+                      (STATE_FAILED, STAGE_QUEUED, str(error), time.time(), key))
+
+    def remove(self, keys: Iterable[str]):
+        """Forget jobs (removed from the queue by the user)."""
+        keys = list(keys)
+        with self._lock:
+            self._conn.executemany("DELETE FROM jobs WHERE key = ?", [(k,) for k in keys])
+            self._conn.commit()
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["options"] = json.loads(job["options"])
+    job["outputs"] = json.loads(job["outputs"])
+    job["duplicates"] = json.loads(job["duplicates"])
+    return job
+
+
+class JournaledJob:
+    """
+    The pipeline's handle on its journal entry: stage checks, the saved
+    model outputs and the outputs written so far.
+    """
+
+    def __init__(self, journal: JobJournal, key: str, output_dir: str):
+        self.journal = journal
+        self.key = key
+        self.output_dir = output_dir
+        self.checkpoint_dir = os.path.join(output_dir, RESUME_DIRNAME)
+        job = journal.get(key) or {}
+        self.stage = job.get("stage", STAGE_QUEUED)
+        self._outputs: Dict[str, dict] = job.get("outputs", {})
+
+    def reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+    def reach(self, stage: str):
+        self.stage = stage
+        self.journal.reach(self.key, stage)
+
+    def separated_root(self, models: List[str], base_name: str) -> Optional[str]:
+        """Folder with the saved model outputs if separation is done, else None."""
+        if not self.reached(STAGE_SEPARATED):
+            return None
+        for model_name in models:
+            if not os.path.isdir(os.path.join(self.checkpoint_dir, model_name, base_name)):
+                logger.warning(f"Saved model outputs missing for {model_name}, separating again")
+                return None
+        return self.checkpoint_dir
+
+    def save_separation(self, temp_root: str, models: List[str], base_name: str) -> Optional[str]:
+        """
+        Move the model outputs out of the scratch workspace and mark the job
+        separated. Only done when that is a rename: with scratch on another
+        volume (tmpfs, BEATDESTACK_SCRATCH_DIR) nothing is saved and None is
+        returned, so the outputs are read from scratch.
+        """
+        if not _same_volume(temp_root, self.output_dir):
+            logger.debug("Scratch is on another volume, model outputs are not checkpointed")
+            return None
+        for model_name in models:
+            src = os.path.join(temp_root, model_name, base_name)
+            if not os.path.isdir(src):
+                continue
+            dst = os.path.join(self.checkpoint_dir, model_name, base_name)
+            shutil.rmtree(dst, ignore_errors=True)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.move(src, dst)
+        self.reach(STAGE_SEPARATED)
+        return self.checkpoint_dir
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(path, self.output_dir).replace(os.sep, "/")
+
+    def written(self, path: str) -> Optional[dict]:
+        """Journal record of an output written by an earlier run, if the file is unchanged since."""
+        record = self._outputs.get(self._rel(path))
+        if record is None:
+            return None
+        try:
+            st = os.stat(os.path.join(self.output_dir, record["written"]))
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (record["size"], record["mtime_ns"]):
+            return None
+        return record
+
+    def record_output(self, path: str, written: str, name: str, entry: dict):
+        """Journal an output: `path` is where it was meant to go, `written` where it went."""
+        try:
+            st = os.stat(written)
+        except OSError:
+            return
+        record = {"written": self._rel(written), "name": name, "entry": entry,
+                  "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        self._outputs[self._rel(path)] = record
+        self.journal.add_output(self.key, self._rel(path), record)
+
+    def clear_checkpoint(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+
+_journal_instance: Optional[JobJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> Optional[JobJournal]:
+    """Shared journal instance (None if the database cannot be opened)."""
+    global _journal_instance
+    with _journal_lock:
+        if _journal_instance is None:
+            try:
+                _journal_instance = JobJournal()
+            except Exception as e:
+                logger.warning(f"Job journal unavailable: {e}")
+                return None
+        return _journal_instance
@@ -0,0 +1,91 @@
+"""
+Job Manifest - per-job JSON record of every output file
+Written into the output folder at the end of a job, with per-stem loudness
+statistics gathered while the stems were being written.
+"""
+import os
+import json
+import time
+from typing import Optional
+from src.utils.logger import logger
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class JobManifest:
+    """
+    Collects outputs of one job and saves them as `manifest.json`.
+
+    Outputs are keyed by their path relative to the output folder, so
+    re-adding a file (e.g. after enhancement replaced it) updates its entry.
+    """
+
+    def __init__(self, output_dir: str, input_file: str, options: Optional[dict] = None):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.data = {
+            "version": MANIFEST_VERSION,
+            "input": os.path.abspath(input_file),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "options": _json_safe(options or {}),
+            "outputs": {},
+        }
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(path, self.output_dir).replace(os.sep, "/")
+
+    def add_output(self, path: str, stem: str, **stats):
+        """Record (or update) one output file with its statistics."""
+        self.data["outputs"][self._key(path)] = {"stem": stem, **stats}
+
+    def rename(self, old_path: str, new_path: str):
+        """Follow an output that was renamed after it was recorded."""
+        entry = self.data["outputs"].pop(self._key(old_path), None)
+        if entry is not None:
+            self.data["outputs"][self._key(new_path)] = entry
+
+    def annotate(self, section: str, info: dict):
+        """Attach job-level information (e.g. what silence skipping saved)."""
+        self.data[section] = info
+
+    def outputs(self) -> dict:
+        return self.data["outputs"]
+
+    def save(self) -> Optional[str]:
+        """Write the manifest atomically; entries whose file is gone are dropped."""
+        self.data["outputs"] = {
+            k: v for k, v in self.data["outputs"].items()
+            if os.path.exists(os.path.join(self.output_dir, k))
+        }
+        self.data["completed"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp, self.path)
+            logger.info(f"Wrote job manifest ({len(self.data['outputs'])} outputs): {self.path}")
+            return self.path
+        except OSError as e:
+            logger.warning(f"Failed to write job manifest: {e}")
+            return None
+
+
+def load_manifest(output_dir: str) -> Optional[dict]:
+    """Read the manifest of a finished job (None if missing or unreadable)."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _json_safe(options: dict) -> dict:
+    """Keep only plain values so the options block always serializes."""
+    safe = {}
+    for key, value in options.items():
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            safe[key] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(v, (str, int, float, bool)) for v in value):
+            safe[key] = list(value)
+    return safe
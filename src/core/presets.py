@@ -5,6 +5,7 @@ import os
 import json
 from typing import List, Dict, Optional, Any, Union
 from src.utils.logger import logger
+from src.core import constants
 
 # Default preset storage location
 def _get_presets_dir() -> str:
@@ -77,6 +78,21 @@ DEFAULT_PRESETS: Dict[str, Dict[str, Any]] = {
 }
 
 
+# Mode labels stored in presets -> splitter modes
+PRESET_MODES = {
+    "Standard": constants.MODE_STANDARD,
+    "Vocals Only": constants.MODE_VOCALS,
+    "Instrumental": constants.MODE_INSTRUMENTAL,
+    "Drums Only": constants.MODE_DRUMS,
+    "Bass Only": constants.MODE_BASS,
+    "Guitar Only": constants.MODE_GUITAR,
+    "Piano Only": constants.MODE_PIANO,
+}
+
+# Enhancements some presets store as on/off are applied at this intensity
+PRESET_ENHANCE_ON = 50
+
+
 def get_preset_names() -> List[str]:
     """Get list of all available preset names (built-in + user)."""
     names = list(DEFAULT_PRESETS.keys())
@@ -114,6 +130,35 @@ def load_preset(name: str) -> Optional[Dict[str, Any]]:
     return None
 
 
+def preset_job_options(preset: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Separation options for a preset, in the form the splitter takes them
+    (used where there are no panels to apply the preset to, e.g. watch mode).
+    """
+    def intensity(value):
+        if isinstance(value, bool):
+            return PRESET_ENHANCE_ON if value else 0
+        return int(value or 0)
+
+    mode = preset.get("mode", "Standard")
+    return {
+        "stem_count": int(preset.get("stem_count", 4)),
+        "mode": PRESET_MODES.get(mode, mode),
+        "quality": int(preset.get("quality", 1)),
+        "export_zip": bool(preset.get("export_zip", False)),
+        "keep_original": False,
+        "format": preset.get("format", "WAV"),
+        "sample_rate": int(preset.get("sample_rate", 44100)),
+        "bit_depth": preset.get("bit_depth", "16-bit"),
+        "bitrate": preset.get("bitrate", "320k"),
+        "extra_formats": list(preset.get("extra_formats", [])),
+        "output_layout": preset.get("output_layout", "files"),
+        "filename_pattern": preset.get("filename_pattern", "{stem}"),
+        "dereverb": intensity(preset.get("dereverb")),
+        "denoise": intensity(preset.get("denoise")),
+    }
+
+
 def save_preset(name: str, settings: Dict[str, Any]) -> bool:
     """
     Save a user preset.
@@ -11,7 +11,9 @@ def create_preview_slice(input_path, output_path, duration=30.0, start_time=None
         input_path (str): Path to source audio.
         output_path (str): Path to save the slice.
         duration (float): Duration in seconds.
-        start_time (float, optional): Start position in seconds. If None, slices from the middle.
+        start_time (float, optional): Start position in seconds. If None, slices from the
+            first drop (when the track has a stored beat grid) or from the middle.
+            With a beat grid, the start is snapped to the nearest downbeat.
         
     Returns:
         bool: True if successful, False otherwise.
@@ -23,6 +25,21 @@ def create_preview_slice(input_path, output_path, duration=30.0, start_time=None
         total_frames = info.frames
         total_duration = total_frames / sr
         
+        # Stored beat grid, if the track has been analyzed (never computed here)
+        grid = None
+        try:
+            from src.core.beatgrid import load_beat_grid, find_section, snap_to_downbeat
+            grid = load_beat_grid(input_path)
+        except Exception as e:
+            logger.debug(f"No beat grid for preview: {e}")
+        if grid is not None:
+            if start_time is None:
+                drop = find_section(grid, "drop")
+                if drop is not None:
+                    start_time = drop["start"]
+            if start_time is not None:
+                start_time = snap_to_downbeat(grid, start_time)
+        
         # Determine start point
         # If song is shorter than duration, use whole song
         if total_duration <= duration:
@@ -40,7 +57,7 @@ def create_preview_slice(input_path, output_path, duration=30.0, start_time=None
             
         # Read and Write
         # sf.read handles seeking efficiently
-        data, samplerate = sf.read(input_path, start=start_frame, stop=start_frame + frames_to_read)
+        data, samplerate = sf.read(input_path, start=start_frame, stop=start_frame + frames_to_read, dtype='float32')
         
         # Save
         sf.write(output_path, data, samplerate)
@@ -0,0 +1,184 @@
+"""
+Resampling Service
+Polyphase sample-rate conversion with filter kernels cached per rate pair
+and quality mode. Stems are converted as one batch; the streaming variant
+can be fed block by block and matches resampling the whole signal at once.
+"""
+import math
+import threading
+from typing import List, Tuple
+import numpy as np
+from src.utils.logger import logger
+
+try:
+    from scipy.signal import resample_poly, firwin
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+    logger.warning("scipy not installed. Streaming resampling unavailable.")
+
+# Quality mode -> (filter zero crossings per side, Kaiser beta).
+# 'balanced' is scipy's resample_poly default design.
+RESAMPLE_QUALITIES = {
+    "fast": (4, 5.0),
+    "balanced": (10, 5.0),
+    "hq": (32, 9.0),
+}
+DEFAULT_QUALITY = "balanced"
+
+_kernel_cache: dict = {}  # {(orig_sr, target_sr, quality): (up, down, taps)}
+_kernel_lock = threading.Lock()
+
+
+def get_kernel(orig_sr: int, target_sr: int, quality: str = DEFAULT_QUALITY) -> Tuple[int, int, np.ndarray]:
+    """(up, down, FIR taps) for a rate pair, designed once per process."""
+    if quality not in RESAMPLE_QUALITIES:
+        logger.warning(f"Unknown resample quality '{quality}', using {DEFAULT_QUALITY}")
+        quality = DEFAULT_QUALITY
+    key = (int(orig_sr), int(target_sr), quality)
+    with _kernel_lock:
+        kernel = _kernel_cache.get(key)
+        if kernel is None:
+            g = math.gcd(int(orig_sr), int(target_sr))
+            up, down = int(target_sr) // g, int(orig_sr) // g
+            zeros, beta = RESAMPLE_QUALITIES[quality]
+            max_rate = max(up, down)
+            taps = firwin(2 * zeros * max_rate + 1, 1.0 / max_rate, window=('kaiser', beta))
+            kernel = (up, down, taps)
+            _kernel_cache[key] = kernel
+        return kernel
+
+
+def resample(data: np.ndarray, orig_sr: int, target_sr: int, quality: str = DEFAULT_QUALITY,
+             axis: int = 0) -> np.ndarray:
+    """Resample a float buffer along `axis` (time) with a cached kernel."""
+    if int(orig_sr) == int(target_sr):
+        return data
+    up, down, taps = get_kernel(orig_sr, target_sr, quality)
+    return resample_poly(data, up, down, axis=axis, window=taps).astype(np.float32, copy=False)
+
+
+def resample_stems(stems: List, orig_sr: int, target_sr: int, quality: str = DEFAULT_QUALITY) -> List:
+    """
+    Resample (channels, time) stems (torch tensors or numpy arrays) as one
+    batch: all channels are stacked and filtered in a single call.
+    """
+    if not stems or int(orig_sr) == int(target_sr):
+        return stems
+    import torch
+    is_torch = isinstance(stems[0], torch.Tensor)
+    arrays = [s.detach().cpu().numpy() if is_torch else s for s in stems]
+    length = min(a.shape[1] for a in arrays)
+    batch = np.concatenate([a[:, :length] for a in arrays])
+    out = resample(batch, orig_sr, target_sr, quality, axis=1)
+    parts = np.split(out, np.cumsum([a.shape[0] for a in arrays])[:-1])
+    logger.debug(f"Resampled {len(stems)} stems {orig_sr}Hz -> {target_sr}Hz ({quality})")
+    return [torch.from_numpy(np.ascontiguousarray(p)) for p in parts] if is_torch else parts
+
+
+class StreamingResampler:
+    """
+    Block-wise polyphase resampler for (time, channels) float32 audio.
+
+    Keeps a short tail of input (the filter support, aligned to the decimation
+    factor) between calls so every emitted sample sees exactly the same input
+    as a whole-file `resample_poly` would.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int, quality: str = DEFAULT_QUALITY):
+        self.orig_sr = int(orig_sr)
+        self.target_sr = int(target_sr)
+        self.up, self.down, self._taps = get_kernel(orig_sr, target_sr, quality)
+        # The FIR spans len(taps) // 2 taps per side in the upsampled domain
+        self._margin = math.ceil((len(self._taps) // 2) / self.up) + 1
+        self._buf = None
+        self._buf_start = 0  # absolute input index of _buf[0], always a multiple of `down`
+        self._n_in = 0
+        self._n_out = 0
+
+    @property
+    def passthrough(self) -> bool:
+        return self.up == self.down
+
+    def _resample(self, data: np.ndarray) -> np.ndarray:
+        return resample_poly(data, self.up, self.down, axis=0, window=self._taps).astype(np.float32, copy=False)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Feed one (time, channels) block; returns whatever output is now final."""
+        if self.passthrough:
+            return block
+
+        self._buf = block if self._buf is None else np.concatenate([self._buf, block])
+        self._n_in += len(block)
+
+        n_end = (self._n_in - self._margin) * self.up // self.down
+        if n_end <= self._n_out:
+            return np.zeros((0, block.shape[1]), dtype=np.float32)
+
+        offset = self._buf_start * self.up // self.down
+        out = self._resample(self._buf)[self._n_out - offset:n_end - offset]
+        self._n_out = n_end
+
+        # Drop input no longer needed by any future output sample
+        keep_from = self._n_out * self.down // self.up - self._margin
+        keep_from -= keep_from % self.down
+        if keep_from > self._buf_start:
+            self._buf = self._buf[keep_from - self._buf_start:]
+            self._buf_start = keep_from
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Emit the remaining output (end of stream is zero-padded like resample_poly)."""
+        if self.passthrough or self._buf is None:
+            return np.zeros((0, 0 if self._buf is None else self._buf.shape[1]), dtype=np.float32)
+
+        total_out = -(-self._n_in * self.up // self.down)
+        offset = self._buf_start * self.up // self.down
+        out = self._resample(self._buf)[self._n_out - offset:total_out - offset]
+        self._n_out = total_out
+        self._buf = None
+        return out
+
+
+class ResampledBlockReader:
+    """
+    Reads an audio file in blocks (`sf.blocks`) converted to `target_sr`,
+    handing out exactly the number of frames asked for so two sources can be
+    consumed in aligned chunks.
+    """
+
+    def __init__(self, path: str, target_sr: int, block_size: int = 65536, quality: str = DEFAULT_QUALITY):
+        import soundfile as sf
+        info = sf.info(path)
+        self.channels = info.channels
+        self._blocks = sf.blocks(path, blocksize=block_size, dtype='float32', always_2d=True)
+        self._resampler = StreamingResampler(info.samplerate, target_sr, quality)
+        self._pending = []
+        self._pending_frames = 0
+        self._exhausted = False
+        if not self._resampler.passthrough:
+            logger.info(f"Streaming resample {info.samplerate}Hz -> {target_sr}Hz for {path}")
+
+    def _pull(self):
+        try:
+            chunk = self._resampler.process(next(self._blocks))
+        except StopIteration:
+            chunk = self._resampler.flush()
+            self._exhausted = True
+        if len(chunk):
+            self._pending.append(chunk)
+            self._pending_frames += len(chunk)
+
+    def read(self, frames: int) -> np.ndarray:
+        """Return up to `frames` frames; fewer (or zero) only at end of file."""
+        while self._pending_frames < frames and not self._exhausted:
+            self._pull()
+
+        data = np.concatenate(self._pending) if self._pending else np.zeros((0, self.channels), dtype=np.float32)
+        out, rest = data[:frames], data[frames:]
+        self._pending = [rest] if len(rest) else []
+        self._pending_frames = len(rest)
+        return out
+
+    def close(self):
+        self._blocks.close()
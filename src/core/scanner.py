@@ -0,0 +1,84 @@
+"""
+Folder Scanner - stream audio files out of a library as they are found
+Iterative os.scandir walk (the stat from the directory listing is reused,
+so no extra syscall per file) that yields batches of new files. Output
+folders of earlier jobs are not descended into, and files already recorded
+in the completed-job index for the current settings are skipped.
+"""
+import os
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from src.utils.logger import logger
+from src.core.workspace import SCRATCH_DIRNAME
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aiff', '.wma'}
+
+# Folders written by the splitter ("<track> - Stems") and its previews
+SKIPPED_DIR_SUFFIXES = (" - Stems",)
+SKIPPED_DIRS = {SCRATCH_DIRNAME, "Previews"}
+
+# A batch is handed out when it is this large or this old, whichever comes first
+SCAN_BATCH_FILES = 256
+SCAN_BATCH_SECONDS = 0.25
+
+
+def _skip_dir(name: str) -> bool:
+    return name in SKIPPED_DIRS or name.endswith(SKIPPED_DIR_SUFFIXES) or name.startswith(".")
+
+
+def iter_audio_files(folders: Iterable[str],
+                     extensions=AUDIO_EXTENSIONS) -> Iterator[Tuple[str, int, int]]:
+    """
+    (path, size, mtime_ns) of every audio file below `folders`, depth-first
+    in name order (so repeated scans list files in the same order).
+    """
+    seen = set()
+    for folder in folders:
+        stack = [os.path.abspath(folder)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError as e:
+                logger.warning(f"Cannot scan {directory}: {e}")
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _skip_dir(entry.name):
+                            subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions and entry.path not in seen:
+                        seen.add(entry.path)
+                        st = entry.stat()
+                        yield entry.path, st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+            stack.extend(reversed(subdirs))
+
+
+def scan_batches(folders: Iterable[str], is_done: Optional[Callable[[List[tuple]], set]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Iterator[Tuple[List[str], int]]:
+    """
+    Yield (new paths, skipped count) batches while walking `folders`.
+    `is_done` receives (path, size, mtime_ns) entries and returns the paths
+    to skip (e.g. CompletedJobIndex.completed with a fingerprint bound).
+    """
+    batch = []
+    started = time.monotonic()
+
+    def flush():
+        done = is_done(batch) if is_done is not None and batch else set()
+        return [p for p, _, _ in batch if p not in done], len(done)
+
+    for entry in iter_audio_files(folders):
+        if should_stop is not None and should_stop():
+            return
+        batch.append(entry)
+        if len(batch) >= SCAN_BATCH_FILES or time.monotonic() - started >= SCAN_BATCH_SECONDS:
+            yield flush()
+            batch = []
+            started = time.monotonic()
+    if batch:
+        yield flush()
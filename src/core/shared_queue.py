@@ -0,0 +1,360 @@
+"""
+Shared Job Queue - several render nodes working off one queue folder
+The queue is a directory on storage every node mounts (e.g. a NAS); there
+is no server process, and no database (SQLite locking isn't reliable over
+NFS/SMB). Jobs are JSON files. A node claims a job by creating its lease
+file with O_EXCL, keeps it alive with heartbeats (mtime updates) and ends
+it by moving the job to done/ or failed/. When a node dies its leases stop
+beating, expire, and the jobs are claimed by other nodes. Lease ages are
+measured against the file server's clock, so node clocks needn't agree.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import socket
+import threading
+from typing import Iterable, List, Optional, Tuple
+from src.utils.logger import logger
+from src.core.job_index import settings_fingerprint
+from src.core.journal import job_key
+
+QUEUE_DIRS = ("jobs", "leases", "done", "failed", "nodes")
+
+# A lease without a heartbeat for this long is taken over by another node
+LEASE_SECONDS = 120.0
+HEARTBEAT_SECONDS = 15.0
+
+# Claims of one job before it is given up (failed runs and nodes that died with it)
+MAX_ATTEMPTS = 3
+
+# A job that failed waits this long before it is claimed again (e.g. a NAS hiccup)
+RETRY_SECONDS = 30.0
+
+# Jobs write into "<parent>/.<output folder>.part-<node>" and are published by renaming
+STAGING_SUFFIX = ".part-"
+
+
+def _write_json_atomic(path: str, data: dict):
+    tmp = f"{path}.tmp-{socket.gethostname()}-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_gone(pid) -> bool:
+    """True if no local process has this pid (only checked on POSIX)."""
+    if os.name != "posix" or not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def staging_dir(output_dir: str, node: str) -> str:
+    """Hidden sibling of the output folder (same volume, so publishing is a rename)."""
+    parent, name = os.path.split(os.path.abspath(output_dir))
+    return os.path.join(parent, f".{name}{STAGING_SUFFIX}{node}")
+
+
+def discard_staging(output_dir: str, keep: Optional[str] = None):
+    """Remove staging folders (and zips) earlier holders of a job left behind."""
+    parent, name = os.path.split(os.path.abspath(output_dir))
+    prefix = f".{name}{STAGING_SUFFIX}"
+    try:
+        entries = os.listdir(parent)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(parent, entry)
+        if not entry.startswith(prefix) or path in (keep, f"{keep}.zip"):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def publish(staging: str, output_dir: str):
+    """
+    Move a finished job's folder (and zip) into place. Readers see either
+    the previous outputs or the complete new ones, never a half-written folder.
+    """
+    old = None
+    if os.path.exists(output_dir):
+        old = f"{staging}.old"
+        os.rename(output_dir, old)
+    os.rename(staging, output_dir)
+    if os.path.exists(f"{staging}.zip"):
+        os.replace(f"{staging}.zip", f"{output_dir}.zip")
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class QueuedJob:
+    """A job file: input, output folder and the options it runs with."""
+
+    def __init__(self, name: str, data: dict):
+        self.name = name
+        self.data = data
+        self.key = data["key"]
+        self.input = data["input"]
+        self.output_dir = data["output_dir"]
+        self.options = data["options"]
+
+    def __repr__(self):
+        return f"QueuedJob({os.path.basename(self.input)}, attempt {self.data.get('attempts', 0)})"
+
+
+class Lease:
+    """A claimed job's lease; a heartbeat thread keeps it from expiring."""
+
+    def __init__(self, path: str, token: str):
+        self.path = path
+        self.token = token
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def held(self) -> bool:
+        """Still ours (not taken over after a missed heartbeat)?"""
+        return (_read_json(self.path) or {}).get("token") == self.token
+
+    def beat(self) -> bool:
+        if not self.held():
+            return False
+        try:
+            os.utime(self.path, None)  # server time on NFS
+            return True
+        except OSError:
+            return False
+
+    def _run(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            if not self.beat():
+                self.lost = True
+                logger.warning(f"Lost lease {os.path.basename(self.path)}, outputs of this run will be discarded")
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if not self.lost and self.held():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class SharedQueue:
+    """One node's view of the shared queue folder."""
+
+    def __init__(self, root: str, node: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.node = node or socket.gethostname()
+        for name in QUEUE_DIRS:
+            os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        self._node_file = os.path.join(self.root, "nodes", self.node)
+
+    def _path(self, kind: str, name: str) -> str:
+        return os.path.join(self.root, kind, name)
+
+    def server_now(self) -> float:
+        """The file server's current time (touches this node's presence file)."""
+        with open(self._node_file, "a"):
+            pass
+        os.utime(self._node_file, None)
+        return os.stat(self._node_file).st_mtime
+
+    def _pending(self) -> List[Tuple[str, str]]:
+        """(job file name, key) of queued jobs, oldest first."""
+        try:
+            names = sorted(n for n in os.listdir(os.path.join(self.root, "jobs")) if n.endswith(".json"))
+        except OSError:
+            return []
+        return [(name, name[:-5].split("-", 1)[-1]) for name in names]
+
+    def _is_done(self, key: str, fingerprint: str, input_file: str) -> bool:
+        done = _read_json(self._path("done", f"{key}.json"))
+        if done is None or done.get("fingerprint") != fingerprint or not os.path.isdir(done.get("output_dir", "")):
+            return False
+        try:
+            st = os.stat(input_file)
+        except OSError:
+            return False
+        return (done.get("size"), done.get("mtime_ns")) == (st.st_size, st.st_mtime_ns)
+
+    def submit(self, jobs: Iterable[Tuple[str, str]], options: dict) -> int:
+        """
+        Queue (input, output folder) jobs. Jobs already queued, or done with
+        the same settings and an unchanged input, are skipped. Returns the
+        number queued.
+        """
+        fingerprint = settings_fingerprint(options)
+        queued = {key for _, key in self._pending()}
+        added = 0
+        for input_file, output_dir in jobs:
+            input_file, output_dir = os.path.abspath(input_file), os.path.abspath(output_dir)
+            key = job_key(input_file, output_dir)
+            if key in queued or self._is_done(key, fingerprint, input_file):
+                continue
+            try:
+                st = os.stat(input_file)
+            except OSError as e:
+                logger.warning(f"Not queued, cannot read {input_file}: {e}")
+                continue
+            data = {"key": key, "input": input_file, "output_dir": output_dir, "options": options,
+                    "fingerprint": fingerprint, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                    "submitted_by": self.node, "submitted": time.time(), "attempts": 0}
+            _write_json_atomic(self._path("jobs", f"{time.time_ns():020d}-{key}.json"), data)
+            queued.add(key)
+            added += 1
+        if added:
+            logger.info(f"Queued {added} job(s) in {self.root}")
+        return added
+
+    def _create_lease(self, path: str) -> Optional[str]:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"node": self.node, "pid": os.getpid(), "token": token, "claimed": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return token
+
+    def _take_over(self, path: str) -> Optional[str]:
+        """Claim a job whose lease expired (or was held by an earlier run of this node)."""
+        try:
+            age = self.server_now() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return self._create_lease(path)
+        info = _read_json(path) or {}
+        # Left by an earlier run of this node that crashed: no need to wait for expiry
+        restarted = info.get("node") == self.node and info.get("pid") != os.getpid() and _pid_gone(info.get("pid"))
+        if not restarted and age < LEASE_SECONDS:
+            return None
+        # Only one node's rename succeeds
+        stale = f"{path}.stale-{self.node}-{os.getpid()}"
+        try:
+            os.rename(path, stale)
+        except OSError:
+            return None
+        if (_read_json(stale) or {}).get("token") != info.get("token"):
+            # Another node took it over between our check and the rename: give it back
+            try:
+                os.link(stale, path)
+            except OSError:
+                pass
+            os.remove(stale)
+            return None
+        os.remove(stale)
+        logger.info(f"Taking over {os.path.basename(path)} from {info.get('node', '?')} "
+                    f"({'restarted' if restarted else f'no heartbeat for {age:.0f}s'})")
+        return self._create_lease(path)
+
+    def claim(self) -> Optional[Tuple[QueuedJob, Lease]]:
+        """Lease the oldest job no live node holds. None if there is nothing to claim."""
+        for name, key in self._pending():
+            lease_path = self._path("leases", f"{key}.lease")
+            token = self._take_over(lease_path) if os.path.exists(lease_path) else self._create_lease(lease_path)
+            if token is None:
+                continue
+            lease = Lease(lease_path, token)
+            job_path = self._path("jobs", name)
+            data = _read_json(job_path)
+            if data is None:
+                # Finished by its holder while we were looking
+                lease.release()
+                continue
+            job = QueuedJob(name[:-5], data)
+            if self._is_done(key, data.get("fingerprint"), job.input):
+                # Holder finished but died before removing the job file
+                self._retire(job, lease)
+                continue
+            if data.get("retry_after", 0) > self.server_now():
+                lease.release()
+                continue
+            data["attempts"] = data.get("attempts", 0) + 1
+            if data["attempts"] > MAX_ATTEMPTS:
+                self.fail(job, lease, f"given up after {MAX_ATTEMPTS} attempts")
+                continue
+            data["claimed_by"] = self.node
+            _write_json_atomic(job_path, data)
+            return job, lease.start()
+        return None
+
+    def _retire(self, job: QueuedJob, lease: Lease):
+        try:
+            os.remove(self._path("jobs", f"{job.name}.json"))
+        except OSError:
+            pass
+        lease.release()
+
+    def complete(self, job: QueuedJob, lease: Lease):
+        _write_json_atomic(self._path("done", f"{job.key}.json"), {
+            "input": job.input, "output_dir": job.output_dir, "fingerprint": job.data.get("fingerprint"),
+            "size": job.data.get("size"), "mtime_ns": job.data.get("mtime_ns"),
+            "node": self.node, "finished": time.time(),
+        })
+        self._retire(job, lease)
+
+    def retry(self, job: QueuedJob, lease: Lease, error: str) -> bool:
+        """
+        Put a failed job back in the queue for another attempt (after
+        RETRY_SECONDS). Once it has had MAX_ATTEMPTS it is failed for good
+        and False is returned.
+        """
+        if job.data.get("attempts", 0) >= MAX_ATTEMPTS:
+            self.fail(job, lease, error)
+            return False
+        if not lease.held():
+            # Taken over meanwhile: the new holder decides
+            lease.release()
+            return True
+        logger.warning(f"Job failed on {self.node}, will be retried: {os.path.basename(job.input)}: {error}")
+        job.data.update(last_error=str(error), retry_after=self.server_now() + RETRY_SECONDS)
+        _write_json_atomic(self._path("jobs", f"{job.name}.json"), job.data)
+        lease.release()
+        return True
+
+    def fail(self, job: QueuedJob, lease: Lease, error: str):
+        logger.error(f"Job failed on {self.node}: {os.path.basename(job.input)}: {error}")
+        _write_json_atomic(self._path("failed", f"{job.key}.json"), {
+            **job.data, "error": str(error), "node": self.node, "failed": time.time(),
+        })
+        self._retire(job, lease)
+
+    def counts(self) -> dict:
+        """Jobs per state (for status output)."""
+        def count(kind):
+            try:
+                return sum(1 for n in os.listdir(os.path.join(self.root, kind)) if n.endswith(".json"))
+            except OSError:
+                return 0
+        return {"queued": count("jobs"), "done": count("done"), "failed": count("failed")}
@@ -0,0 +1,169 @@
+"""
+Silence-Aware Inference - skip long silent spans before separation
+A quick energy scan finds stretches of silence; the models only see the
+audible parts (concatenated), and the stems are put back on the original
+timeline with zeros in the gaps and short fades at every boundary.
+"""
+import numpy as np
+import torch
+from src.utils.logger import logger
+from src.core.loudness import SILENCE_THRESHOLD_DBFS
+
+MIN_SILENCE_SECONDS = 2.0   # Shorter pauses are not worth a cut
+MARGIN_SECONDS = 0.25       # Audio kept on each side of a cut (model context + fade room)
+FADE_SECONDS = 0.05         # Ramp applied where a kept region meets a skipped span
+MIN_SKIP_FRACTION = 0.05    # Below this, compacting the input is not worth it
+
+_FRAME_SECONDS = 0.05
+
+
+def find_silent_spans(audio: np.ndarray, sr: int, threshold_db: float = SILENCE_THRESHOLD_DBFS,
+                      min_silence: float = MIN_SILENCE_SECONDS) -> list:
+    """
+    Silent spans of a (time,) or (time, channels) buffer.
+
+    A 50 ms frame is silent when its mean power (over channels) is below
+    `threshold_db`; runs of at least `min_silence` seconds are returned as
+    (start, end) sample ranges.
+    """
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    frame = max(1, int(round(_FRAME_SECONDS * sr)))
+    n_frames = -(-len(audio) // frame)
+    if n_frames == 0:
+        return []
+
+    padded = np.zeros((n_frames * frame, audio.shape[1]), dtype=np.float32)
+    padded[:len(audio)] = audio
+    frames = padded.reshape(n_frames, -1)
+    power = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+    # The zero padding of the last frame must not make it look quieter
+    tail = len(audio) - (n_frames - 1) * frame
+    power[-1] *= frame / tail
+
+    quiet = np.concatenate([[False], power < 10 ** (threshold_db / 10), [False]])
+    edges = np.flatnonzero(np.diff(quiet.astype(np.int8)))
+    min_frames = int(np.ceil(min_silence / _FRAME_SECONDS))
+    return [
+        (int(start * frame), int(min(end * frame, len(audio))))
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_frames
+    ]
+
+
+class SilenceMap:
+    """
+    Mapping between a track and its compacted (silence-free) version.
+
+    `compact()` builds the model input from the kept regions; `expand()`
+    puts a separated stem back on the original timeline. Kept regions extend
+    `margin` seconds into each silent span, so the joins in the compacted
+    audio and the fades in the expanded stems both fall on near-silence.
+    """
+
+    def __init__(self, length: int, sr: int, spans: list, margin: float = MARGIN_SECONDS,
+                 fade: float = FADE_SECONDS):
+        self.length = length
+        self.sr = sr
+        margin_n = int(margin * sr)
+        self.fade = min(int(fade * sr), margin_n)
+
+        # Track edges need no margin: nothing precedes/follows them
+        self.skips = []
+        for start, end in spans:
+            s = start if start == 0 else start + margin_n
+            e = end if end >= length else end - margin_n
+            if e - s > 0:
+                self.skips.append((s, e))
+
+        self._set_keep()
+
+    def _set_keep(self):
+        self.keep = []
+        pos = 0
+        for s, e in self.skips:
+            if s > pos:
+                self.keep.append((pos, s))
+            pos = e
+        if pos < self.length:
+            self.keep.append((pos, self.length))
+
+    @classmethod
+    def scan(cls, audio: np.ndarray, sr: int, threshold_db: float = SILENCE_THRESHOLD_DBFS,
+             min_silence: float = MIN_SILENCE_SECONDS) -> "SilenceMap":
+        return cls(len(audio), sr, find_silent_spans(audio, sr, threshold_db, min_silence))
+
+    @property
+    def active_length(self) -> int:
+        return sum(e - s for s, e in self.keep)
+
+    @property
+    def skipped_fraction(self) -> float:
+        return 1.0 - self.active_length / self.length if self.length else 0.0
+
+    def worth_skipping(self) -> bool:
+        return self.active_length > 0 and self.skipped_fraction >= MIN_SKIP_FRACTION
+
+    def compact(self, audio: np.ndarray) -> np.ndarray:
+        """Concatenate the kept regions of a (time, channels) buffer."""
+        return np.concatenate([audio[s:e] for s, e in self.keep])
+
+    def at_rate(self, sr: int) -> "SilenceMap":
+        """The same map for audio resampled to `sr` (models may output at their own rate)."""
+        if sr == self.sr:
+            return self
+        ratio = sr / self.sr
+        scaled = SilenceMap.__new__(SilenceMap)
+        scaled.sr = sr
+        scaled.length = int(round(self.length * ratio))
+        scaled.fade = int(round(self.fade * ratio))
+        scaled.skips = [(int(round(s * ratio)), int(round(e * ratio))) for s, e in self.skips]
+        scaled._set_keep()
+        return scaled
+
+    def expand(self, stem: torch.Tensor, sr: int = None) -> torch.Tensor:
+        """Place a (channels, time) stem of the compacted audio back on the original timeline."""
+        if sr is not None and sr != self.sr:
+            return self.at_rate(sr).expand(stem)
+        out = stem.new_zeros((stem.shape[0], self.length))
+        skip_starts = {s for s, _ in self.skips}
+        skip_ends = {e for _, e in self.skips}
+        ramp = torch.linspace(0.0, 1.0, self.fade + 2, dtype=stem.dtype, device=stem.device)[1:-1]
+
+        pos = 0
+        for s, e in self.keep:
+            n = min(e - s, stem.shape[1] - pos)
+            if n <= 0:
+                break
+            out[:, s:s + n] = stem[:, pos:pos + n]
+            k = min(self.fade, n)
+            if k and s in skip_ends:
+                out[:, s:s + k] *= ramp[:k]
+            if k and e in skip_starts:
+                out[:, e - k:e] *= ramp[-k:].flip(0)
+            pos += n
+        return out
+
+    def to_dict(self) -> dict:
+        return {
+            "skipped_seconds": round((self.length - self.active_length) / self.sr, 2),
+            "total_seconds": round(self.length / self.sr, 2),
+            "skipped_fraction": round(self.skipped_fraction, 4),
+            "spans": [[round(s / self.sr, 3), round(e / self.sr, 3)] for s, e in self.skips],
+        }
+
+
+def log_speedup(silence_map: SilenceMap, inference_seconds: float) -> dict:
+    """
+    Report what skipping saved. Inference time scales with input length, so the
+    full-length cost is estimated from the measured time on the compacted audio.
+    """
+    info = silence_map.to_dict()
+    speedup = silence_map.length / max(silence_map.active_length, 1)
+    info["inference_seconds"] = round(inference_seconds, 2)
+    info["estimated_speedup"] = round(speedup, 2)
+    logger.info(
+        f"Silence skip: {info['skipped_seconds']:.1f}s of {info['total_seconds']:.1f}s not processed "
+        f"({info['skipped_fraction']:.0%}), inference {inference_seconds:.1f}s, ~{speedup:.2f}x faster"
+    )
+    return info
@@ -12,6 +12,21 @@ import demucs.separate
 from PyQt6.QtCore import QThread, pyqtSignal
 from src.utils.logger import logger
 from src.core import constants
+from src.core.workspace import JobWorkspace
+from src.core.analysis import StemAnalysis, store_analysis, transpose_analysis, get_filename_suffix
+from src.core.beatgrid import save_beat_grid, save_folder_beat_grid, stretch_beat_grid
+from src.core.loudness import measure_loudness, measure_file
+from src.core.manifest import JobManifest
+from src.core.silence import SilenceMap, log_speedup
+from src.core.stem_plan import plan_stems, derive_backing
+from src.core.manipulation import StemManipulator, manipulation_device
+from src.core.resampler import resample_stems, DEFAULT_QUALITY
+from src.core.crossover import Crossover, parse_crossovers, DEFAULT_CROSSOVERS
+from src.core.encoder import encode_pcm, transcode_file, is_pipe_format, ffmpeg_available, EncoderError
+from src.core.targets import targets_from_options, audio_subtype
+from src.core.archive import StreamingArchive
+from src.core.container import write_container, supports_container, CONTAINER_SUFFIX
+from src.core.journal import JournaledJob, get_journal, STAGE_WRITTEN
 
 try:
     from src.core.advanced_audio import AdvancedAudioProcessor, apply_audio_enhancement
@@ -21,14 +36,10 @@ except ImportError:
     logger.warning("AdvancedAudioProcessor not available (audio-separator missing?)")
 
 # Monkeypatch torchaudio to use soundfile directly (Fix for Python 3.14 / torchaudio 2.9.1)
+# Audio is decoded straight to float32 and shared with torch (no float64 copy)
 def custom_load(filepath, *args, **kwargs):
-    wav, sr = sf.read(filepath)
-    wav = torch.tensor(wav).float()
-    if wav.ndim == 1:
-        wav = wav.unsqueeze(0)
-    else:
-        wav = wav.t()
-    return wav, sr
+    wav, sr = sf.read(filepath, dtype='float32', always_2d=True)
+    return torch.from_numpy(wav).t(), sr
 
 def custom_save(filepath, src, sample_rate, **kwargs):
     src = src.detach().cpu().t().numpy()
@@ -49,7 +60,9 @@ QUALITY_PRESETS = {
 
 # Audio format constants
 DEFAULT_SAMPLE_RATE = 44100
-DEFAULT_N_FFT = 2048
+
+# Concurrent output writers (sf.write + loudness metering per file)
+MAX_WRITE_WORKERS = min(8, os.cpu_count() or 1)
 
 # Model Hot-Loading Cache (Performance Optimization #9)
 # Keeps loaded models in memory to avoid reloading weights for each file
@@ -57,46 +70,93 @@ _separator_cache: dict = {}  # {model_name: Separator}
 _current_cached_model: str | None = None  # Track current model for cache invalidation
 
 
-def _get_audio_subtype(format_ext: str, bit_depth: str) -> str | None:
-    """Get soundfile subtype based on format and bit depth."""
-    if format_ext in ['wav', 'flac', 'aiff']:
-        if "32" in bit_depth:
-            return "FLOAT"
-        elif "24" in bit_depth:
-            return "PCM_24"
-        else:
-            return "PCM_16"
-    return None
+def _write_output(path, data, target):
+    """
+    Write one (time, channels) output in the format of `target`.
+    Returns (path written, manifest info or None).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if isinstance(data, list):
+        # Stem container: [(name, (time, channels))] as channel groups of one file
+        path, channel_map = write_container(path, data, target.sample_rate, target.subtype)
+        return path, {"channel_map": channel_map}
+    if is_pipe_format(target.ext) and ffmpeg_available():
+        # Lossy formats: PCM straight from memory into FFmpeg (bitrate control, no temp WAV)
+        try:
+            encode_pcm(data, target.sample_rate, path, target.bitrate)
+            return path, None
+        except EncoderError as e:
+            # e.g. a build without libvorbis/libmp3lame; libsndfile writes OGG (and MP3 since 1.1)
+            if not sf.check_format(target.ext.upper()):
+                raise
+            logger.warning(f"FFmpeg could not encode {os.path.basename(path)}, using libsndfile: {e}")
+    sf.write(path, data, target.sample_rate, subtype=target.subtype)
+    return path, None
 
 
-def _apply_pitch_shift(audio: torch.Tensor, sample_rate: int, semitones: int) -> torch.Tensor:
-    """Apply pitch shift to audio tensor."""
-    if semitones == 0:
-        return audio
-    try:
-        effect = torchaudio.transforms.PitchShift(sample_rate, n_steps=semitones)
-        return effect(audio)
-    except Exception as e:
-        logger.error(f"Pitch shift failed: {e}")
-        return audio
+def _write_outputs(outputs, manifest, on_written=None, job=None):
+    """
+    Write (path, name, data, target) outputs in parallel; encoding and
+    metering release the GIL. Buffers shared by several targets are metered
+    once. Each output is recorded in the manifest (and passed to
+    `on_written`) as soon as it is written. With a journaled `job`, outputs
+    an interrupted run already wrote are kept as they are.
+    """
+    if job is not None:
+        remaining = []
+        for output in outputs:
+            record = job.written(output[0])
+            if record is None:
+                remaining.append(output)
+                continue
+            written = os.path.join(job.output_dir, record["written"])
+            manifest.add_output(written, record["name"], **record["entry"])
+            if on_written is not None:
+                on_written(written)
+        if len(remaining) < len(outputs):
+            logger.info(f"Resume: {len(outputs) - len(remaining)} outputs already written")
+        outputs = remaining
+    if not outputs:
+        return
+    workers = min(len(outputs), MAX_WRITE_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        meters = {}  # {id(data): future of its loudness stats}
+        for _, _, data, target in outputs:
+            if not isinstance(data, list) and id(data) not in meters:
+                meters[id(data)] = pool.submit(measure_loudness, data, target.sample_rate)
+        futures = {
+            pool.submit(_write_output, path, data, target): (path, name, data, target)
+            for path, name, data, target in outputs
+        }
+        for future in as_completed(futures):
+            path, name, data, target = futures[future]
+            try:
+                written, info = future.result()
+                stats = info if info is not None else meters[id(data)].result()
+                entry = {"format": os.path.splitext(written)[1].lstrip("."), **stats}
+                manifest.add_output(written, name, **entry)
+                if job is not None:
+                    job.record_output(path, written, name, entry)
+                if on_written is not None:
+                    on_written(written)
+            except Exception as e:
+                logger.error(f"Failed to write {name} ({target.ext}): {e}")
+    logger.info(f"Wrote {len(outputs)} outputs with {workers} writer threads")
 
 
-def _apply_time_stretch(audio: torch.Tensor, speed: float) -> torch.Tensor:
-    """Apply time stretch to audio tensor."""
-    if speed == 1.0 or abs(speed - 1.0) <= 0.01:
-        return audio
-    try:
-        n_fft = DEFAULT_N_FFT
-        hop_length = n_fft // 4
-        win_length = n_fft
-        stft = torch.stft(audio, n_fft=n_fft, hop_length=hop_length, win_length=win_length, return_complex=True)
-        stretcher = torchaudio.transforms.TimeStretch(hop_length=hop_length, n_freq=n_fft // 2 + 1)
-        stft_stretched = stretcher(stft, speed)
-        target_len = int(audio.shape[1] / speed)
-        return torch.istft(stft_stretched, n_fft=DEFAULT_N_FFT, length=target_len)
-    except Exception as e:
-        logger.error(f"Time stretch failed: {e}")
-        return audio
+def _apply_filename_suffix(paths, suffix):
+    """Rename finished outputs to carry `suffix` before their extension. Returns {old: new}."""
+    renamed = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        root, ext = os.path.splitext(path)
+        try:
+            os.replace(path, f"{root}{suffix}{ext}")
+            renamed[path] = f"{root}{suffix}{ext}"
+        except OSError as e:
+            logger.warning(f"Failed to add analysis suffix to {path}: {e}")
+    return renamed
 
 def _is_demucs_model(model_name):
     """Check if model is a Demucs model (uses demucs.separate)."""
@@ -109,7 +169,7 @@ def _is_demucs_model(model_name):
     # Default to Demucs for unknown model names
     return True
 
-def _run_audio_separator(input_file, model_name, output_dir, **kwargs):
+def _run_audio_separator(input_file, model_name, output_dir, single_stem=None, **kwargs):
     """Run separation using audio-separator library for non-Demucs models.
     
     Uses model hot-loading: keeps the Separator cached in memory.
@@ -155,6 +215,11 @@ def _run_audio_separator(input_file, model_name, output_dir, **kwargs):
             _separator_cache[model_name] = separator
             _current_cached_model = model_name
         
+        # Only write the stem the job needs (the cached separator may have served another mode)
+        separator.output_single_stem = single_stem
+        if getattr(separator, "model_instance", None) is not None:
+            separator.model_instance.output_single_stem = single_stem
+
         # Run separation
         output_files = separator.separate(input_file)
         logger.info(f"audio-separator produced: {output_files}")
@@ -222,7 +287,31 @@ def _ensure_input_is_wav(input_file, temp_root, base_name):
 
 
 
-def _run_separation_models(models, input_file, temp_root, base_name, stem_count, shifts, overlap, segment, jobs, clip_mode, **kwargs):
+def _compact_silence(input_file, workspace, base_name):
+    """
+    Scan the input for long silent spans. Returns (SilenceMap, model input path);
+    the map is None and the input unchanged when there is too little to skip.
+    """
+    try:
+        audio, sr = sf.read(input_file, dtype='float32', always_2d=True)
+    except Exception as e:
+        logger.warning(f"Silence scan skipped: {e}")
+        return None, input_file
+
+    silence_map = SilenceMap.scan(audio, sr)
+    if not silence_map.worth_skipping():
+        logger.info(f"Silence scan: {silence_map.skipped_fraction:.0%} silent, running full inference")
+        return None, input_file
+
+    # Same file name as the input: models name their output folder after it
+    compacted = os.path.join(workspace.subdir("silence"), f"{base_name}.wav")
+    sf.write(compacted, silence_map.compact(audio), sr, subtype='FLOAT')
+    logger.info(f"Silence scan: {len(silence_map.skips)} silent spans, "
+                f"{silence_map.skipped_fraction:.0%} of the track skipped")
+    return silence_map, compacted
+
+
+def _run_separation_models(models, input_file, temp_root, base_name, plan, shifts, overlap, segment, jobs, clip_mode, **kwargs):
     """Run separation for each model in the list (Demucs or others)."""
     audio_sep_outputs = []
     
@@ -241,7 +330,11 @@ def _run_separation_models(models, input_file, temp_root, base_name, stem_count,
             
             if segment > 0: args.extend(["--segment", str(segment)])
             if jobs > 0: args.extend(["-j", str(jobs)])
-            if stem_count == 2: args.append("--two-stems=vocals")
+            two_stems = plan.demucs_two_stems(model_name)
+            if two_stems:
+                args.append(f"--two-stems={two_stems}")
+                if plan.other_method != "add":
+                    args.extend(["--other-method", plan.other_method])
             
             # Format (Intermediate is always WAV/Float32 for precision blending)
             args.append("--float32") 
@@ -268,7 +361,8 @@ def _run_separation_models(models, input_file, temp_root, base_name, stem_count,
             os.makedirs(model_temp_dir, exist_ok=True)
             
             # Run separator
-            sep_outputs = _run_audio_separator(input_file, model_name, model_temp_dir, **kwargs)
+            sep_outputs = _run_audio_separator(input_file, model_name, model_temp_dir,
+                                               single_stem=plan.single_stem, **kwargs)
             audio_sep_outputs.extend(sep_outputs)
             
             # Rename outputs to standard stem names (vocals.wav, instrumental.wav)
@@ -298,9 +392,50 @@ def _run_separation_models(models, input_file, temp_root, base_name, stem_count,
 
 
 def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep_original, **kwargs):
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Journaled jobs record their progress and resume from the stage they reached
+    journal_id = kwargs.pop("journal_id", None)
+    journal = get_journal() if journal_id else None
+    job = None
+    if journal is not None:
+        journal.start(journal_id)
+        job = JournaledJob(journal, journal_id, output_dir)
+
+    # Zip if requested: outputs are added while the job is still writing
+    archive = StreamingArchive(f"{output_dir}.zip", output_dir) if export_zip else None
+
+    # Every intermediate file of this job lives in a private scratch dir,
+    # removed in one go when the job ends (also on failure).
+    try:
+        with JobWorkspace(output_dir, base_name, use_tmpfs=kwargs.get("scratch_tmpfs", False)) as workspace:
+            _separate_in_workspace(workspace, input_file, output_dir, stem_count, quality, keep_original,
+                                   archive=archive, job=job, **kwargs)
+        # Closed after the workspace is gone so scratch files never end up in the archive
+        if archive is not None:
+            archive.close()
+    except BaseException as e:
+        if archive is not None:
+            archive.discard()
+        # Interrupted jobs (Ctrl+C, killed worker) stay resumable; errors are final
+        if journal is not None and isinstance(e, Exception):
+            journal.fail(journal_id, str(e))
+            job.clear_checkpoint()
+        raise
+    if journal is not None:
+        journal.finish(journal_id)
+    
+    # Clear GPU cache after processing to free memory (Performance Optimization)
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        logger.debug("GPU cache cleared after separation")
+
+
+def _separate_in_workspace(workspace, input_file, output_dir, stem_count, quality, keep_original, archive=None,
+                           job=None, **kwargs):
     filename = os.path.basename(input_file)
     base_name = os.path.splitext(filename)[0]
-    os.makedirs(output_dir, exist_ok=True)
 
     # Models to run
     models = [kwargs.get("model", constants.MODEL_HTDEMUCS)]
@@ -310,10 +445,7 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
             models = ens_models
             logger.info(f"Ensemble Mode Enabled: Running models {models}")
 
-    temp_root = os.path.join(output_dir, "temp_ensemble")
-    if os.path.exists(temp_root):
-        shutil.rmtree(temp_root)
-    os.makedirs(temp_root, exist_ok=True)
+    temp_root = workspace.root
 
     # Automatic Input Conversion (Safety Pre-Processor)
     original_input_file = input_file
@@ -335,75 +467,92 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
     if kwargs.get("clip_mode"): clip_mode = kwargs["clip_mode"]
 
 
-    # Run separation for each model
-    audio_sep_outputs = _run_separation_models(
-        models=models,
-        input_file=input_file,
-        temp_root=temp_root,
-        base_name=base_name,
-        stem_count=stem_count,
-        shifts=shifts,
-        overlap=overlap,
-        segment=segment,
-        jobs=jobs,
-        clip_mode=clip_mode,
-        **kwargs
-    )
+    # Silence-aware inference: the models only see the audible parts
+    silence_map = None
+    model_input = input_file
+    if kwargs.get("skip_silence", False):
+        silence_map, model_input = _compact_silence(input_file, workspace, base_name)
+
+    # Only compute, load and blend what the mode needs
+    mode = kwargs.get("mode", constants.MODE_STANDARD)
+    plan = plan_stems(mode, stem_count, models)
+    logger.info(f"Stem plan for mode '{mode}': {plan}")
+
+    # Run separation for each model (unless a resumed job already has the model outputs)
+    inference_start = time.perf_counter()
+    separated_root = job.separated_root(models, base_name) if job is not None else None
+    if separated_root is not None:
+        logger.info(f"Resume: using saved model outputs from {separated_root}")
+    else:
+        audio_sep_outputs = _run_separation_models(
+            models=models,
+            input_file=model_input,
+            temp_root=temp_root,
+            base_name=base_name,
+            plan=plan,
+            shifts=shifts,
+            overlap=overlap,
+            segment=segment,
+            jobs=jobs,
+            clip_mode=clip_mode,
+            **kwargs
+        )
+        separated_root = temp_root
+        if job is not None:
+            # Kept in the output folder until the job is done (if scratch is on its volume)
+            separated_root = job.save_separation(temp_root, models, base_name) or temp_root
+    inference_seconds = time.perf_counter() - inference_start
 
     # Blending / Moving Logic (Unified for ALL models)
     # Just verify the first model produced something
-    first_model_dir = os.path.join(temp_root, models[0], base_name)
+    first_model_dir = os.path.join(separated_root, models[0], base_name)
     if not os.path.exists(first_model_dir):
         logger.error(f"Pipeline failed: Output directory not found at {first_model_dir}")
         return
 
-    stems = os.listdir(first_model_dir)
-    logger.info(f"Found Stems in temp dir: {stems}")
-    
-    # Determining Final format options
-    output_format = kwargs.get("format", "WAV").lower()
-    bit_depth = kwargs.get("bit_depth", "16-bit")
-    
-    final_ext = "wav"
-    if output_format == "mp3": final_ext = "mp3"
-    elif output_format == "flac": final_ext = "flac"
-    elif output_format == "ogg": final_ext = "ogg"
-    elif output_format == "aiff": final_ext = "aiff"
+    stems = [f for f in os.listdir(first_model_dir)
+             if f.endswith(".wav") and plan.wants(os.path.splitext(f)[0])]
+    logger.info(f"Stems to process: {stems}")
     
+    # Output targets: all written from the same in-memory stems; the first is
+    # the primary one that enhancement / ultra clean work on
+    targets = targets_from_options(kwargs)
+    primary = targets[0]
+    final_ext = primary.ext
+    bit_depth = primary.bit_depth
+    if len(targets) > 1:
+        logger.info(f"Output targets: {targets}")
+
     # Process each stem
-    backing_accumulator = None
-    backing_name = None
+    # Backing track (e.g. no_drums) = mix - target stem, taken from the blended stem
+    backing_name = plan.backing_name
+    backing_source = None
     backing_sr = None
-    
-    # Determine if we need a backing track
-    mode = kwargs.get("mode", constants.MODE_STANDARD)
-    if mode == constants.MODE_GUITAR: backing_name = "no_guitar"
-    elif mode == constants.MODE_PIANO: backing_name = "no_piano"
-    elif mode == constants.MODE_DRUMS: backing_name = "no_drums"
-    elif mode == constants.MODE_BASS: backing_name = "no_bass"
 
+    # Optional BPM/Key from the separated stems while they are in memory (no extra decode)
+    stem_analysis = None
+    if kwargs.get("stem_analysis", False) or kwargs.get("include_bpm_key", False):
+        stem_analysis = StemAnalysis()
+    # Every output with its loudness stats, measured from the buffers as they are written
+    manifest = JobManifest(output_dir, original_input_file, kwargs)
+    if silence_map is not None:
+        manifest.annotate("silence", log_speedup(silence_map, inference_seconds))
+
+    rendered = []  # (name, uses filename pattern, audio at the model rate) for every output
+    model_sr = None
+    resample_quality = kwargs.get("resample_quality", DEFAULT_QUALITY)
     for stem_file in stems:
-        if not stem_file.endswith(".wav"): continue
-        
         stem_name = os.path.splitext(stem_file)[0]
         
-        # Filter based on mode
-        should_keep = True
-        
-        if mode == constants.MODE_VOCALS and "vocals" not in stem_name: should_keep = False
-        elif mode == constants.MODE_INSTRUMENTAL and "no_vocals" not in stem_name and "instrumental" not in stem_name: should_keep = False
-        elif mode == constants.MODE_DRUMS and stem_name not in ("drums", "drums.wav"): should_keep = False
-        elif mode == constants.MODE_BASS and stem_name not in ("bass", "bass.wav"): should_keep = False
-        elif mode == constants.MODE_GUITAR and stem_name not in ("guitar", "guitar.wav"): should_keep = False
-        elif mode == constants.MODE_PIANO and stem_name not in ("piano", "piano.wav"): should_keep = False
-        
         # Collect waveforms for THIS stem
         waveforms = []
         sample_rate = None
         for model_name in models:
-            p = os.path.join(temp_root, model_name, base_name, stem_file)
+            p = os.path.join(separated_root, model_name, base_name, stem_file)
             if os.path.exists(p):
                 w, sr = torchaudio.load(p)
+                if silence_map is not None:
+                    w = silence_map.expand(w, sr)
                 sample_rate = sr  # Track sample rate from loaded file
                 waveforms.append(w)
         
@@ -424,171 +573,106 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
         else: # Mean
             blended = torch.mean(stacked, dim=0)
 
-        # Logic: If kept, save it. If NOT kept but we want backing, accumulate it.
-        if not should_keep:
-            if backing_name:
-                # Initialize accumulator if needed
-                if backing_accumulator is None:
-                    backing_accumulator = blended
-                    backing_sr = current_sr
-                else:
-                    # Resize to match
-                    curr_len = blended.shape[1]
-                    acc_len = backing_accumulator.shape[1]
-                    target_len = min(curr_len, acc_len)
-                    
-                    backing_accumulator = backing_accumulator[:, :target_len] + blended[:, :target_len]
-            
-            continue # Skip saving this individual file
+        if stem_analysis is not None:
+            stem_analysis.add(stem_name, blended, current_sr)
+
+        if backing_name:
+            backing_source = blended
+            backing_sr = current_sr
 
         # Rename no_vocals to instrumental for consistency
         if stem_name == "no_vocals":
             stem_name = "instrumental"
             
-        # ... proceed to save 'blended' as usual below ...
-            
-        # Target Path Construction
-        pattern = kwargs.get("filename_pattern", "{stem}")
-        # Sanitize pattern to ensure stem is included if checking completeness, 
-        # but realistically user might want fixed names? No, must separate stems.
-        if "{stem}" not in pattern:
-             pattern += "_{stem}"
-             
-        # Resolve Pattern
-        # base_name = Track Name (already defined)
-        # stem_name = Stem Type (vocals, drums)
-        rel_path = pattern.replace("{track}", base_name).replace("{stem}", stem_name)
-        
-        # Ensure extension
-        dst = os.path.join(output_dir, f"{rel_path}.{final_ext}")
-        
-        # Create subdirs if pattern contained slashes
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        
-        # Resample if needed
-        target_sr = kwargs.get("sample_rate", 44100)
-        if current_sr != target_sr:
-             resampler = torchaudio.transforms.Resample(current_sr, target_sr)
-             blended = resampler(blended)
-             current_sr = target_sr
-
-        # Apply Manipulation (Pitch Shift & Time Stretch)
-        pitch = kwargs.get("pitch_shift", 0)
-        speed = kwargs.get("time_stretch", 1.0)
-        
-        blended = _apply_pitch_shift(blended, current_sr, pitch)
-        blended = _apply_time_stretch(blended, speed)
+        # Destinations are resolved per target ({track}/{stem} pattern) at write time
+        rendered.append((stem_name, True, blended))
+        model_sr = current_sr
 
-        # Generate Subtype if needed
-        subtype = _get_audio_subtype(final_ext, bit_depth)
-        
-        # Save using sf.write directly
-        src_np = blended.detach().cpu().t().numpy()
-        sf.write(dst, src_np, current_sr, subtype=subtype)
-        
-        # Post-Conversion for MP3 (if needed)
-        # sf.write usually creates standard WAV if filename is mp3 but library doesn't support it?
-        # Actually sf depends on libsndfile. If enabled, it writes mp3.
-        # If not, we might need ffmpeg check.
-        # But let's assume if user selected MP3, system supports it or we fallback.
-        # Ideally, we write WAV then convert with FFmpeg if we want to be 100% sure of bitrate.
-        if final_ext == "mp3":
-             # We can use our ffmpeg fallback if we want specific bitrate like 320k
-             # Check if sf.write actually wrote output.
-             if not os.path.exists(dst) or os.path.getsize(dst) < 100:
-                 # Retry by writing WAV then converting
-                 temp_wav = dst.replace(".mp3", ".wav")
-                 sf.write(temp_wav, src_np, current_sr)
-                 from src.utils.resource_utils import get_ffmpeg_path
-                 result = subprocess.run([get_ffmpeg_path(), "-y", "-i", temp_wav, "-b:a", "320k", dst], 
-                               capture_output=True)
-                 if result.returncode != 0:
-                     logger.error(f"FFmpeg MP3 conversion failed: {result.stderr.decode()}")
-                 if os.path.exists(temp_wav): os.remove(temp_wav)
-
-        # Band Splitting (Low/Mid/High)
+    backing = None
+    if backing_source is not None:
+        mix, mix_sr = torchaudio.load(input_file)
+        mix = resample_stems([mix], mix_sr, backing_sr, resample_quality)[0]
+        backing = derive_backing(mix, backing_source)
+        backing_source = None
+        if stem_analysis is not None:
+            stem_analysis.add(backing_name, backing, backing_sr)
+
+    analysis_suffix = ""
+    if stem_analysis is not None:
+        analysis = stem_analysis.result()
+        store_analysis(original_input_file, analysis, tier='stems')
+        grid = stem_analysis.beat_grid()
+        if grid is not None:
+            # Once per track, plus a copy on the output timeline for the stems folder
+            save_beat_grid(original_input_file, grid)
+            save_folder_beat_grid(output_dir, stretch_beat_grid(grid, kwargs.get("time_stretch", 1.0)))
+        if kwargs.get("include_bpm_key", False):
+            # Describe the audio as written, after pitch shift / time stretch
+            analysis_suffix = get_filename_suffix(transpose_analysis(
+                analysis, kwargs.get("pitch_shift", 0), kwargs.get("time_stretch", 1.0)))
+
+    # The backing track goes through the same chain as the stems
+    if backing is not None:
+        rendered.append((backing_name, False, backing))
+        backing = None
+
+    # Pitch Shift & Time Stretch: all outputs in one batched phase-vocoder pass,
+    # at the model rate so every target shares the result
+    manipulator = StemManipulator(model_sr, kwargs.get("pitch_shift", 0), kwargs.get("time_stretch", 1.0),
+                                  device=manipulation_device())
+    if manipulator.active and rendered:
+        try:
+            processed = manipulator.process([audio for _, _, audio in rendered])
+            rendered = [(name, patterned, audio) for (name, patterned, _), audio in zip(rendered, processed)]
+        except Exception as e:
+            logger.error(f"Pitch/tempo manipulation failed: {e}")
+
+    # Per export rate: one batched resample, then (time, channels) buffers and bands shared by its targets
+    crossovers = parse_crossovers(kwargs.get("band_crossovers", DEFAULT_CROSSOVERS))
+    by_rate = {}  # {sr: ([(time, channels) per output], [(band names, bands) per stem] or None)}
+    for sr in dict.fromkeys(t.sample_rate for t in targets):
+        audios = [audio for _, _, audio in rendered]
+        if audios and model_sr != sr:
+            audios = resample_stems(audios, model_sr, sr, resample_quality)
+        band_sets = None
         if kwargs.get("split_bands", False):
+            # Band Splitting: every stem into N Linkwitz-Riley bands in one batched pass
             try:
-                # Low (< 300Hz)
-                low_stem = torchaudio.functional.lowpass_biquad(blended, current_sr, cutoff_freq=300)
-                path_low = dst.replace(f".{final_ext}", f"_Low.{final_ext}")
-                src_np = low_stem.detach().cpu().t().numpy()
-                sf.write(path_low, src_np, current_sr, subtype=subtype)
-                
-                # High (> 4000Hz)
-                high_stem = torchaudio.functional.highpass_biquad(blended, current_sr, cutoff_freq=4000)
-                path_high = dst.replace(f".{final_ext}", f"_High.{final_ext}")
-                band_np = high_stem.detach().cpu().t().numpy()
-                sf.write(path_high, band_np, current_sr, subtype=subtype)
-                
-                # Mid (300Hz - 4000Hz)
-                # Apply Highpass(300) then Lowpass(4000)
-                mid_stem = torchaudio.functional.highpass_biquad(blended, current_sr, cutoff_freq=300)
-                mid_stem = torchaudio.functional.lowpass_biquad(mid_stem, current_sr, cutoff_freq=4000)
-                path_mid = dst.replace(f".{final_ext}", f"_Mid.{final_ext}")
-                band_np = mid_stem.detach().cpu().t().numpy()
-                sf.write(path_mid, band_np, current_sr, subtype=subtype)
-                
+                crossover = Crossover(sr, crossovers)
+                band_stems = [a.detach().cpu().numpy() for (name, _, _), a in zip(rendered, audios) if name != backing_name]
+                band_sets = [(crossover.names, [b.T for b in bands]) for bands in crossover.split_batch(band_stems)]
+                logger.info(f"Split {len(band_stems)} stems into bands {crossover.names} at {crossover.crossovers} Hz ({sr} Hz)")
             except Exception as e:
-                logger.error(f"Band splitting failed for {stem_name}: {e}")
-    
-    # After loop, save Backing Track if accumulated
-    if backing_accumulator is not None and backing_name:
-        try:
-             # Apply same effects chain to backing
-             final_backing = backing_accumulator
-             
-             # Resample
-             target_sr = kwargs.get("sample_rate", 44100)
-             if backing_sr != target_sr:
-                  resampler = torchaudio.transforms.Resample(backing_sr, target_sr)
-                  final_backing = resampler(final_backing)
-                  backing_sr = target_sr
-             
-             # Pitch/Time using helper functions
-             pitch = kwargs.get("pitch_shift", 0)
-             speed = kwargs.get("time_stretch", 1.0)
-             
-             final_backing = _apply_pitch_shift(final_backing, backing_sr, pitch)
-             final_backing = _apply_time_stretch(final_backing, speed)
-
-             # Save
-             subtype = _get_audio_subtype(final_ext, bit_depth)
-                  
-             dst_backing = os.path.join(output_dir, f"{backing_name}.{final_ext}")
-             src_np = final_backing.detach().cpu().t().numpy()
-             sf.write(dst_backing, src_np, backing_sr, subtype=subtype)
-             
-             # Convert if needed (MP3)
-             if final_ext == "mp3":
-                 if not os.path.exists(dst_backing) or os.path.getsize(dst_backing) < 100:
-                      temp_wav = dst_backing.replace(".mp3", ".wav")
-                      sf.write(temp_wav, src_np, backing_sr)
-                      from src.utils.resource_utils import get_ffmpeg_path
-                      result = subprocess.run([get_ffmpeg_path(), "-y", "-i", temp_wav, "-b:a", "320k", dst_backing], capture_output=True)
-                      if result.returncode != 0:
-                          logger.error(f"FFmpeg MP3 conversion failed: {result.stderr.decode()}")
-                      if os.path.exists(temp_wav): os.remove(temp_wav)
-
-             logger.info(f"Created Backing Track: {backing_name}")
+                logger.error(f"Band splitting failed: {e}")
+        by_rate[sr] = ([a.detach().cpu().t().numpy() for a in audios], band_sets)
 
-        except Exception as e:
-            logger.error(f"Failed to save backing track: {e}")
+    # Container layout: every stem and band of a target as channel groups of one file
+    container_layout = kwargs.get("output_layout", "files") == "container"
+    outputs = []
+    for target in targets:
+        audios, band_sets = by_rate[target.sample_rate]
+        stem_paths = []
+        target_outputs = []
+        for (stem_name, patterned, _), data in zip(rendered, audios):
+            if patterned:
+                path = target.stem_path(output_dir, base_name, stem_name)
+                stem_paths.append((stem_name, path))
+            else:
+                path = target.plain_path(output_dir, stem_name)
+            target_outputs.append((path, stem_name, data))
+        for (stem_name, path), (names, bands) in zip(stem_paths, band_sets or []):
+            for band_name, band in zip(names, bands):
+                band_path = f"{os.path.splitext(path)[0]}_{band_name}.{target.ext}"
+                target_outputs.append((band_path, f"{stem_name}_{band_name}", band))
+
+        if container_layout and supports_container(target.ext) and target_outputs:
+            container_path = target.plain_path(output_dir, f"{base_name}{CONTAINER_SUFFIX}")
+            outputs.append((container_path, "stems", [(name, data) for _, name, data in target_outputs], target))
+            continue
+        if container_layout:
+            logger.warning(f"{target.ext.upper()} has no multichannel stem container, writing separate files")
+        outputs.extend((path, name, data, target) for path, name, data in target_outputs)
 
-    # Cleanup Temp
-    shutil.rmtree(temp_root, ignore_errors=True)
-    
-    # Copy Original if requested (use original_input_file, not potentially converted input_file)
-    if keep_original:
-        try:
-            shutil.copy(original_input_file, os.path.join(output_dir, f"original{os.path.splitext(original_input_file)[1]}"))
-        except Exception as e:
-            logger.warning(f"Failed to copy original file: {e}")
-        
-    # No more complex Organize/Filter logic needed as we filtered in loop above.
-    # No more Enhancement logic? Wait, enhancement logic should run on the FINAL outputs.
-    # Re-add enhancement logic block here
-    
     # De-Reverb and De-Echo Processing
     dereverb_intensity = kwargs.get("dereverb", 0)
     deecho_intensity = kwargs.get("deecho", 0)
@@ -612,6 +696,35 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
         eq_low != 0 or eq_mid != 0 or eq_high != 0
     )
     
+    # Zipped as soon as written, under their final (suffixed) names. The primary
+    # vocals are left to the end when the enhancement stage will replace them.
+    held = set()
+    if any_enhancement and AdvancedAudioProcessor:
+        held.add(os.path.join(output_dir, f"vocals.{final_ext}"))
+
+    def archive_output(path):
+        if archive is not None and path not in held:
+            root, ext = os.path.splitext(os.path.relpath(path, output_dir))
+            archive.add(path, f"{root}{analysis_suffix}{ext}")
+
+    rendered = None
+    by_rate = None
+    _write_outputs(outputs, manifest, on_written=archive_output, job=job)
+    outputs = None
+    if job is not None:
+        job.reach(STAGE_WRITTEN)
+
+    # Copy Original if requested (use original_input_file, not potentially converted input_file)
+    if keep_original:
+        try:
+            shutil.copy(original_input_file, os.path.join(output_dir, f"original{os.path.splitext(original_input_file)[1]}"))
+        except Exception as e:
+            logger.warning(f"Failed to copy original file: {e}")
+        
+    # No more complex Organize/Filter logic needed as we filtered in loop above.
+    # No more Enhancement logic? Wait, enhancement logic should run on the FINAL outputs.
+    # Re-add enhancement logic block here
+    
     if any_enhancement and AdvancedAudioProcessor:
         try:
             # Reconstruct vocals file path
@@ -634,7 +747,8 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
                     eq_mid=kwargs.get("eq_mid", 0),
                     eq_high=kwargs.get("eq_high", 0),
                     compressor_intensity=kwargs.get("compressor", 0),
-                    exciter_intensity=kwargs.get("exciter", 0)
+                    exciter_intensity=kwargs.get("exciter", 0),
+                    workspace=workspace
                 )
                 
                 # Replace original with enhanced to maintain strict stem count
@@ -642,6 +756,7 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
                     try:
                         os.remove(vocals_file)
                         shutil.move(enhanced_file, vocals_file)
+                        manifest.add_output(vocals_file, "vocals", **measure_file(vocals_file))
                         logger.info(f"Replaced original vocals with enhanced version: {vocals_file}")
                     except Exception as e:
                         logger.warning(f"Failed to replace original vocals: {e}")
@@ -656,7 +771,7 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
         if os.path.exists(vocals_file):
             logger.info("Starting Vocals Only Pipeline (Ultra Clean / Invert)...")
             try:
-                processor = AdvancedAudioProcessor(output_dir)
+                processor = AdvancedAudioProcessor(output_dir, workspace=workspace)
                 
                 # Ultra Clean
                 final_vocals = processor.process_vocals_ultra_clean(input_file, vocals_file)
@@ -668,37 +783,39 @@ def separate_audio(input_file, output_dir, stem_count, quality, export_zip, keep
                     # Convert if extension mismatch (e.g. processor output WAV but we want MP3)
                     if not final_vocals.lower().endswith(f".{final_ext}"):
                          logger.info(f"Converting enhanced vocals to {final_ext}...")
-                         # Use bundled or system ffmpeg for conversion
-                         from src.utils.resource_utils import get_ffmpeg_path
-                         cmd = [get_ffmpeg_path(), "-y", "-v", "error", "-i", final_vocals]
-                         
-                         if final_ext == "mp3":
-                             cmd.extend(["-b:a", "320k"]) # High quality mp3
-                             
-                         cmd.append(dest_path)
-                         subprocess.run(cmd, check=True)
+                         if is_pipe_format(final_ext):
+                             transcode_file(final_vocals, dest_path, primary.bitrate)
+                         else:
+                             data, sr = sf.read(final_vocals, dtype='float32')
+                             sf.write(dest_path, data, sr, subtype=audio_subtype(final_ext, bit_depth))
                          
                          # Remove the temp wav
                          os.remove(final_vocals)
                     else:
                         shutil.move(final_vocals, dest_path)
+                    manifest.add_output(dest_path, "vocals_ultra_clean", **measure_file(dest_path))
                     
                     # Invert
                     if kwargs.get("invert", False):
                          inst_path = os.path.join(output_dir, f"instrumental_inverted.{final_ext}")
                          processor.invert_audio(input_file, dest_path, inst_path)
+                         manifest.add_output(inst_path, "instrumental_inverted", **measure_file(inst_path))
                          logger.info(f"Created Inverted Instrumental: {inst_path}")
             except Exception as e:
                 logger.error(f"Advanced Pipeline failed: {e}")
 
-    # Zip if requested
-    if export_zip:
-        shutil.make_archive(output_dir, 'zip', output_dir)
-    
-    # Clear GPU cache after processing to free memory (Performance Optimization)
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        logger.debug("GPU cache cleared after separation")
+    # Renamed last: the stages above look outputs up by their plain names
+    if analysis_suffix:
+        if archive is not None:
+            archive.flush()
+        outputs = [os.path.join(output_dir, rel) for rel in manifest.outputs()]
+        for old, new in _apply_filename_suffix(outputs, analysis_suffix).items():
+            manifest.rename(old, new)
+        logger.info(f"Added BPM/Key suffix to {len(outputs)} outputs: {analysis_suffix}")
+
+    if job is not None:
+        job.clear_checkpoint()
+    manifest.save()
 
 class SplitterWorker(QThread):
     progress_updated = pyqtSignal(str, int, str) # filename, progress, status
@@ -764,10 +881,21 @@ class SplitterWorker(QThread):
                 "pitch_shift": self.options.get("pitch_shift", 0),
                 "time_stretch": self.options.get("time_stretch", 1.0),
                 "split_bands": self.options.get("split_bands", False),
+                "band_crossovers": self.options.get("band_crossovers", "300, 4000"),
+                "bitrate": self.options.get("bitrate", "320k"),
+                "extra_formats": self.options.get("extra_formats", []),
+                "output_targets": self.options.get("output_targets"),
+                "output_layout": self.options.get("output_layout", "files"),
                 
                 # Other
                 "invert": self.options.get("invert", False),
-                "filename_pattern": self.options.get("filename_pattern", "{stem}")
+                "scratch_tmpfs": self.options.get("scratch_tmpfs", False),
+                "filename_pattern": self.options.get("filename_pattern", "{stem}"),
+                "include_bpm_key": self.options.get("include_bpm_key", False),
+                "stem_analysis": self.options.get("stem_analysis", False),
+                "skip_silence": self.options.get("skip_silence", False),
+                "resample_quality": self.options.get("resample_quality", "balanced"),
+                "journal_id": self.options.get("journal_id"),
             }
             
             config_json = json.dumps(config)
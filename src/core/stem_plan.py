@@ -0,0 +1,98 @@
+"""
+Stem Planner - decide what a separation job actually has to produce
+Single-stem modes run the models in two-stem configuration and only the
+wanted stems are loaded and blended; backing tracks ("no_drums", ...) are
+derived afterwards as mix minus stem in one step.
+"""
+from typing import Iterable, Optional, Tuple
+import torch
+from src.core import constants
+from src.utils.logger import logger
+
+# Mode -> the one stem the user asked for
+TARGET_STEMS = {
+    constants.MODE_VOCALS: "vocals",
+    constants.MODE_DRUMS: "drums",
+    constants.MODE_BASS: "bass",
+    constants.MODE_GUITAR: "guitar",
+    constants.MODE_PIANO: "piano",
+}
+
+SIX_SOURCE_STEMS = ("guitar", "piano")
+
+# audio-separator names its (two) outputs by role, not by file stem
+_SEPARATOR_SINGLE_STEM = {
+    constants.MODE_VOCALS: "Vocals",
+    constants.MODE_INSTRUMENTAL: "Instrumental",
+}
+
+
+class StemPlan:
+    """
+    What to ask the models for and which of their outputs to use.
+
+    two_stems: Demucs `--two-stems` target (None = all sources)
+    other_method: Demucs `--other-method` for the complement of `two_stems`
+    single_stem: audio-separator `output_single_stem` (None = all outputs)
+    keep: stem file names (without extension) to load and write; None = all
+    backing_name: output name of the backing track, derived as mix - target
+    """
+
+    def __init__(self, two_stems: Optional[str] = None, other_method: str = "add",
+                 single_stem: Optional[str] = None, keep: Optional[Tuple[str, ...]] = None,
+                 backing_name: Optional[str] = None):
+        self.two_stems = two_stems
+        self.other_method = other_method
+        self.single_stem = single_stem
+        self.keep = keep
+        self.backing_name = backing_name
+
+    def demucs_two_stems(self, model_name: str) -> Optional[str]:
+        """`two_stems` if the model has that source (guitar/piano only exist in 6-source models)."""
+        if not model_has_source(model_name, self.two_stems):
+            return None
+        return self.two_stems
+
+    def wants(self, stem_name: str) -> bool:
+        return self.keep is None or stem_name in self.keep
+
+    def __repr__(self):
+        return (f"StemPlan(two_stems={self.two_stems}, other={self.other_method}, "
+                f"keep={self.keep}, backing={self.backing_name})")
+
+
+def model_has_source(model_name: str, stem: Optional[str]) -> bool:
+    """Guitar and piano are only separated by 6-source models."""
+    return stem not in SIX_SOURCE_STEMS or "6s" in model_name.lower()
+
+
+def plan_stems(mode: str, stem_count: int, models: Optional[Iterable[str]] = None) -> StemPlan:
+    """
+    Cheapest model configuration that still yields every output of `mode`.
+    When none of `models` has the requested source (guitar/piano on a
+    4-source model), all sources are written instead.
+    """
+    if mode == constants.MODE_INSTRUMENTAL:
+        # The model's own complement (sum of the non-vocal sources) is the output
+        return StemPlan(two_stems="vocals", single_stem=_SEPARATOR_SINGLE_STEM[mode],
+                        keep=("no_vocals", "instrumental"))
+
+    target = TARGET_STEMS.get(mode)
+    if target is not None and models is not None and not any(model_has_source(m, target) for m in models):
+        logger.warning(f"No {target} stem in {', '.join(models)} (needs a 6-source model), writing all sources")
+        return StemPlan()
+    if target is not None:
+        backing = None if mode == constants.MODE_VOCALS else f"no_{target}"
+        return StemPlan(two_stems=target, other_method="none",
+                        single_stem=_SEPARATOR_SINGLE_STEM.get(mode),
+                        keep=(target,), backing_name=backing)
+
+    if stem_count == 2:
+        return StemPlan(two_stems="vocals")
+    return StemPlan()
+
+
+def derive_backing(mix: torch.Tensor, stem: torch.Tensor) -> torch.Tensor:
+    """Everything but `stem`: mix - stem over the common length, in one vectorized step."""
+    n = min(mix.shape[1], stem.shape[1])
+    return torch.sub(mix[:, :n], stem[:, :n])
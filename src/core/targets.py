@@ -0,0 +1,103 @@
+"""
+Output Targets - one job, several export formats
+A target is a (format, bit depth, sample rate, filename pattern, bitrate)
+combination. All targets of a job are written from the same in-memory
+stems, so extra formats only cost encoding time.
+"""
+import os
+from typing import List, Optional
+from src.utils.logger import logger
+
+# Format name (as shown in the UI) -> file extension
+FORMAT_EXTENSIONS = {
+    "wav": "wav",
+    "mp3": "mp3",
+    "flac": "flac",
+    "ogg": "ogg",
+    "aiff": "aiff",
+    "m4a": "m4a",
+}
+
+
+def audio_subtype(ext: str, bit_depth: str) -> Optional[str]:
+    """soundfile subtype for lossless formats (None lets libsndfile choose)."""
+    if ext in ['wav', 'flac', 'aiff']:
+        if "32" in bit_depth:
+            return "FLOAT"
+        elif "24" in bit_depth:
+            return "PCM_24"
+        else:
+            return "PCM_16"
+    return None
+
+
+class OutputTarget:
+    """One export format of a job's stems."""
+
+    def __init__(self, format: str = "WAV", bit_depth: str = "16-bit", sample_rate: int = 44100,
+                 filename_pattern: str = "{stem}", bitrate: Optional[str] = None):
+        self.format = format
+        self.ext = FORMAT_EXTENSIONS.get(str(format).lower(), "wav")
+        self.bit_depth = bit_depth
+        self.sample_rate = int(sample_rate)
+        # Every stem needs its own file name
+        self.filename_pattern = filename_pattern if "{stem}" in filename_pattern else filename_pattern + "_{stem}"
+        self.bitrate = bitrate
+        # Sub-folder that keeps this target apart from another one with the same file names
+        self.folder = ""
+
+    @property
+    def subtype(self) -> Optional[str]:
+        return audio_subtype(self.ext, self.bit_depth)
+
+    def stem_path(self, output_dir: str, track: str, stem: str) -> str:
+        rel_path = self.filename_pattern.replace("{track}", track).replace("{stem}", stem)
+        return os.path.join(output_dir, f"{rel_path}.{self.ext}")
+
+    def plain_path(self, output_dir: str, name: str) -> str:
+        """Outputs with fixed names (e.g. backing tracks), placed in the target's folder."""
+        return os.path.join(output_dir, self.folder, f"{name}.{self.ext}")
+
+    def to_dict(self) -> dict:
+        return {
+            "format": self.format, "bit_depth": self.bit_depth, "sample_rate": self.sample_rate,
+            "filename_pattern": self.filename_pattern, "bitrate": self.bitrate,
+        }
+
+    def __repr__(self):
+        return f"OutputTarget({self.ext}, {self.sample_rate} Hz, {self.bit_depth}, '{self.filename_pattern}')"
+
+
+def targets_from_options(options: dict) -> List[OutputTarget]:
+    """
+    Targets of a job. An explicit `output_targets` list (dicts) wins; otherwise
+    the main format settings plus one target per entry of `extra_formats`.
+    The first target is the primary one that post-processing works on.
+    """
+    base = {
+        "format": options.get("format", "WAV"),
+        "bit_depth": options.get("bit_depth", "16-bit"),
+        "sample_rate": options.get("sample_rate", 44100),
+        "filename_pattern": options.get("filename_pattern", "{stem}"),
+        "bitrate": options.get("bitrate"),
+    }
+    specs = options.get("output_targets") or [base] + [
+        {**base, "format": fmt} for fmt in options.get("extra_formats", [])
+    ]
+
+    targets = []
+    seen = set()
+    for spec in specs:
+        target = OutputTarget(**{**base, **spec})
+        key = (target.ext, target.filename_pattern)
+        if key in seen:
+            # Same files as an earlier target (e.g. WAV at two rates): give it its own folder
+            target.folder = f"{target.ext.upper()}_{target.sample_rate}"
+            target.filename_pattern = f"{target.folder}/{target.filename_pattern}"
+            key = (target.ext, target.filename_pattern)
+        if key in seen:
+            logger.warning(f"Skipping duplicate output target {target}")
+            continue
+        seen.add(key)
+        targets.append(target)
+    return targets
@@ -0,0 +1,243 @@
+"""
+Hot Folder Watcher - pick up audio files dropped into watched folders
+On Linux, inotify (through libc, no extra package) reports which files
+changed; elsewhere, or when inotify can't be set up, the folders are
+rescanned on an interval. A file is handed out only after its size and
+mtime have stayed the same for a settle period, so copies still in flight
+(e.g. from another workstation) are not picked up half-written.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.logger import logger
+from src.core.scanner import AUDIO_EXTENSIONS, iter_audio_files, _skip_dir
+
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _libc.inotify_init1
+    _libc.inotify_add_watch
+    INOTIFY_AVAILABLE = sys.platform.startswith("linux")
+except (OSError, AttributeError):
+    _libc = None
+    INOTIFY_AVAILABLE = False
+
+# A file must be unchanged this long before it is handed out
+SETTLE_SECONDS = 5.0
+# Rescan interval when polling, and the longest wait between settle checks
+POLL_INTERVAL = 2.0
+# inotify doesn't see writes made by other machines on network mounts (NFS/SMB),
+# so the folders are still rescanned now and then with inotify active
+RESCAN_INTERVAL = 60.0
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_BYTES = 64 * 1024
+
+
+class _Inotify:
+    """Minimal inotify instance: directory watches and decoded events."""
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self._dirs: Dict[int, str] = {}
+
+    def add(self, directory: str) -> bool:
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.warning("inotify watch limit reached (fs.inotify.max_user_watches); "
+                               f"{directory} is only picked up by rescans")
+            else:
+                logger.debug(f"Cannot watch {directory}: {os.strerror(err)}")
+            return False
+        self._dirs[wd] = directory
+        return True
+
+    def read(self, timeout: float) -> List[Tuple[Optional[str], str, int]]:
+        """(directory, name, mask) events; directory is None after a queue overflow."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, _READ_BYTES)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                start = offset + _EVENT_HEADER.size
+                name = buf[start:start + length].split(b"\0", 1)[0]
+                offset = start + length
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, "", mask))
+                elif mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                elif wd in self._dirs:
+                    events.append((self._dirs[wd], os.fsdecode(name), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _readable(path: str) -> bool:
+    """Writers on some shares hold the file locked until the copy is done."""
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+class HotFolderWatcher:
+    """
+    Reports audio files below `folders` once they have settled.
+
+    Files present when the watcher starts count as new. `poll()` waits for
+    activity (at most `poll_interval`) and returns the files that became
+    ready; a file is returned again only if it changes afterwards.
+    """
+
+    def __init__(self, folders: Iterable[str], settle_seconds: float = SETTLE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, rescan_interval: float = RESCAN_INTERVAL,
+                 use_inotify: bool = True):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self._pending: Dict[str, Tuple[int, int, float]] = {}  # {path: (size, mtime_ns, unchanged since)}
+        self._handed: Dict[str, Tuple[int, int]] = {}
+        self._last_scan: Optional[float] = None
+        self._stop = threading.Event()
+
+        self._inotify = None
+        if use_inotify and INOTIFY_AVAILABLE:
+            try:
+                self._inotify = _Inotify()
+                for folder in self.folders:
+                    self._watch_tree(folder)
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}), polling every {poll_interval:g}s")
+                self._inotify = None
+        logger.info(f"Watching {len(self.folders)} folder(s) ({self.mode}), "
+                    f"files settle after {settle_seconds:g}s")
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _watch_tree(self, root: str):
+        self._inotify.add(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not _skip_dir(d))
+            for d in dirnames:
+                self._inotify.add(os.path.join(dirpath, d))
+
+    def _consider(self, path: str, size: int, mtime_ns: int, now: float):
+        if self._handed.get(path) == (size, mtime_ns):
+            return
+        entry = self._pending.get(path)
+        if entry is None or entry[:2] != (size, mtime_ns):
+            self._pending[path] = (size, mtime_ns, now)
+
+    def _scan(self, folders: List[str], now: float):
+        for path, size, mtime_ns in iter_audio_files(folders):
+            self._consider(path, size, mtime_ns, now)
+
+    def _handle_events(self, timeout: float):
+        events = self._inotify.read(timeout)
+        now = time.monotonic()
+        for directory, name, mask in events:
+            if directory is None:
+                logger.warning("inotify queue overflowed, rescanning watched folders")
+                self._last_scan = None
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not _skip_dir(name):
+                    # A new (or moved-in) folder may already hold files
+                    self._watch_tree(path)
+                    self._scan([path], now)
+            elif os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    self._pending.pop(path, None)
+                    continue
+                self._consider(path, st.st_size, st.st_mtime_ns, now)
+
+    def _settled(self, now: float) -> List[str]:
+        ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+                continue
+            # Empty files are placeholders of copies that haven't started
+            if size == 0 or now - since < self.settle_seconds or not _readable(path):
+                continue
+            del self._pending[path]
+            self._handed[path] = (size, mtime_ns)
+            ready.append(path)
+        return sorted(ready)
+
+    def poll(self) -> List[str]:
+        """Wait for changes (or the next check) and return the files that have settled."""
+        wait = self.poll_interval
+        if self._last_scan is None:
+            wait = 0
+        elif self._pending:
+            wait = min(wait, max(self.settle_seconds / 4, 0.05))
+
+        if self._inotify is not None:
+            self._handle_events(wait)
+        else:
+            self._stop.wait(wait)
+
+        now = time.monotonic()
+        interval = self.rescan_interval if self._inotify is not None else self.poll_interval
+        if self._last_scan is None or now - self._last_scan >= interval:
+            self._scan(self.folders, now)
+            self._last_scan = now
+        return self._settled(now)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -0,0 +1,94 @@
+"""
+Per-Job Scratch Workspace
+Every temporary artifact of a job lives in its own private directory,
+which is removed in a single operation when the job ends.
+"""
+import os
+import re
+import sys
+import shutil
+import tempfile
+from src.utils.logger import logger
+
+# Name of the scratch parent created inside an output folder (when not on tmpfs)
+SCRATCH_DIRNAME = ".bds_scratch"
+
+# Environment override for the scratch parent (e.g. a fast local SSD)
+SCRATCH_ENV_VAR = "BEATDESTACK_SCRATCH_DIR"
+
+
+def _tmpfs_root() -> str | None:
+    """Return a RAM-backed temp directory if the platform has one."""
+    if sys.platform.startswith("linux") and os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return None
+
+
+class JobWorkspace:
+    """
+    Isolated scratch directory for one processing job.
+
+    The directory name is unique (mkdtemp), so concurrent jobs writing to the
+    same output folder never see each other's files. Artifacts are registered
+    through `path()` / `track()` instead of being rediscovered by scanning.
+    """
+
+    def __init__(self, output_dir: str, label: str = "job", use_tmpfs: bool = False):
+        parent = os.environ.get(SCRATCH_ENV_VAR)
+        if not parent and use_tmpfs:
+            parent = _tmpfs_root()
+            if parent is None:
+                logger.debug("tmpfs scratch requested but not available, using output folder")
+        if not parent:
+            parent = os.path.join(output_dir, SCRATCH_DIRNAME)
+        os.makedirs(parent, exist_ok=True)
+
+        safe_label = re.sub(r"[^\w\-]+", "_", label)[:40] or "job"
+        self.parent = parent
+        self.root = tempfile.mkdtemp(prefix=f"{safe_label}_", dir=parent)
+        self.artifacts: list[str] = []
+        logger.debug(f"Job workspace: {self.root}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def path(self, name: str) -> str:
+        """Reserve (and track) a file path inside the workspace."""
+        p = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        self.artifacts.append(p)
+        return p
+
+    def subdir(self, *parts: str) -> str:
+        """Create (and track) a sub-directory inside the workspace."""
+        d = os.path.join(self.root, *parts)
+        os.makedirs(d, exist_ok=True)
+        self.artifacts.append(d)
+        return d
+
+    def track(self, paths) -> list:
+        """Register artifacts created by external tools; relative names resolve to the workspace."""
+        if isinstance(paths, str):
+            paths = [paths]
+        resolved = [p if os.path.isabs(p) else os.path.join(self.root, p) for p in paths]
+        self.artifacts.extend(resolved)
+        return resolved
+
+    def cleanup(self):
+        """Remove the whole workspace in one operation."""
+        if not self.root:
+            return
+        shutil.rmtree(self.root, ignore_errors=True)
+        logger.debug(f"Removed job workspace ({len(self.artifacts)} tracked artifacts): {self.root}")
+        self.root = None
+        self.artifacts = []
+        # Drop the shared parent when we were the last job using it
+        if os.path.basename(self.parent) == SCRATCH_DIRNAME:
+            try:
+                os.rmdir(self.parent)
+            except OSError:
+                pass
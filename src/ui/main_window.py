@@ -129,6 +129,15 @@ class MainWindow(QMainWindow):
         
         # Setup keyboard shortcuts
         self._setup_shortcuts()
+        
+        # Bring back the queue of a session that crashed
+        self._restore_journal()
+    
+    def closeEvent(self, event):
+        """Stop the analysis pool so its processes don't outlive the window."""
+        if hasattr(self, 'analysis_pool'):
+            self.analysis_pool.shutdown()
+        super().closeEvent(event)
     
     def _setup_shortcuts(self):
         """Setup global keyboard shortcuts."""
@@ -572,13 +581,13 @@ class MainWindow(QMainWindow):
             if os.path.exists(file_path):
                 stems["Original"] = file_path
             
-            supported_exts = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
+            supported_exts = ('.wav', '.mp3', '.flac', '.ogg', '.m4a', '.caf')
             try:
                 for f in os.listdir(output_dir):
                     if f.lower().endswith(supported_exts):
                         name = os.path.splitext(f)[0]
                         clean_name = name.replace(f"{base_name}_", "").replace(f"{base_name} ", "")
-                        stems[clean_name] = os.path.join(output_dir, f)
+                        self._add_stem_source(stems, clean_name, os.path.join(output_dir, f))
             except Exception as e:
                 self.append_log(f"Error scanning stems directory: {e}\n")
                 return
@@ -586,6 +595,15 @@ class MainWindow(QMainWindow):
             if stems:
                 self.player_widget.load_stems(stems)
 
+    def _add_stem_source(self, stems, name, path):
+        """Add an output file to a player dict; stem containers add each stem they hold."""
+        from src.core.container import is_container, StemContainer
+        if is_container(path):
+            for stem in StemContainer(path).names:
+                stems[stem] = (path, stem)
+        else:
+            stems[name] = path
+
     def _update_gpu_status(self):
         """Update GPU status display."""
         is_gpu, device_name, _ = get_gpu_info()
@@ -638,24 +656,97 @@ class MainWindow(QMainWindow):
         if files:
             self.add_files_to_queue(files)
 
-    def add_files_to_queue(self, files):
+    def add_files_to_queue(self, files, journal=True, load_waveform=True):
+        if journal:
+            self._journal_files(files)
         for f in files:
-            item = QListWidgetItem(self.queue_list)
-            item.setData(Qt.ItemDataRole.UserRole, f)
-            widget = QueueItemWidget(os.path.basename(f))
-            item.setSizeHint(widget.sizeHint())
-            self.queue_list.addItem(item)
-            self.queue_list.setItemWidget(item, widget)
-            
-            widget.cancel_requested.connect(lambda i=item: self.remove_queue_item(i))
-            widget.open_folder_requested.connect(lambda i=item: self.open_item_folder(i))
-            widget.resplit_requested.connect(lambda i=item: self.resplit_item(i))
-            widget.midi_export_requested.connect(self.start_midi_export)
+            self._add_queue_row(f)
 
         # Auto-load the first file's waveform if this is a fresh batch
         if files:
-            self.player_widget.load_input_waveform(files[0]) # Load into bottom player
+            if load_waveform:
+                self.player_widget.load_input_waveform(files[0]) # Load into bottom player
             # self.visualizer.load_file(files[0]) 
+            self._start_analysis(files)
+
+    def _add_queue_row(self, file_path):
+        """Queue list row for one input (status "Pending")."""
+        if not hasattr(self, 'queue_widgets'):
+            self.queue_widgets = {}
+        item = QListWidgetItem(self.queue_list)
+        item.setData(Qt.ItemDataRole.UserRole, file_path)
+        widget = QueueItemWidget(os.path.basename(file_path))
+        self.queue_widgets[file_path] = widget
+        item.setSizeHint(widget.sizeHint())
+        self.queue_list.addItem(item)
+        self.queue_list.setItemWidget(item, widget)
+        
+        widget.cancel_requested.connect(lambda i=item: self.remove_queue_item(i))
+        widget.open_folder_requested.connect(lambda i=item: self.open_item_folder(i))
+        widget.resplit_requested.connect(lambda i=item: self.resplit_item(i))
+        widget.midi_export_requested.connect(self.start_midi_export)
+        return widget
+
+    @staticmethod
+    def _output_dir_for(file_path):
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(os.path.dirname(file_path), f"{base_name} - Stems")
+
+    def _journal_files(self, files):
+        """Journal queued files with the current settings, so the queue survives a crash."""
+        from src.core.journal import get_journal
+        journal = get_journal()
+        if journal is None or not files:
+            return
+        options = self._job_options()
+        for f in files:
+            journal.enqueue(f, self._output_dir_for(f), options, source="gui")
+
+    def _forget_journaled(self, files):
+        from src.core.journal import get_journal, job_key
+        journal = get_journal()
+        if journal is not None:
+            journal.remove(job_key(f, self._output_dir_for(f)) for f in files)
+
+    def _restore_journal(self):
+        """Queue the jobs the last session didn't finish; resumed jobs skip the stages they completed."""
+        from src.core.journal import get_journal
+        journal = get_journal()
+        if journal is None:
+            return
+        jobs = [job for job in journal.unfinished(source="gui") if os.path.exists(job["input"])]
+        files = [job["input"] for job in jobs]
+        if not files:
+            return
+        self.add_files_to_queue(files, journal=False)
+        for job in jobs:
+            duplicates = [d for d in job["duplicates"] if os.path.exists(d)]
+            if duplicates:
+                self._set_duplicates(job["input"], duplicates)
+        self.append_log(f"Restored {len(files)} unfinished job(s) from the last session. "
+                        f"Press Start to resume.\n")
+
+    def _start_analysis(self, files):
+        """Look up cached BPM/Key in the background; the analysis pool handles the rest."""
+        from PyQt6.QtCore import QSettings
+        settings = QSettings("BeatDeStack", "BeatDeStackExtended")
+        tier = settings.value("performance/analysis_tier", "full")
+        if not hasattr(self, 'analysis_pool'):
+            from src.ui.workers import AnalysisPool
+            self.analysis_pool = AnalysisPool(duration=30.0, tier=tier, parent=self)
+            self.analysis_pool.finished.connect(self._on_analysis_finished)
+            self.analysis_pool.submitted.connect(self._on_analysis_submitted)
+        self.analysis_pool.set_tier(tier)
+        self.analysis_pool.submit(files)
+
+    def _on_analysis_submitted(self, hits, total):
+        if hits:
+            self.append_log(f"BPM/Key: {hits} cached, {total - hits} to analyze.\n")
+
+    def _on_analysis_finished(self, file_path, result):
+        widget = getattr(self, 'queue_widgets', {}).get(file_path)
+        if widget is not None:
+            widget.set_analysis(result)
 
     def start_midi_export(self, audio_paths, batch_mode=False):
         """Start MIDI export for a specific stem or list of stems."""
@@ -738,12 +829,32 @@ class MainWindow(QMainWindow):
                     except Exception as e:
                         logger.error(f"Failed to clean up output directory: {e}")
         
+        file_path = item.data(Qt.ItemDataRole.UserRole)
+        if hasattr(self, 'analysis_pool'):
+            self.analysis_pool.cancel(file_path)
+        getattr(self, 'queue_widgets', {}).pop(file_path, None)
+        self._forget_journaled([file_path])
+        
         row = self.queue_list.row(item)
         self.queue_list.takeItem(row)
+        
+        # Its duplicates were waiting for its outputs: the first one is separated instead
+        duplicates = getattr(self, 'duplicate_inputs', {}).pop(file_path, [])
+        if duplicates:
+            self.add_files_to_queue(duplicates[:1], load_waveform=False)
+            self._set_duplicates(duplicates[0], duplicates[1:])
+            self.append_log(f"{os.path.basename(duplicates[0])} is separated instead of the removed "
+                            f"{os.path.basename(file_path)}\n")
 
     def _on_clear_queue(self):
         """Clear queue and player tracks."""
+        self._forget_journaled([self.queue_list.item(i).data(Qt.ItemDataRole.UserRole)
+                                for i in range(self.queue_list.count())])
         self.queue_list.clear()
+        self.queue_widgets = {}
+        self.duplicate_inputs = {}
+        if hasattr(self, 'analysis_pool'):
+            self.analysis_pool.cancel_all()
         if hasattr(self, 'player_widget'):
             self.player_widget.load_input_waveform("") # Clears loaded waveform/tracks
             self.player_widget.waveform.setVisible(False) # Ensure waveform is hidden
@@ -788,6 +899,31 @@ class MainWindow(QMainWindow):
         widget = self.queue_list.itemWidget(item)
         file_path = item.data(Qt.ItemDataRole.UserRole)
         
+        options = {
+            **self._job_options(),
+            "output_dir": os.path.dirname(file_path), # Will be overridden by worker logic for folders
+        }
+        
+        from src.core.journal import get_journal, job_key, STAGE_QUEUED, STATE_DONE
+        journal = get_journal()
+        if journal is not None:
+            output_dir = self._output_dir_for(file_path)
+            job = journal.get(job_key(file_path, output_dir))
+            if job is not None and job["state"] != STATE_DONE and job["stage"] != STAGE_QUEUED:
+                # Interrupted job: finish it with the settings it was started with
+                options = job["options"]
+                self.append_log(f"Resuming {os.path.basename(file_path)} after stage '{job['stage']}'\n")
+            options["journal_id"] = journal.enqueue(file_path, output_dir, options, source="gui")
+        
+        self.worker = SplitterWorker(file_path, options)
+        self.worker.progress_updated.connect(widget.update_progress)
+        self.worker.log_message.connect(lambda msg: self.append_log(msg + "\n"))
+        self.worker.finished.connect(lambda _: self.on_worker_finished(item))
+        self.worker.error_occurred.connect(lambda f, e: self.on_worker_error(item, e))
+        self.worker.start()
+
+    def _job_options(self):
+        """Separation options from the panels and global settings (without the output folder)."""
         # Get values from panels
         stem_count, mode = self.stem_panel.get_stem_config()
         enhance_values = self.enhance_panel.get_values()
@@ -799,11 +935,11 @@ class MainWindow(QMainWindow):
         from PyQt6.QtCore import QSettings
         settings = QSettings("BeatDeStack", "BeatDeStackExtended")
         filename_pattern = settings.value("output/filename_pattern", "{stem}")
+        scratch_tmpfs = settings.value("performance/scratch_tmpfs", False, type=bool)
         
         options = {
             "stem_count": stem_count,
             "mode": mode,
-            "output_dir": os.path.dirname(file_path), # Will be overridden by worker logic for folders
             "quality": self.quality_panel.get_quality(),
             "export_zip": mode == "zip",
             "keep_original": False, # Usually false for internal processing unless requested
@@ -812,18 +948,16 @@ class MainWindow(QMainWindow):
             "bit_depth": output_values["bit_depth"],
             "invert": self.stem_panel.is_invert_enabled(),
             "filename_pattern": filename_pattern,
+            "scratch_tmpfs": scratch_tmpfs,
+            "stem_analysis": settings.value("performance/stem_analysis", True, type=bool),
+            "skip_silence": settings.value("performance/skip_silence", False, type=bool),
+            "resample_quality": settings.value("performance/resample_quality", "balanced"),
             **enhance_values,
             **manip_values,
             **output_values,
             **advanced_values
         }
-        
-        self.worker = SplitterWorker(file_path, options)
-        self.worker.progress_updated.connect(widget.update_progress)
-        self.worker.log_message.connect(lambda msg: self.append_log(msg + "\n"))
-        self.worker.finished.connect(lambda _: self.on_worker_finished(item))
-        self.worker.error_occurred.connect(lambda f, e: self.on_worker_error(item, e))
-        self.worker.start()
+        return options
 
     def start_preview(self):
         """Generate a 30s preview for the selected item."""
@@ -880,6 +1014,7 @@ class MainWindow(QMainWindow):
         from PyQt6.QtCore import QSettings
         settings = QSettings("BeatDeStack", "BeatDeStackExtended")
         filename_pattern = settings.value("output/filename_pattern", "{stem}")
+        scratch_tmpfs = settings.value("performance/scratch_tmpfs", False, type=bool)
         
         options = {
             "stem_count": stem_count,
@@ -893,10 +1028,12 @@ class MainWindow(QMainWindow):
             "bit_depth": output_values["bit_depth"],
             "invert": self.stem_panel.is_invert_enabled(),
             "filename_pattern": filename_pattern,
+            "scratch_tmpfs": scratch_tmpfs,
             **self.enhance_panel.get_values(),
             **self.manip_panel.get_values(),
             **output_values,
-            **self.advanced_panel.get_values()
+            **self.advanced_panel.get_values(),
+            "include_bpm_key": False  # The player maps preview stems by their plain names
         }
         
         self.worker = SplitterWorker(temp_slice_path, options)
@@ -917,13 +1054,13 @@ class MainWindow(QMainWindow):
         # Auto-load into player
         stems = {}
         # Support exts
-        EXTS = ('.wav', '.mp3', '.flac')
+        EXTS = ('.wav', '.mp3', '.flac', '.caf')
         try:
             for f in os.listdir(output_dir):
                 if f.lower().endswith(EXTS):
                     name = os.path.splitext(f)[0]
                     clean = name.replace(f"{base_name}_", "").replace(f"{base_name} ", "")
-                    stems[clean] = os.path.join(output_dir, f)
+                    self._add_stem_source(stems, clean, os.path.join(output_dir, f))
         except Exception:
             pass
             
@@ -945,6 +1082,20 @@ class MainWindow(QMainWindow):
 
         widget = self.queue_list.itemWidget(item)
         widget.update_progress(None, 100, "Done", output_files=output_files)
+        if os.path.exists(output_dir):
+            from src.core.job_index import settings_fingerprint
+            fingerprint = settings_fingerprint(self.worker.options)
+            if not hasattr(self, 'finished_outputs'):
+                self.finished_outputs = {}
+            self.finished_outputs[file_path] = (output_dir, fingerprint)
+            self._record_completed(file_path, output_dir, fingerprint)
+            self._replicate_duplicates(file_path, output_dir, fingerprint)
+        
+        # Separation may have refined BPM/Key from the stems
+        from src.core.analysis import get_cached_analyses
+        refined = get_cached_analyses([file_path], duration=30.0)
+        if file_path in refined:
+            widget.set_analysis(refined[file_path])
         
         play_notification_sound()
             
@@ -957,10 +1108,24 @@ class MainWindow(QMainWindow):
             
         self.start_processing()
 
+    def _record_completed(self, file_path, output_dir, fingerprint):
+        """Remember the finished job so folder scans skip it while the settings stay the same."""
+        from src.core.job_index import get_job_index
+        index = get_job_index()
+        if index is not None:
+            index.record(file_path, fingerprint, output_dir)
+
     def on_worker_error(self, item, error):
         widget = self.queue_list.itemWidget(item)
         widget.status_label.setText(f"Error: {error}")
         widget.status_label.setStyleSheet(f"color: {COLORS['danger']};")
+        file_path = item.data(Qt.ItemDataRole.UserRole)
+        for duplicate in getattr(self, 'duplicate_inputs', {}).pop(file_path, []):
+            # Same audio, same failure: shown as failed rather than separated again
+            dup_widget = self._add_queue_row(duplicate)
+            dup_widget.status_label.setText(f"Error: {error} (same audio as {os.path.basename(file_path)})")
+            dup_widget.status_label.setStyleSheet(f"color: {COLORS['danger']};")
+        self._set_duplicates(file_path, [])
         self.start_processing()
 
     # --- Sidebar Navigation Methods ---
@@ -1024,15 +1189,77 @@ class MainWindow(QMainWindow):
             # Insert at same position as center_panel (index 1, after sidebar)
             self.main_layout.insertWidget(1, self.batch_view, 1)
             # Connect signal
-            self.batch_view.files_ready.connect(self._on_batch_files_ready)
+            self.batch_view.scan_requested.connect(self._start_folder_scan)
         
         self.batch_view.show()
 
-    def _on_batch_files_ready(self, files):
-        """Handle files ready from batch view."""
-        self.add_files_to_queue(files)
+    def _start_folder_scan(self, folders, dedup):
+        """Scan batch folders in the background; files are queued as they are found."""
+        from src.ui.workers import FolderScanWorker
+        from src.core.job_index import settings_fingerprint
+        if hasattr(self, 'scan_worker') and self.scan_worker.isRunning():
+            self.append_log("A folder scan is already running.\n")
+            return
         self._switch_view(0)  # Switch back to home
-        self.append_log(f"Added {len(files)} files from batch processing.\n")
+        self.append_log(f"Scanning {len(folders)} folder(s) for new audio files...\n")
+        self._scan_counts = [0, 0]  # queued, duplicates
+        self.scan_worker = FolderScanWorker(folders, settings_fingerprint(self._job_options()), dedup, self)
+        self.scan_worker.files_found.connect(self._on_scan_files_found)
+        self.scan_worker.duplicates_found.connect(self._on_duplicates_found)
+        self.scan_worker.finished.connect(self._on_folder_scan_finished)
+        self.scan_worker.start()
+    
+    def _on_scan_files_found(self, files):
+        # Only the scan's first batch goes to the player: reloading it per batch resets playback
+        first_batch = self._scan_counts[0] == 0
+        self._scan_counts[0] += len(files)
+        self.add_files_to_queue(files, load_waveform=first_batch)
+        if hasattr(self, 'batch_view'):
+            self.batch_view.set_scan_progress(self._scan_counts[0], 0, self._scan_counts[1])
+    
+    def _on_duplicates_found(self, duplicates):
+        """Duplicates get the outputs of their kept file once it is done."""
+        self._scan_counts[1] += len(duplicates)
+        by_kept = {}
+        for duplicate, kept in duplicates.items():
+            by_kept.setdefault(kept, []).append(duplicate)
+        for kept, new in by_kept.items():
+            self._set_duplicates(kept, getattr(self, 'duplicate_inputs', {}).get(kept, []) + new)
+            finished = getattr(self, 'finished_outputs', {}).get(kept)
+            if finished:
+                self._replicate_duplicates(kept, *finished)
+    
+    def _set_duplicates(self, kept, duplicates):
+        """Duplicates waiting for the outputs of `kept`; journaled so they survive a crash."""
+        from src.core.journal import get_journal, job_key
+        if not hasattr(self, 'duplicate_inputs'):
+            self.duplicate_inputs = {}
+        if duplicates:
+            self.duplicate_inputs[kept] = list(duplicates)
+        else:
+            self.duplicate_inputs.pop(kept, None)
+        journal = get_journal()
+        if journal is not None:
+            journal.set_duplicates(job_key(kept, self._output_dir_for(kept)), duplicates)
+    
+    def _on_folder_scan_finished(self, queued, skipped, duplicates):
+        if hasattr(self, 'batch_view'):
+            self.batch_view.set_scan_progress(queued, skipped, duplicates, done=True)
+        self.append_log(f"Added {queued} files from batch processing ({skipped} already done with these "
+                        f"settings, {duplicates} duplicates will reuse their results).\n")
+    
+    def _replicate_duplicates(self, file_path, output_dir, fingerprint):
+        """Link the finished outputs into the Stems folder of each duplicate of `file_path`."""
+        from src.core.dedup import replicate_outputs
+        for duplicate in getattr(self, 'duplicate_inputs', {}).pop(file_path, []):
+            dup_base = os.path.splitext(os.path.basename(duplicate))[0]
+            dup_dir = os.path.join(os.path.dirname(duplicate), f"{dup_base} - Stems")
+            try:
+                replicate_outputs(output_dir, dup_dir, file_path, duplicate)
+                self._record_completed(duplicate, dup_dir, fingerprint)
+                self.append_log(f"Duplicate: {os.path.basename(duplicate)} reuses {os.path.basename(file_path)}\n")
+            except OSError as e:
+                self.append_log(f"Failed to place outputs for duplicate {os.path.basename(duplicate)}: {e}\n")
     
     def _show_batch_placeholder(self):
         """Switch to batch view."""
@@ -1093,6 +1320,9 @@ class MainWindow(QMainWindow):
             idx = self.output_panel.combo_rate.findText(str(preset["sample_rate"]))
             if idx >= 0:
                 self.output_panel.combo_rate.setCurrentIndex(idx)
+        if "extra_formats" in preset:
+            for fmt, chk in self.output_panel.extra_format_checks.items():
+                chk.setChecked(fmt in preset["extra_formats"])
         
         self.append_log(f"Applied preset: {name}\n")
     
@@ -1121,6 +1351,7 @@ class MainWindow(QMainWindow):
             "denoise": enhance_vals.get("denoise"),
             "format": output_vals.get("format"),
             "sample_rate": output_vals.get("sample_rate"),
+            "extra_formats": output_vals.get("extra_formats", []),
         }
         
         if save_preset(name, settings):
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
     QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, 
-    QSpinBox, QDoubleSpinBox, QCheckBox
+    QSpinBox, QDoubleSpinBox, QCheckBox, QLineEdit
 )
 
 
@@ -49,6 +49,15 @@ class ManipulationPanel(QGroupBox):
         self.chk_split_bands.setToolTip("Generate separate Low, Mid, and High freq files for each stem")
         layout.addWidget(self.chk_split_bands)
         
+        bands_layout = QHBoxLayout()
+        bands_layout.addWidget(QLabel("Crossovers (Hz):"))
+        bands_layout.addStretch()
+        self.txt_crossovers = QLineEdit("300, 4000")
+        self.txt_crossovers.setToolTip("Comma-separated crossover frequencies. N frequencies give N+1 bands that sum back to the stem.")
+        self.txt_crossovers.setFixedWidth(120)
+        bands_layout.addWidget(self.txt_crossovers)
+        layout.addLayout(bands_layout)
+        
         self.setLayout(layout)
     
     def _on_toggle(self, checked):
@@ -65,5 +74,6 @@ class ManipulationPanel(QGroupBox):
         return {
             "pitch_shift": self.spin_pitch.value(),
             "time_stretch": self.spin_time.value(),
-            "split_bands": self.chk_split_bands.isChecked()
+            "split_bands": self.chk_split_bands.isChecked(),
+            "band_crossovers": self.txt_crossovers.text()
         }
@@ -20,7 +20,7 @@ class OutputPanel(QGroupBox):
         fmt_layout.addWidget(QLabel("Format:"))
         self.combo_format = QComboBox()
         self.combo_format.setMinimumWidth(100)
-        self.combo_format.addItems(["WAV", "FLAC", "MP3", "OGG", "AIFF"])
+        self.combo_format.addItems(["WAV", "FLAC", "MP3", "OGG", "M4A", "AIFF"])
         self.combo_format.setCurrentText("MP3")
         self.combo_format.currentTextChanged.connect(self._toggle_format_options)
         fmt_layout.addWidget(self.combo_format)
@@ -38,7 +38,20 @@ class OutputPanel(QGroupBox):
         rate_layout.addStretch()
         layout.addLayout(rate_layout)
         
-        # Bit Depth row (hidden for MP3/OGG)
+        # Bitrate row (lossy formats only)
+        self.bitrate_container = QWidget()
+        bitrate_layout = QHBoxLayout(self.bitrate_container)
+        bitrate_layout.setContentsMargins(0, 0, 0, 0)
+        bitrate_layout.addWidget(QLabel("Bitrate:"))
+        self.combo_bitrate = QComboBox()
+        self.combo_bitrate.setMinimumWidth(100)
+        self.combo_bitrate.addItems(["128k", "192k", "256k", "320k"])
+        self.combo_bitrate.setCurrentText("320k")
+        bitrate_layout.addWidget(self.combo_bitrate)
+        bitrate_layout.addStretch()
+        layout.addWidget(self.bitrate_container)
+        
+        # Bit Depth row (hidden for MP3/OGG/M4A)
         self.depth_container = QWidget()
         depth_layout = QHBoxLayout(self.depth_container)
         depth_layout.setContentsMargins(0, 0, 0, 0)
@@ -50,6 +63,18 @@ class OutputPanel(QGroupBox):
         depth_layout.addStretch()
         layout.addWidget(self.depth_container)
         
+        # Extra formats written from the same stems (e.g. WAV masters + MP3 previews)
+        extra_layout = QHBoxLayout()
+        extra_layout.addWidget(QLabel("Also export:"))
+        self.extra_format_checks = {}
+        for fmt in ["WAV", "FLAC", "MP3", "OGG", "M4A", "AIFF"]:
+            chk = QCheckBox(fmt)
+            chk.setToolTip(f"Also write every stem as {fmt} (same sample rate, bit depth and bitrate)")
+            self.extra_format_checks[fmt] = chk
+            extra_layout.addWidget(chk)
+        extra_layout.addStretch()
+        layout.addLayout(extra_layout)
+        
         # Output checkboxes
         self.chk_zip = QCheckBox("Export as ZIP")
         self.chk_keep = QCheckBox("Keep Original")
@@ -58,6 +83,10 @@ class OutputPanel(QGroupBox):
         self.chk_auto_open.setChecked(True)
         
         layout.addWidget(self.chk_zip)
+        self.chk_container = QCheckBox("Single Multichannel File")
+        self.chk_container.setToolTip("Write all stems (and bands) of a track into one multichannel WAV/FLAC/AIFF "
+                                      "with a channel map instead of one file per stem")
+        layout.addWidget(self.chk_container)
         self.chk_midi = QCheckBox("Export as MIDI")
         layout.addWidget(self.chk_midi)
         layout.addWidget(self.chk_keep)
@@ -76,13 +105,14 @@ class OutputPanel(QGroupBox):
         self._toggle_format_options("MP3")
     
     def _toggle_format_options(self, format_text):
-        """Show/hide bit depth based on format."""
-        if format_text in ["MP3", "OGG"]:
-            self.depth_container.setEnabled(False)
-            self.depth_container.setVisible(False)
-        else:
-            self.depth_container.setEnabled(True)
-            self.depth_container.setVisible(True)
+        """Show/hide bit depth and bitrate based on format."""
+        lossy = format_text in ["MP3", "OGG", "M4A"]
+        for fmt, chk in self.extra_format_checks.items():
+            chk.setEnabled(fmt != format_text)
+        self.depth_container.setEnabled(not lossy)
+        self.depth_container.setVisible(not lossy)
+        self.bitrate_container.setEnabled(lossy)
+        self.bitrate_container.setVisible(lossy)
     
     def get_values(self):
         """Returns dict of output settings."""
@@ -90,12 +120,20 @@ class OutputPanel(QGroupBox):
             "format": self.combo_format.currentText(),
             "sample_rate": int(self.combo_rate.currentText()),
             "bit_depth": self.combo_depth.currentText(),
+            "bitrate": self.combo_bitrate.currentText(),
+            "extra_formats": self.get_extra_formats(),
             "export_zip": self.chk_zip.isChecked(),
+            "output_layout": "container" if self.chk_container.isChecked() else "files",
             "export_midi": self.chk_midi.isChecked(),
             "keep_original": self.chk_keep.isChecked(),
             "include_bpm_key": self.chk_bpm_key_filename.isChecked()
         }
     
+    def get_extra_formats(self):
+        """Checked extra formats, without the main one."""
+        main = self.combo_format.currentText()
+        return [fmt for fmt, chk in self.extra_format_checks.items() if chk.isChecked() and fmt != main]
+    
     def is_auto_open_enabled(self):
         """Returns whether auto-open folder is enabled."""
         return self.chk_auto_open.isChecked()
@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QSlider, QLabel, 
     QStyle, QFrame, QScrollArea, QSizePolicy
 )
-from PyQt6.QtCore import Qt, QUrl, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, QUrl, QTimer, pyqtSignal, QBuffer, QByteArray, QIODevice
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from src.ui.style import COLORS
 from src.ui.waveform import WaveformSelectorWidget
@@ -245,6 +245,8 @@ class StemPlayerWidget(QWidget):
         """
         Load stems into the mixer.
         stem_dict: { 'vocab': path, 'drums': path ... }
+        A value may also be (container_path, stem_name) for a stem inside a
+        multichannel stem container; it is played from memory.
         """
         self.stop_playback()
         self.waveform.setVisible(False) # Hide input waveform
@@ -255,14 +257,26 @@ class StemPlayerWidget(QWidget):
 
         # Create a player for each stem
         first = True
-        for name, path in stem_dict.items():
+        containers = {}
+        for name, source in stem_dict.items():
+            path = source if isinstance(source, str) else source[0]
             if not os.path.exists(path):
                 continue
                 
             player = QMediaPlayer()
             output = QAudioOutput()
             player.setAudioOutput(output)
-            player.setSource(QUrl.fromLocalFile(path))
+            if isinstance(source, str):
+                player.setSource(QUrl.fromLocalFile(path))
+            else:
+                from src.core.container import StemContainer
+                if path not in containers:
+                    containers[path] = StemContainer(path)
+                buffer = QBuffer(player)
+                buffer.setData(QByteArray(containers[path].wav_bytes(source[1])))
+                buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+                player.setSourceDevice(buffer, QUrl(f"{source[1]}.wav"))
+                path = ""  # No single file to show a waveform for
             
             # Connect signals
             if first:
@@ -109,7 +109,7 @@ class SettingsDialog(QDialog):
         
         # Default Format
         self.combo_default_format = QComboBox()
-        self.combo_default_format.addItems(["MP3", "WAV", "FLAC", "OGG", "AIFF"])
+        self.combo_default_format.addItems(["MP3", "WAV", "FLAC", "OGG", "M4A", "AIFF"])
         self.combo_default_format.setToolTip("Default audio format for new operations.")
         output_layout.addRow("Default Format:", self.combo_default_format)
         
@@ -188,6 +188,31 @@ class SettingsDialog(QDialog):
         self.spin_batch_size.setToolTip("Default batch size for new sessions. Higher values use more VRAM but may be faster.")
         proc_layout.addRow("Default Batch Size:", self.spin_batch_size)
         
+        self.chk_scratch_tmpfs = QCheckBox("Keep temporary files in RAM (tmpfs)")
+        self.chk_scratch_tmpfs.setToolTip("Write intermediate stems to /dev/shm on Linux instead of the output folder. Needs enough free RAM.")
+        proc_layout.addRow("", self.chk_scratch_tmpfs)
+        
+        self.combo_analysis_tier = QComboBox()
+        self.combo_analysis_tier.addItem("Full (CQT, most accurate)", "full")
+        self.combo_analysis_tier.addItem("Fast (STFT key profiles)", "fast")
+        self.combo_analysis_tier.setToolTip("BPM/Key detection method for queued files. 'Fast' is several times quicker on CPU.")
+        proc_layout.addRow("BPM/Key Analysis:", self.combo_analysis_tier)
+        
+        self.chk_stem_analysis = QCheckBox("Refine BPM/Key from separated stems")
+        self.chk_stem_analysis.setToolTip("After separation, detect tempo from the drums and key from the harmonic stems. Nearly free, usually more accurate.")
+        proc_layout.addRow("", self.chk_stem_analysis)
+        
+        self.chk_skip_silence = QCheckBox("Skip silent passages during separation")
+        self.chk_skip_silence.setToolTip("Stretches below -60 dBFS lasting 2 s or more are not sent through the models and become digital silence in the stems (quiet fades and reverb tails included). Faster on podcasts and live recordings.")
+        proc_layout.addRow("", self.chk_skip_silence)
+        
+        self.combo_resample_quality = QComboBox()
+        self.combo_resample_quality.addItem("Fast", "fast")
+        self.combo_resample_quality.addItem("Balanced", "balanced")
+        self.combo_resample_quality.addItem("High Quality", "hq")
+        self.combo_resample_quality.setToolTip("Filter used when exporting at a different sample rate (e.g. 44.1 kHz -> 48 kHz). High Quality has the steepest anti-aliasing filter.")
+        proc_layout.addRow("Resampling:", self.combo_resample_quality)
+        
         proc_group.setLayout(proc_layout)
         layout.addWidget(proc_group)
         
@@ -406,6 +431,13 @@ class SettingsDialog(QDialog):
         self.spin_threads.setValue(self.settings.value("performance/threads", 0, type=int))
         self.spin_memory.setValue(self.settings.value("performance/memory", 0, type=int))
         self.spin_batch_size.setValue(self.settings.value("performance/batch_size", 1, type=int))
+        self.chk_scratch_tmpfs.setChecked(self.settings.value("performance/scratch_tmpfs", False, type=bool))
+        tier_idx = self.combo_analysis_tier.findData(self.settings.value("performance/analysis_tier", "full"))
+        self.combo_analysis_tier.setCurrentIndex(max(tier_idx, 0))
+        self.chk_stem_analysis.setChecked(self.settings.value("performance/stem_analysis", True, type=bool))
+        self.chk_skip_silence.setChecked(self.settings.value("performance/skip_silence", False, type=bool))
+        quality_idx = self.combo_resample_quality.findData(self.settings.value("performance/resample_quality", "balanced"))
+        self.combo_resample_quality.setCurrentIndex(max(quality_idx, 0))
         
         self.txt_models_folder.setText(self.settings.value("models/folder", ""))
         self.chk_auto_download.setChecked(self.settings.value("models/auto_download", True, type=bool))
@@ -424,6 +456,11 @@ class SettingsDialog(QDialog):
         self.settings.setValue("performance/threads", self.spin_threads.value())
         self.settings.setValue("performance/memory", self.spin_memory.value())
         self.settings.setValue("performance/batch_size", self.spin_batch_size.value())
+        self.settings.setValue("performance/scratch_tmpfs", self.chk_scratch_tmpfs.isChecked())
+        self.settings.setValue("performance/analysis_tier", self.combo_analysis_tier.currentData())
+        self.settings.setValue("performance/stem_analysis", self.chk_stem_analysis.isChecked())
+        self.settings.setValue("performance/skip_silence", self.chk_skip_silence.isChecked())
+        self.settings.setValue("performance/resample_quality", self.combo_resample_quality.currentData())
         
         self.settings.setValue("models/folder", self.txt_models_folder.text())
         self.settings.setValue("models/auto_download", self.chk_auto_download.isChecked())
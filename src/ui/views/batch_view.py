@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
-    QPushButton, QGroupBox, QProgressBar, QFrame
+    QPushButton, QGroupBox, QProgressBar, QFrame, QCheckBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from src.ui.style import COLORS
@@ -46,6 +46,12 @@ class BatchView(QWidget):
         btn_layout.addStretch()
         input_layout.addLayout(btn_layout)
         
+        self.chk_dedup = QCheckBox("Separate duplicate recordings only once")
+        self.chk_dedup.setToolTip("Files with identical audio (different names or tags) are processed once; "
+                                  "the results are linked into each duplicate's Stems folder")
+        self.chk_dedup.setChecked(True)
+        input_layout.addWidget(self.chk_dedup)
+        
         input_group.setLayout(input_layout)
         layout.addWidget(input_group)
         
@@ -102,10 +108,10 @@ class BatchView(QWidget):
         else:
             self.lbl_status.setText(f"{count} folder(s) queued")
     
-    files_ready = pyqtSignal(list)
+    scan_requested = pyqtSignal(list, bool)  # folders, dedup
 
     def _start_batch(self):
-        """Start batch processing."""
+        """Start batch processing: folders are scanned in the background."""
         if self.folder_list.count() == 0:
             from PyQt6.QtWidgets import QMessageBox
             QMessageBox.information(self, "No Folders", "Add at least one folder to process.")
@@ -114,26 +120,13 @@ class BatchView(QWidget):
         folders = []
         for i in range(self.folder_list.count()):
             folders.append(self.folder_list.item(i).text())
-            
-        files = self._scan_folders(folders)
         
-        if not files:
-            from PyQt6.QtWidgets import QMessageBox
-            QMessageBox.information(self, "No files found", "No supported audio files found in selected folders.")
-            return
-
-        self.files_ready.emit(files)
-        
-    def _scan_folders(self, folders):
-        """Scan folders for audio files."""
-        import os
-        audio_exts = {'.mp3', '.wav', '.flac', '.m4a', '.ogg', '.aiff', '.wma'}
-        found_files = []
-        
-        for folder in folders:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if os.path.splitext(file)[1].lower() in audio_exts:
-                        found_files.append(os.path.join(root, file))
-                        
-        return found_files
+        self.lbl_status.setText(f"Scanning {len(folders)} folder(s)...")
+        self.scan_requested.emit(folders, self.chk_dedup.isChecked())
+    
+    def set_scan_progress(self, queued, skipped, duplicates, done=False):
+        """Show how far the background scan got."""
+        if done:
+            self.lbl_status.setText(f"Scan complete: {queued} queued, {skipped} already done, {duplicates} duplicates")
+        else:
+            self.lbl_status.setText(f"Scanning: {queued} queued, {duplicates} duplicates so far")
@@ -11,7 +11,7 @@ from src.ui.style import COLORS
 
 class WaveformLoader(QThread):
     """Background thread to load audio data for visualization."""
-    loaded = pyqtSignal(np.ndarray, float) # peaks, duration_sec
+    loaded = pyqtSignal(np.ndarray, float, object) # peaks, duration_sec, beat grid (or None)
 
     def __init__(self, file_path, width_pixels=1000):
         super().__init__()
@@ -97,11 +97,15 @@ class WaveformLoader(QThread):
             else:
                 peaks = np.array([])
 
-            self.loaded.emit(peaks, duration)
+            # Stored beat grid (sidecar) for downbeat markers and snapping
+            from src.core.beatgrid import load_beat_grid
+            grid = load_beat_grid(self.file_path)
+
+            self.loaded.emit(peaks, duration, grid)
             
         except Exception as e:
             print(f"Waveform Load Error ({self.file_path}): {e}")
-            self.loaded.emit(np.array([]), 0)
+            self.loaded.emit(np.array([]), 0, None)
 
 class WaveformSelectorWidget(QWidget):
     """
@@ -117,6 +121,7 @@ class WaveformSelectorWidget(QWidget):
         self.file_path = None
         self.peaks = np.array([])
         self.duration = 0
+        self.beat_grid = None
         
         # Selection state
         self.selection_start = 0.0 # Seconds
@@ -139,6 +144,8 @@ class WaveformSelectorWidget(QWidget):
         
         self.col_border = QColor(COLORS['accent'])
         
+        self.col_downbeat = QColor(255, 255, 255, 40)
+        
     def resizeEvent(self, event):
         self.loading_label.resize(self.size())
         super().resizeEvent(event)
@@ -148,6 +155,7 @@ class WaveformSelectorWidget(QWidget):
         self.file_path = None
         self.peaks = np.array([])
         self.duration = 0
+        self.beat_grid = None
         self.loading_label.hide()
         self.update()
 
@@ -158,6 +166,7 @@ class WaveformSelectorWidget(QWidget):
         self.file_path = file_path
         self.peaks = np.array([])
         self.duration = 0
+        self.beat_grid = None
         self.loading_label.show()
         self.update()
         
@@ -170,9 +179,10 @@ class WaveformSelectorWidget(QWidget):
         self.loader.loaded.connect(self._on_loaded)
         self.loader.start()
         
-    def _on_loaded(self, peaks, duration):
+    def _on_loaded(self, peaks, duration, grid):
         self.peaks = peaks
         self.duration = duration
+        self.beat_grid = grid
         self.loading_label.hide()
         
         # Default selection: Middle 30s or start 30s?
@@ -185,6 +195,13 @@ class WaveformSelectorWidget(QWidget):
             self.selection_duration = 30.0 # Default
             self.selection_start = (self.duration - 30) / 2 # Center it
             
+            # Prefer the first drop when the track has a beat grid
+            if self.beat_grid:
+                from src.core.beatgrid import find_section
+                drop = find_section(self.beat_grid, "drop")
+                if drop is not None:
+                    self.selection_start = min(drop["start"], self.duration - self.selection_duration)
+            
         self.selection_changed.emit(self.selection_start, self.selection_start + self.selection_duration)
         self.update()
         
@@ -223,6 +240,17 @@ class WaveformSelectorWidget(QWidget):
                 bar_h = val * h * 0.9
                 y = (h - bar_h) / 2
                 painter.drawRect(QRectF(x, y, max(1, bar_w), bar_h))
+        
+        # Downbeat markers and section labels from the beat grid
+        if self.beat_grid and self.duration > 0:
+            from src.core.beatgrid import downbeats
+            scale = w / self.duration
+            painter.setPen(QPen(self.col_downbeat, 1))
+            for t in downbeats(self.beat_grid):
+                painter.drawLine(int(t * scale), 0, int(t * scale), h)
+            painter.setPen(QColor(COLORS['text_dim']))
+            for section in self.beat_grid.get("sections", []):
+                painter.drawText(int(section["start"] * scale) + 3, h - 4, section["label"])
                 
         # Draw Selection Overlay
         if self.duration > 0:
@@ -279,6 +307,9 @@ class WaveformSelectorWidget(QWidget):
         # Let's center the 60s window on the click for ease use
         
         new_start = time_point - (self.selection_duration / 2)
+        if self.beat_grid:
+            from src.core.beatgrid import snap_to_downbeat
+            new_start = snap_to_downbeat(self.beat_grid, new_start)
         
         # Clamp
         if new_start < 0: new_start = 0
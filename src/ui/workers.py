@@ -1,4 +1,4 @@
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QThread, QObject, pyqtSignal
 from src.core.midi_converter import MidiConverter
 from src.utils.logger import logger
 import os
@@ -30,19 +30,87 @@ class MidiExportWorker(QThread):
         self.all_completed.emit()
 
 
-class AnalysisWorker(QThread):
-    """Background worker for BPM and key detection."""
+class AnalysisPool(QObject):
+    """Qt front-end for BatchAnalysisService: one process pool for all BPM/key analysis."""
     finished = pyqtSignal(str, dict)  # file_path, analysis_result
+    submitted = pyqtSignal(int, int)  # cache hits, files submitted
     
-    def __init__(self, file_path):
-        super().__init__()
-        self.file_path = file_path
+    def __init__(self, duration=30.0, tier='full', parent=None):
+        super().__init__(parent)
+        from concurrent.futures import ThreadPoolExecutor
+        from src.core.analysis_service import BatchAnalysisService
+        # Pool callbacks run off the GUI thread; emitting queues them to the receiver's thread
+        self.service = BatchAnalysisService(self.finished.emit, duration=duration, tier=tier)
+        # Cache lookups stat and hash files: keep them off the GUI thread. One thread,
+        # so submit/cancel calls reach the service in the order they were made.
+        self._lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-lookup")
+    
+    def set_tier(self, tier):
+        """Tier used for subsequent submissions ('full' or 'fast')."""
+        self.service.tier = tier
+    
+    def submit(self, file_paths):
+        """Queue files in the background; cache hits are emitted as `finished`, then `submitted`."""
+        self._lookups.submit(self._submit, list(file_paths), self.service.tier)
+    
+    def _submit(self, file_paths, tier):
+        self.service.tier = tier
+        try:
+            cached = self.service.submit(file_paths)
+        except Exception as e:
+            logger.error(f"Analysis submit failed: {e}")
+            return
+        for path, result in cached.items():
+            self.finished.emit(path, result)
+        self.submitted.emit(len(cached), len(file_paths))
+    
+    def cancel(self, file_path):
+        self._lookups.submit(self.service.cancel, file_path)
+    
+    def cancel_all(self):
+        self._lookups.submit(self.service.cancel_all)
+    
+    def shutdown(self):
+        self._lookups.shutdown(wait=False, cancel_futures=True)
+        self.service.shutdown()
+
+
+class FolderScanWorker(QThread):
+    """
+    Walks batch folders in the background and streams new files out in
+    batches: files already done with the current settings (completed-job
+    index) are skipped, and duplicate recordings are split off.
+    """
+    files_found = pyqtSignal(list)        # new files to queue
+    duplicates_found = pyqtSignal(dict)   # {duplicate: kept file}
+    finished = pyqtSignal(int, int, int)  # queued, skipped (already done), duplicates
+    
+    def __init__(self, folders, fingerprint, dedup=True, parent=None):
+        super().__init__(parent)
+        self.folders = folders
+        self.fingerprint = fingerprint
+        self.dedup = dedup
     
     def run(self):
+        from src.core.scanner import scan_batches
+        from src.core.job_index import get_job_index
+        from src.core.dedup import DuplicateTracker
+        index = get_job_index()
+        is_done = (lambda entries: index.completed(entries, self.fingerprint)) if index else None
+        tracker = DuplicateTracker() if self.dedup else None
+        queued = skipped = duplicate_count = 0
         try:
-            from src.core.analysis import analyze_audio
-            result = analyze_audio(self.file_path, duration=30.0)  # 30s for speed
-            self.finished.emit(self.file_path, result)
+            for paths, done in scan_batches(self.folders, is_done, self.isInterruptionRequested):
+                skipped += done
+                duplicates = tracker.add(paths) if tracker is not None and paths else {}
+                paths = [p for p in paths if p not in duplicates]
+                # Kept files first: their (journaled) jobs must exist before duplicates attach to them
+                if paths:
+                    self.files_found.emit(paths)
+                    queued += len(paths)
+                if duplicates:
+                    self.duplicates_found.emit(duplicates)
+                    duplicate_count += len(duplicates)
         except Exception as e:
-            logger.error(f"Analysis failed for {self.file_path}: {e}")
-            self.finished.emit(self.file_path, {'success': False, 'error': str(e)})
+            logger.error(f"Folder scan failed: {e}")
+        self.finished.emit(queued, skipped, duplicate_count)
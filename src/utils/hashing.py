@@ -0,0 +1,24 @@
+import os
+import hashlib
+
+# Bytes sampled from the head and tail of a file for the quick content hash
+SAMPLE_BYTES = 1024 * 1024
+
+
+def quick_content_hash(path, sample_bytes=SAMPLE_BYTES):
+    """
+    Cheap content hash of a file: blake2b over its size plus the first and
+    last `sample_bytes`. Stable across renames/moves and touch (mtime) changes,
+    without reading the whole file.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(sample_bytes))
+        if size > 2 * sample_bytes:
+            f.seek(-sample_bytes, os.SEEK_END)
+            h.update(f.read(sample_bytes))
+        elif size > sample_bytes:
+            h.update(f.read())
+    return h.hexdigest()
@@ -1,6 +1,7 @@
 import logging
 import sys
 import os
+import multiprocessing
 
 def setup_logger():
     logger = logging.getLogger("BeatDeStack")
@@ -23,7 +24,9 @@ def setup_logger():
             log_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         
         log_file = os.path.join(log_dir, "beatdestack_debug.log")
-        fh = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+        # Pool child processes append instead of truncating the parent's log
+        mode = 'a' if multiprocessing.parent_process() is not None else 'w'
+        fh = logging.FileHandler(log_file, mode=mode, encoding='utf-8')
         fh.setLevel(logging.DEBUG)
         fh.setFormatter(formatter)
         logger.addHandler(fh)
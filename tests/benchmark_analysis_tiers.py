@@ -0,0 +1,42 @@
+import os
+import sys
+import glob
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+from src.core.analysis import compare_analysis_tiers
+
+AUDIO_EXTS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python tests/benchmark_analysis_tiers.py <audio files or folder> [duration]")
+        sys.exit(1)
+
+    target = sys.argv[1]
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+    if os.path.isdir(target):
+        files = sorted(f for f in glob.glob(os.path.join(target, "*")) if f.lower().endswith(AUDIO_EXTS))
+    else:
+        files = [target]
+
+    report = compare_analysis_tiers(files, duration=duration)
+    print(f"{'File':40} {'Full':>22} {'Fast':>22}  BPM  Key")
+    for f in report['files']:
+        full, fast = f['full'], f['fast']
+        print(f"{os.path.basename(f['path'])[:40]:40} "
+              f"{str(full.get('bpm')):>6} {str(full.get('key')):>7} {f['full_seconds']:6.2f}s "
+              f"{str(fast.get('bpm')):>6} {str(fast.get('key')):>7} {f['fast_seconds']:6.2f}s  "
+              f"{'ok' if f['bpm_match'] else '--':>3}  {'ok' if f['key_match'] else ('rel' if f['key_related'] else '--')}")
+
+    s = report['summary']
+    print(f"\nCompared {s['compared']}/{s['files']} files")
+    print(f"BPM agreement: {s['bpm_agreement']:.0%} (octave errors allowed)")
+    print(f"Key agreement: {s['key_agreement']:.0%} exact, {s['key_related_agreement']:.0%} incl. relative major/minor")
+    print(f"Time: full {s['full_seconds']:.2f}s, fast {s['fast_seconds']:.2f}s ({s['speedup']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
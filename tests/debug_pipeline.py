@@ -52,8 +52,11 @@ def test_initialization():
     print("\n--- Testing Initialization ---")
     try:
         from src.core.advanced_audio import AdvancedAudioProcessor
-        processor = AdvancedAudioProcessor("test_output")
-        print("AdvancedAudioProcessor initialized successfully")
+        from src.core.workspace import JobWorkspace
+        # Scratch is removed on exit, even if the processor fails to initialize
+        with JobWorkspace("test_output", "debug") as workspace:
+            AdvancedAudioProcessor("test_output", workspace=workspace)
+            print("AdvancedAudioProcessor initialized successfully")
     except Exception as e:
         print(f"Failed to initialize AdvancedAudioProcessor: {e}")
         import traceback
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import shutil
+import numpy as np
+import soundfile as sf
+
+# Ensure src is in pythonpath
+sys.path.append(os.getcwd())
+
+import src.core.analysis_cache as analysis_cache
+from src.core.analysis_cache import AnalysisCache
+
+RESULT = {'success': True, 'bpm': 120.0, 'key': 'A min', 'key_confidence': 0.2}
+
+
+def _make_cache(tmp_path):
+    audio = str(tmp_path / "track.wav")
+    sf.write(audio, np.random.default_rng(0).standard_normal((44100, 2)) * 0.1, 44100)
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite3"))
+    cache.put(audio, RESULT, "full:30")
+    return cache, audio
+
+
+def test_batch_lookup_hits_and_misses(tmp_path):
+    cache, audio = _make_cache(tmp_path)
+    hits = cache.get_many([audio, str(tmp_path / "missing.wav")], "full:30")
+    assert list(hits.values()) == [RESULT]
+    assert cache.get(audio, "fast:30") is None
+
+
+def test_lookup_survives_rename_and_touch(tmp_path):
+    cache, audio = _make_cache(tmp_path)
+    moved = str(tmp_path / "renamed.wav")
+    shutil.move(audio, moved)
+    assert cache.get(moved, "full:30") == RESULT
+    later = time.time() + 60
+    os.utime(moved, (later, later))
+    assert cache.get(moved, "full:30") == RESULT
+
+
+def test_failed_results_are_not_stored(tmp_path):
+    cache, audio = _make_cache(tmp_path)
+    cache.put(audio, {'success': False, 'error': 'boom'}, "other")
+    assert cache.get(audio, "other") is None
+
+
+def test_relative_path_hits(tmp_path, monkeypatch):
+    cache, audio = _make_cache(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    assert cache.get("track.wav", "full:30") == RESULT
+
+
+def test_unknown_files_hashed_once_and_only_on_size_match(tmp_path, monkeypatch):
+    cache, audio = _make_cache(tmp_path)
+    copy = str(tmp_path / "copy.wav")
+    shutil.copy(audio, copy)
+    other = str(tmp_path / "other.wav")
+    sf.write(other, np.zeros((1000, 2)), 44100)
+    # Same size as `copy`, different content
+    remix = str(tmp_path / "remix.wav")
+    sf.write(remix, np.random.default_rng(1).standard_normal((44100, 2)) * 0.1, 44100)
+    cache.put(remix, RESULT, "stems")
+
+    hashed = []
+    real_hash = analysis_cache.quick_content_hash
+    monkeypatch.setattr(analysis_cache, "quick_content_hash", lambda p: hashed.append(p) or real_hash(p))
+    hashes = {}
+    assert cache.get_many([copy, other], "stems", hashes) == {}
+    assert cache.get_many([copy, other], "full:30", hashes) == {copy: RESULT}
+    # `other` has no entry of its size; `copy` is hashed once across both lookups
+    assert hashed == [copy]
@@ -0,0 +1,72 @@
+import os
+import sys
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.core.analysis import (
+    KEY_NAMES, _MAJOR_PROFILE, _MINOR_PROFILE, _fast_key, _fast_tempo,
+    _bpm_agrees, analyze_audio, compare_analysis_tiers,
+)
+
+
+def _click_track(bpm, seconds=20, sr=22050, root=9):
+    """Kick on every beat over a sustained minor triad on `root`."""
+    t = np.arange(int(seconds * sr)) / sr
+    y = np.zeros_like(t)
+    for interval in (0, 3, 7):
+        f = 220.0 * 2 ** ((root - 9 + interval) / 12)
+        y += 0.1 * sum(0.5 ** h * np.sin(2 * np.pi * f * (h + 1) * t) for h in range(4))
+    n = int(0.08 * sr)
+    kick = np.sin(2 * np.pi * 60 * t[:n]) * np.exp(-t[:n] * 40)
+    for b in np.arange(0, seconds, 60.0 / bpm):
+        s = int(b * sr)
+        y[s:s + n] += 0.8 * kick[:len(y) - s]
+    return (y / np.abs(y).max() * 0.8).astype(np.float32)
+
+
+def test_fast_tempo_on_pulse_train():
+    frame_rate = 43.07
+    frames = np.arange(1300)
+    for bpm in (90, 126, 150):
+        period = frame_rate * 60.0 / bpm
+        phase = (frames / period) % 1.0
+        env = np.exp(-0.5 * (np.minimum(phase, 1 - phase) * period / 1.5) ** 2)
+        assert abs(_fast_tempo(env, frame_rate) - bpm) < 1.5
+
+
+def test_fast_key_matches_every_profile_rotation():
+    for k in range(12):
+        assert _fast_key(np.roll(_MAJOR_PROFILE, k))[0] == f"{KEY_NAMES[k]} maj"
+        assert _fast_key(np.roll(_MINOR_PROFILE, k))[0] == f"{KEY_NAMES[k]} min"
+
+
+def test_fast_tier_file(tmp_path):
+    path = str(tmp_path / "loop.wav")
+    sf.write(path, _click_track(124, root=2), 22050)
+    result = analyze_audio(path, duration=20, tier='fast')
+    assert result['success'] and result['tier'] == 'fast'
+    assert _bpm_agrees(result['bpm'], 124, tolerance=0.02)
+    assert result['key'] == "D min"
+
+
+def test_compare_report(tmp_path):
+    path = str(tmp_path / "loop.wav")
+    sf.write(path, _click_track(100), 22050)
+    report = compare_analysis_tiers([path], duration=10)
+    assert report['summary']['compared'] == 1
+    assert report['files'][0]['full_seconds'] > 0 and report['files'][0]['fast_seconds'] > 0
+    assert analyze_audio(path, tier='bogus')['success'] is False
+
+
+def test_fast_pool_workers_skip_full_tier_warm_up(monkeypatch):
+    import librosa
+    from src.core import analysis_service
+    calls = []
+    monkeypatch.setattr(librosa.beat, "beat_track", lambda **kw: calls.append("beat_track"))
+    monkeypatch.setattr(librosa.feature, "chroma_cqt", lambda **kw: calls.append("chroma_cqt"))
+    analysis_service._init_worker('fast')
+    assert calls == []
+    analysis_service._init_worker('full')
+    assert calls == ["beat_track", "chroma_cqt"]
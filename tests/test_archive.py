@@ -0,0 +1,66 @@
+import os
+import sys
+import zipfile
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.core.archive import StreamingArchive
+
+
+def _touch(path, data=b"\0" * 4096):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_streamed_files_plus_sweep(tmp_path):
+    out = tmp_path / "song"
+    _touch(str(out / "vocals.wav"))
+    _touch(str(out / "drums.mp3"))
+    archive = StreamingArchive(str(tmp_path / "song.zip"), str(out))
+    archive.add(str(out / "vocals.wav"), "vocals_120bpm.wav")
+    archive.add(str(out / "drums.mp3"))
+    archive.flush()
+    # The splitter renames outputs to their suffixed names after flushing
+    os.replace(str(out / "vocals.wav"), str(out / "vocals_120bpm.wav"))
+    # Written after the streamed files; picked up on close
+    _touch(str(out / "stems" / "manifest.json"), b"{}")
+    _touch(str(out / ".bds_scratch" / "tmp.wav"))
+    archive.close()
+
+    assert not os.path.exists(str(tmp_path / "song.zip.part"))
+    with zipfile.ZipFile(str(tmp_path / "song.zip")) as zf:
+        info = {i.filename: i.compress_type for i in zf.infolist()}
+    assert info == {
+        "vocals_120bpm.wav": zipfile.ZIP_DEFLATED,
+        "drums.mp3": zipfile.ZIP_STORED,
+        "stems/manifest.json": zipfile.ZIP_DEFLATED,
+    }
+
+
+def test_discard_removes_partial_archive(tmp_path):
+    _touch(str(tmp_path / "out" / "a.wav"))
+    archive = StreamingArchive(str(tmp_path / "out.zip"), str(tmp_path / "out"))
+    archive.add(str(tmp_path / "out" / "a.wav"))
+    archive.discard()
+    assert os.listdir(str(tmp_path)) == ["out"]
+
+
+def test_writer_error_fails_flush_instead_of_hanging(tmp_path):
+    out = tmp_path / "out"
+    _touch(str(out / "a.wav"))
+    _touch(str(out / "b.wav"))
+    archive = StreamingArchive(str(tmp_path / "out.zip"), str(out))
+
+    def broken_write(*args, **kwargs):
+        raise ValueError("write() requires mode 'w'")
+
+    archive._zip.write = broken_write
+    archive.add(str(out / "a.wav"))
+    archive.add(str(out / "b.wav"))
+    with pytest.raises(RuntimeError):
+        archive.flush()
+    with pytest.raises(RuntimeError):
+        archive.close()
+    assert os.listdir(str(tmp_path)) == ["out"]
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.core.beatgrid import (
+    GRID_SR, compute_beat_grid, downbeats, find_section, snap_to_downbeat,
+    save_beat_grid, load_beat_grid, save_folder_beat_grid, stretch_beat_grid,
+)
+from src.core.preview import create_preview_slice
+
+BPM = 120.0
+BEAT = 60.0 / BPM
+
+
+def _arrangement(sr=GRID_SR):
+    """8 bars intro (pad), 16 bars drop (kick+pad, accented on beat 1), 8 bars outro (pad).
+    Music starts one beat late so the downbeat phase is not trivially 0."""
+    bars = [("intro", 8), ("drop", 16), ("outro", 8)]
+    total_beats = 1 + 4 * sum(n for _, n in bars)
+    y = np.zeros(int(total_beats * BEAT * sr), dtype=np.float32)
+    t = np.arange(len(y)) / sr
+    y += 0.02 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+
+    n = int(0.1 * sr)
+    kt = np.arange(n) / sr
+    kick = (np.sin(2 * np.pi * 55 * kt) * np.exp(-kt * 30)).astype(np.float32)
+    hat = (np.random.default_rng(0).standard_normal(n) * np.exp(-kt * 80)).astype(np.float32)
+    beat = 1
+    for name, count in bars:
+        for b in range(4 * count):
+            s = int((beat + b) * BEAT * sr)
+            if name == "drop":
+                y[s:s + n] += (0.9 if b % 4 == 0 else 0.4) * kick
+            else:
+                y[s:s + n] += 0.03 * hat  # quiet ticks keep the beat tracker on the grid
+        beat += 4 * count
+    return y
+
+
+def test_grid_downbeats_and_sections():
+    y = _arrangement()
+    grid = compute_beat_grid(y, GRID_SR)
+    assert abs(grid["bpm"] - BPM) < 2
+    # Downbeats fall on the accented beats (bar starts at 1 + 4k beats)
+    bar_pos = [((d / BEAT) - 1) % 4 for d in downbeats(grid)]
+    assert np.median([min(p, 4 - p) for p in bar_pos]) < 0.25
+    labels = [s["label"] for s in grid["sections"]]
+    assert labels[0] == "intro" and "drop" in labels and labels[-1] == "outro"
+    drop = find_section(grid, "drop")
+    assert abs(drop["start"] - (1 + 32) * BEAT) < 4 * BEAT
+
+
+def test_sidecar_roundtrip_and_preview(tmp_path):
+    path = str(tmp_path / "track.wav")
+    sf.write(path, _arrangement(), GRID_SR)
+    grid = compute_beat_grid(_arrangement(), GRID_SR)
+    sidecar = save_beat_grid(path, grid)
+    assert sidecar == path + ".beatgrid.json"
+    assert json.load(open(sidecar))["beats"] == grid["beats"]
+    assert load_beat_grid(path)["bpm"] == grid["bpm"]
+
+    # Preview starts on the drop and is snapped to a downbeat
+    out = str(tmp_path / "slice.wav")
+    assert create_preview_slice(path, out, duration=8.0)
+    start = sf.read(out)[0]
+    assert len(start) == int(8.0 * GRID_SR)
+    assert snap_to_downbeat(grid, 30.0) in downbeats(grid)
+
+    # A changed file invalidates its sidecar; a stems folder grid is shared
+    sf.write(path, _arrangement()[::-1].copy(), GRID_SR)
+    assert load_beat_grid(path) is None
+    stems = tmp_path / "stems"
+    stems.mkdir()
+    save_folder_beat_grid(str(stems), stretch_beat_grid(grid, 2.0))
+    assert load_beat_grid(str(stems / "drums.wav"))["bpm"] == round(grid["bpm"] * 2, 2)
@@ -0,0 +1,42 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.core.container import write_container, StemContainer, is_container
+
+
+def _stems(n=3, length=4410):
+    rng = np.random.default_rng(0)
+    return [(f"stem{i}", (0.5 * rng.uniform(-1, 1, (length, 2))).astype(np.float32)) for i in range(n)]
+
+
+@pytest.mark.parametrize("ext,subtype,mapped", [
+    ("wav", "FLOAT", True), ("wav", "PCM_16", True), ("wav", "PCM_24", False), ("flac", "PCM_24", False),
+])
+def test_roundtrip_by_name(tmp_path, ext, subtype, mapped):
+    stems = _stems()
+    path, channel_map = write_container(str(tmp_path / f"song_stems.{ext}"), stems, 44100, subtype)
+    assert is_container(path)
+    assert [e["start"] for e in channel_map["stems"]] == [0, 2, 4]
+
+    container = StemContainer(path)
+    assert container.names == ["stem0", "stem1", "stem2"]
+    assert isinstance(container._all_samples(), np.memmap) == mapped
+    tol = {"FLOAT": 0, "PCM_16": 1 / 32768, "PCM_24": 1 / 2 ** 23}[subtype]
+    for name, data in stems:
+        np.testing.assert_allclose(container.stem(name), data, atol=tol)
+
+
+def test_flac_falls_back_to_caf_above_eight_channels(tmp_path):
+    path, _ = write_container(str(tmp_path / "song_stems.flac"), _stems(5), 44100, "PCM_24")
+    assert path.endswith(".caf")
+    assert StemContainer(path).channels == 10
+
+
+def test_plain_file_is_not_a_container(tmp_path):
+    import soundfile as sf
+    sf.write(str(tmp_path / "vocals.wav"), np.zeros((100, 2), np.float32), 44100)
+    assert not is_container(str(tmp_path / "vocals.wav"))
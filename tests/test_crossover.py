@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.core.crossover import Crossover, parse_crossovers
+
+
+def _response(signal):
+    return np.abs(np.fft.rfft(signal))
+
+
+def test_bands_sum_flat():
+    for crossovers in ([300, 4000], [120, 1000, 5000], [2000]):
+        crossover = Crossover(44100, crossovers)
+        impulse = np.zeros((1, 1 << 15), dtype=np.float32)
+        impulse[0, 0] = 1.0
+        bands = crossover.split(impulse)
+        assert len(bands) == len(crossovers) + 1
+        total = _response(sum(bands)[0])
+        assert np.allclose(total, 1.0, atol=1e-4)
+
+
+def test_band_separation():
+    sr = 44100
+    crossover = Crossover(sr, [300, 4000])
+    assert crossover.names == ["Low", "Mid", "High"]
+    t = np.arange(sr) / sr
+    tone = np.sin(2 * np.pi * 1000 * t).astype(np.float32)[None, :]
+    low, mid, high = crossover.split(tone)
+    rms = lambda x: np.sqrt(np.mean(x[:, sr // 2:] ** 2))
+    assert rms(mid) > 0.6
+    assert rms(low) < 0.05 and rms(high) < 0.05
+
+
+def test_batch_matches_single_stem():
+    rng = np.random.default_rng(0)
+    stems = [rng.standard_normal((2, 20000)).astype(np.float32) for _ in range(3)]
+    crossover = Crossover(44100, parse_crossovers("250; 2500, 8000"))
+    batched = crossover.split_batch(stems)
+    assert len(batched) == 3 and len(batched[0]) == 4
+    for stem, bands in zip(stems, batched):
+        for a, b in zip(crossover.split(stem), bands):
+            assert np.allclose(a, b, atol=1e-6)
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.core.dedup import find_duplicates, unique_inputs, replicate_outputs, DuplicateTracker
+
+
+def _write(path, audio, **kw):
+    sf.write(str(path), audio, 44100, **kw)
+    return str(path)
+
+
+def test_same_audio_in_other_containers_is_a_duplicate(tmp_path):
+    rng = np.random.default_rng(0)
+    # Integer samples: the same PCM stored in each container
+    a = rng.integers(-10000, 10000, (44100, 2), dtype=np.int16)
+    b = rng.integers(-10000, 10000, (44100, 2), dtype=np.int16)
+    first = _write(tmp_path / "song.wav", a, subtype="PCM_16")
+    flac = _write(tmp_path / "song (copy).flac", a, subtype="PCM_16")
+    tagged = _write(tmp_path / "other name.wav", a, subtype="PCM_16")
+    other = _write(tmp_path / "other.wav", b, subtype="PCM_16")
+    shorter = _write(tmp_path / "short.wav", a[:1000], subtype="PCM_16")
+
+    files = [first, other, flac, shorter, tagged]
+    duplicates = find_duplicates(files, workers=2)
+    assert duplicates == {first: [flac, tagged]}
+    assert unique_inputs(files, duplicates) == [first, other, shorter]
+
+
+def test_replicate_links_outputs_with_duplicate_track_name(tmp_path):
+    src_dir = tmp_path / "song - Stems"
+    src_dir.mkdir()
+    (src_dir / "song_vocals.wav").write_bytes(b"v")
+    (src_dir / "drums.wav").write_bytes(b"d")
+    (src_dir / "manifest.json").write_text(json.dumps({"input": "song.wav", "outputs": {"song_vocals.wav": {}}}))
+
+    dst_dir = tmp_path / "copy - Stems"
+    placed = replicate_outputs(str(src_dir), str(dst_dir), str(tmp_path / "song.wav"), str(tmp_path / "copy.flac"))
+    assert placed == 3
+    assert sorted(os.listdir(dst_dir)) == ["copy_vocals.wav", "drums.wav", "manifest.json"]
+    assert os.path.samefile(src_dir / "drums.wav", dst_dir / "drums.wav")
+    manifest = json.loads((dst_dir / "manifest.json").read_text())
+    assert list(manifest["outputs"]) == ["copy_vocals.wav"]
+    assert manifest["duplicate_of"].endswith("song.wav")
+
+
+def test_tracker_finds_duplicates_across_batches(tmp_path):
+    a = np.arange(2000, dtype=np.int16).reshape(1000, 2)
+    first = _write(tmp_path / "one.wav", a)
+    other = _write(tmp_path / "two.wav", a[::-1])
+    copy = _write(tmp_path / "three.flac", a)
+
+    tracker = DuplicateTracker(workers=2)
+    assert tracker.add([first]) == {}
+    assert tracker.add([other]) == {}
+    assert tracker.add([copy]) == {copy: first}
@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+
+# Ensure src is in pythonpath
+sys.path.append(os.getcwd())
+
+from src.core import dsp
+
+SR = 44100
+
+
+def _gated_tone(seconds=4.0, noise=0.01):
+    t = np.arange(int(SR * seconds)) / SR
+    clean = (np.sin(2 * np.pi * 0.5 * t) > 0) * np.sin(2 * np.pi * 440 * t) * 0.5
+    noisy = clean + np.random.default_rng(0).standard_normal(len(t)) * noise
+    return clean, noisy
+
+
+def test_spectral_gate_open_gate_is_transparent():
+    # A negative threshold opens the gate on every bin -> perfect reconstruction
+    x = np.random.default_rng(1).standard_normal((50000, 2)).astype(np.float32) * 0.1
+    y = dsp.spectral_gate(x, SR, threshold_factor=-0.1)
+    assert y.shape == x.shape
+    assert y.dtype == np.float32
+    assert np.max(np.abs(y - x)) < 1e-5
+
+
+def test_spectral_gate_reduces_noise_multichannel():
+    clean, noisy = _gated_tone()
+    stereo = np.stack([noisy, noisy], axis=1)
+    y = dsp.spectral_gate(stereo, SR, threshold_factor=0.5)
+    assert np.std(y[:, 0] - clean) < 0.5 * np.std(noisy - clean)
+    assert np.allclose(y[:, 0], y[:, 1])
+
+
+def test_spectral_gate_short_input():
+    x = np.random.default_rng(2).standard_normal(300)
+    y = dsp.spectral_gate(x, SR, threshold_factor=-0.1)
+    assert np.allclose(x, y)
+
+
+def _level_step(seconds=3.0):
+    t = np.arange(int(SR * seconds)) / SR
+    tone = np.sin(2 * np.pi * 200 * t) * np.where(t < seconds / 2, 0.1, 0.9)
+    return np.stack([tone, tone * 0.5], axis=1).astype(np.float32)
+
+
+def test_compressor_streaming_matches_single_pass():
+    x = _level_step()
+    whole = dsp.Compressor(SR).process(x)
+    blocks = dsp.Compressor(SR).process_array(x, block_size=4096)
+    assert np.allclose(whole, blocks)
+
+
+def test_compressor_reduces_dynamic_range():
+    x = _level_step()
+    y = dsp.apply_compressor(x, SR, intensity=60)
+    half = len(x) // 2
+    in_ratio = np.abs(x[half:]).max() / np.abs(x[:half]).max()
+    out_ratio = np.abs(y[half:]).max() / np.abs(y[:half]).max()
+    assert out_ratio < in_ratio
+    assert y.dtype == x.dtype
+
+
+def test_limiter_respects_ceiling():
+    x = _level_step() * 3
+    y = dsp.apply_limiter(x, SR, ceiling_db=-1.0)
+    assert np.abs(y).max() <= 10 ** (-1.0 / 20) + 1e-6
@@ -0,0 +1,48 @@
+import os
+import sys
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.core.encoder import pcm_command, encode_pcm, ffmpeg_available, is_pipe_format
+
+
+def test_pcm_command_streams_float_from_stdin():
+    cmd = pcm_command("/out/vocals.mp3", 48000, 2, "192k")
+    assert cmd[cmd.index("-f") + 1] == "f32le"
+    assert cmd[cmd.index("-i") + 1] == "pipe:0"
+    assert cmd[cmd.index("-ar") + 1] == "48000" and cmd[cmd.index("-ac") + 1] == "2"
+    assert cmd[cmd.index("-c:a") + 1] == "libmp3lame" and cmd[cmd.index("-b:a") + 1] == "192k"
+    assert pcm_command("/out/a.m4a", 44100, 1)[-3:] == ["-b:a", "256k", "/out/a.m4a"]
+    assert is_pipe_format("OGG") and not is_pipe_format("flac")
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_encode_without_temp_files(tmp_path):
+    sr = 44100
+    t = np.arange(sr) / sr
+    data = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)[:, None].repeat(2, axis=1)
+    out = str(tmp_path / "tone.ogg")
+    encode_pcm(data, sr, out, "128k")
+    assert os.listdir(tmp_path) == ["tone.ogg"]
+    decoded, decoded_sr = sf.read(out)
+    assert decoded_sr == sr and abs(len(decoded) - sr) < 2048
+
+
+def test_lossy_output_falls_back_to_libsndfile(tmp_path, monkeypatch):
+    import src.core.splitter as splitter
+    from src.core.encoder import EncoderError
+    from src.core.targets import OutputTarget
+
+    def broken_encoder(*args, **kwargs):
+        raise EncoderError("Unknown encoder 'libvorbis'")
+
+    monkeypatch.setattr(splitter, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(splitter, "encode_pcm", broken_encoder)
+    data = np.zeros((4410, 2), dtype=np.float32)
+    path, info = splitter._write_output(str(tmp_path / "vocals.ogg"), data, OutputTarget("OGG"))
+    assert info is None and sf.info(path).format == "OGG"
+    with pytest.raises(EncoderError):
+        splitter._write_output(str(tmp_path / "vocals.m4a"), data, OutputTarget("M4A"))
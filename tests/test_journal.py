@@ -0,0 +1,127 @@
+import os
+import sys
+import sqlite3
+
+sys.path.append(os.getcwd())
+
+from src.core import journal as journal_module
+from src.core.journal import (JobJournal, JournaledJob, RESUME_DIRNAME, STAGE_QUEUED, STAGE_SEPARATED,
+                              STATE_DONE, STATE_FAILED)
+
+
+def _write(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_interrupted_job_keeps_progress_until_settings_change(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    song, out = str(tmp_path / "song.wav"), str(tmp_path / "song - Stems")
+    options = {"stem_count": 4, "format": "WAV"}
+
+    key = journal.enqueue(song, out, options, source="headless")
+    journal.start(key)
+    journal.reach(key, STAGE_SEPARATED)
+    _write(os.path.join(out, RESUME_DIRNAME, "htdemucs", "song", "drums.wav"))
+
+    # Restart: the job is unfinished and requeued with its progress
+    assert [job["key"] for job in journal.unfinished(source="headless")] == [key]
+    assert journal.unfinished(source="gui") == []
+    assert journal.enqueue(song, out, options, source="headless") == key
+    assert journal.get(key)["stage"] == STAGE_SEPARATED
+
+    # Other settings: start over, the saved model outputs are stale
+    journal.enqueue(song, out, {**options, "format": "FLAC"}, source="headless")
+    assert journal.get(key)["stage"] == STAGE_QUEUED
+    assert not os.path.exists(os.path.join(out, RESUME_DIRNAME))
+
+    journal.fail(key, "boom")
+    assert journal.get(key)["state"] == STATE_FAILED and journal.unfinished() == []
+    journal.finish(key)
+    assert journal.get(key)["state"] == STATE_DONE
+    journal.remove([key])
+    assert journal.get(key) is None
+
+
+def test_resumed_job_reuses_separation_and_written_outputs(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    out = str(tmp_path / "out")
+    key = journal.enqueue(str(tmp_path / "song.wav"), out, {"stem_count": 2})
+
+    job = JournaledJob(journal, key, out)
+    assert job.separated_root(["htdemucs"], "song") is None
+    scratch = str(tmp_path / "scratch")
+    _write(os.path.join(scratch, "htdemucs", "song", "vocals.wav"))
+    root = job.save_separation(scratch, ["htdemucs"], "song")
+    assert os.path.exists(os.path.join(root, "htdemucs", "song", "vocals.wav"))
+
+    vocals = _write(os.path.join(out, "vocals.wav"), b"vocals")
+    # Container written as .caf instead of the .flac it was meant to be
+    container = _write(os.path.join(out, "song_stems.caf"), b"stems")
+    job.record_output(vocals, vocals, "vocals", {"format": "wav", "lufs": -14.0})
+    job.record_output(os.path.join(out, "song_stems.flac"), container, "stems", {"format": "caf"})
+
+    resumed = JournaledJob(journal, key, out)
+    assert resumed.separated_root(["htdemucs"], "song") == root
+    assert resumed.written(vocals)["entry"]["lufs"] == -14.0
+    assert resumed.written(os.path.join(out, "song_stems.flac"))["written"] == "song_stems.caf"
+    assert resumed.written(os.path.join(out, "other.wav")) is None
+
+    # Replaced since (e.g. by enhancement): written again
+    _write(vocals, b"enhanced vocals")
+    assert resumed.written(vocals) is None
+    resumed.clear_checkpoint()
+    assert not os.path.exists(root)
+
+
+def test_no_checkpoint_when_scratch_is_on_another_volume(tmp_path, monkeypatch):
+    journal = JobJournal(str(tmp_path / "journal.sqlite3"))
+    out = str(tmp_path / "out")
+    key = journal.enqueue(str(tmp_path / "song.wav"), out, {"stem_count": 2})
+    scratch = str(tmp_path / "shm")
+    stem = _write(os.path.join(scratch, "htdemucs", "song", "vocals.wav"))
+
+    # tmpfs scratch: copying the model outputs to the output volume would cancel its benefit
+    monkeypatch.setattr(journal_module, "_same_volume", lambda path, other: False)
+    job = JournaledJob(journal, key, out)
+    assert job.save_separation(scratch, ["htdemucs"], "song") is None
+    assert os.path.exists(stem) and not os.path.exists(job.checkpoint_dir)
+    assert journal.get(key)["stage"] == STAGE_QUEUED
+
+    monkeypatch.undo()
+    job.save_separation(scratch, ["htdemucs"], "song")
+    assert journal.get(key)["stage"] == STAGE_SEPARATED
+    # A failed job is retried from the models
+    journal.fail(key, "boom")
+    assert journal.get(key)["stage"] == STAGE_QUEUED
+
+
+def test_duplicates_survive_restart_and_settings_change(tmp_path):
+    db = str(tmp_path / "journal.sqlite3")
+    journal = JobJournal(db)
+    song, out = str(tmp_path / "song.wav"), str(tmp_path / "song - Stems")
+    key = journal.enqueue(song, out, {"format": "WAV"})
+    journal.set_duplicates(key, [str(tmp_path / "copy.flac")])
+
+    journal = JobJournal(db)
+    assert journal.unfinished()[0]["duplicates"] == [str(tmp_path / "copy.flac")]
+    journal.enqueue(song, out, {"format": "FLAC"})
+    assert journal.get(key)["duplicates"] == [str(tmp_path / "copy.flac")]
+
+
+def test_journal_without_duplicates_column_is_upgraded(tmp_path):
+    db = str(tmp_path / "journal.sqlite3")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE jobs (key TEXT PRIMARY KEY, input TEXT NOT NULL, output_dir TEXT NOT NULL, "
+                 "source TEXT NOT NULL, options TEXT NOT NULL, fingerprint TEXT NOT NULL, state TEXT NOT NULL, "
+                 "stage TEXT NOT NULL, outputs TEXT NOT NULL, error TEXT, created REAL NOT NULL, "
+                 "updated REAL NOT NULL)")
+    conn.execute("INSERT INTO jobs VALUES ('k', '/a.wav', '/a - Stems', 'gui', '{}', 'f', 'queued', 'queued', "
+                 "'{}', NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+    journal = JobJournal(db)
+    assert journal.get("k")["duplicates"] == []
+    assert journal.enqueue(str(tmp_path / "b.wav"), str(tmp_path / "b - Stems"), {})
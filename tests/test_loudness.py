@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.getcwd())
+
+from src.core.loudness import _k_weighting, measure_loudness, measure_file
+from src.core.manifest import JobManifest, load_manifest
+
+SR = 48000
+
+
+def test_k_weighting_matches_bs1770_table():
+    b, a = _k_weighting(48000)
+    b_ref = np.convolve([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -2.0, 1.0])
+    a_ref = np.convolve([1.0, -1.69065929318241, 0.73248077421585], [1.0, -1.99004745483398, 0.99007225036621])
+    assert np.allclose(b, b_ref, atol=1e-10) and np.allclose(a, a_ref, atol=1e-10)
+
+
+def test_reference_levels():
+    t = np.arange(SR * 20) / SR
+    # EBU Tech 3341 case 1: stereo 1 kHz sine at -23 dBFS reads -23 LUFS
+    amp = 10 ** (-23 / 20)
+    tone = np.stack([amp * np.sin(2 * np.pi * 1000 * t)] * 2, axis=1).astype(np.float32)
+    stats = measure_loudness(tone, SR)
+    assert abs(stats["integrated_lufs"] + 23.0) < 0.1
+    assert abs(stats["rms_dbfs"] + 26.02) < 0.05
+    assert stats["silence_fraction"] == 0.0
+
+    # Inter-sample peak of a quarter-rate sine sits 3 dB above its samples
+    x = (0.5 * np.sin(2 * np.pi * SR / 4 * t + np.pi / 4)).astype(np.float32)
+    stats = measure_loudness(x, SR)
+    assert abs(stats["sample_peak_dbfs"] + 9.03) < 0.05
+    assert abs(stats["true_peak_dbtp"] + 6.02) < 0.3
+
+
+def test_chunking_gating_and_silence():
+    rng = np.random.default_rng(0)
+    y = (0.1 * rng.standard_normal((SR * 8, 2))).astype(np.float32)
+    loud = measure_loudness(y[:SR * 4], SR)["integrated_lufs"]
+    y[SR * 4:] = 0.0  # Second half digital silence: gated out of LUFS, counted as silence
+    a = measure_loudness(y, SR, block_size=4000)
+    b = measure_loudness(y, SR, block_size=1 << 20)
+    assert a == b
+    assert abs(a["integrated_lufs"] - loud) < 0.3  # blocks straddling the edge pass the gate
+    assert abs(a["silence_fraction"] - 0.5) < 0.02
+    assert measure_loudness(np.zeros((SR, 2), np.float32), SR)["integrated_lufs"] is None
+
+
+def test_manifest(tmp_path):
+    path = tmp_path / "vocals.wav"
+    data = (0.1 * np.random.default_rng(1).standard_normal((SR, 2))).astype(np.float32)
+    sf.write(str(path), data, SR, subtype="FLOAT")
+
+    manifest = JobManifest(str(tmp_path), "song.mp3", {"format": "WAV", "callback": object()})
+    manifest.add_output(str(path), "vocals", **measure_loudness(data, SR))
+    manifest.add_output(str(tmp_path / "gone.wav"), "drums")
+    renamed = tmp_path / "vocals_120bpm_Amin.wav"
+    os.replace(path, renamed)
+    manifest.rename(str(path), str(renamed))
+    manifest.save()
+
+    saved = load_manifest(str(tmp_path))
+    assert list(saved["outputs"]) == ["vocals_120bpm_Amin.wav"]
+    assert saved["options"] == {"format": "WAV"}
+    entry = saved["outputs"]["vocals_120bpm_Amin.wav"]
+    from_file = measure_file(str(renamed))
+    assert entry["integrated_lufs"] == from_file["integrated_lufs"]
+    assert entry["sample_rate"] == SR
+    json.dumps(saved)
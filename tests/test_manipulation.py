@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+import torch
+
+sys.path.append(os.getcwd())
+
+from src.core.manipulation import StemManipulator, _transform_cache
+
+
+def _sine(freq, sr, seconds, channels=2):
+    t = torch.arange(int(sr * seconds)) / sr
+    return (0.5 * torch.sin(2 * np.pi * freq * t)).repeat(channels, 1)
+
+
+def _peak_freq(audio, sr):
+    spectrum = np.abs(np.fft.rfft(audio[0].numpy()))
+    return np.argmax(spectrum) * sr / len(audio[0])
+
+
+def test_pitch_and_tempo_in_one_pass():
+    sr = 22050
+    manip = StemManipulator(sr, semitones=12, speed=1.25)
+    out = manip.process([_sine(220, sr, 2.0), _sine(440, sr, 2.0, channels=1)])
+    assert [o.shape for o in out] == [(2, int(2 * sr / 1.25)), (1, int(2 * sr / 1.25))]
+    assert abs(_peak_freq(out[0], sr) - 440) < 5
+    assert abs(_peak_freq(out[1], sr) - 880) < 5
+
+
+def test_batch_matches_single_stems():
+    sr = 16000
+    rng = torch.Generator().manual_seed(0)
+    stems = [torch.randn(2, sr, generator=rng) * 0.1 for _ in range(3)]
+    manip = StemManipulator(sr, semitones=-3, speed=0.9)
+    batched = manip.process(stems)
+    for stem, out in zip(stems, batched):
+        assert torch.allclose(manip.process([stem])[0], out, atol=1e-5)
+    # Transforms are built once per parameter set
+    keys = [k for k in _transform_cache if k[0] == sr]
+    assert len(keys) == 1
+
+
+def test_inactive_is_passthrough():
+    stems = [torch.zeros(2, 100)]
+    assert StemManipulator(44100, 0, 1.005).process(stems) is stems
@@ -0,0 +1,81 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.core import scanner, job_index
+from src.core.scanner import iter_audio_files, scan_batches
+from src.core.job_index import CompletedJobIndex, settings_fingerprint
+from src.utils.hashing import quick_content_hash
+
+
+def _touch(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _library(root):
+    files = [
+        _touch(os.path.join(root, "b.mp3"), b"b"),
+        _touch(os.path.join(root, "a", "z.flac"), b"z"),
+        _touch(os.path.join(root, "a", "y.wav"), b"y"),
+    ]
+    _touch(os.path.join(root, "a", "notes.txt"))
+    _touch(os.path.join(root, "a", "y - Stems", "vocals.wav"))
+    _touch(os.path.join(root, ".bds_scratch", "tmp.wav"))
+    return files
+
+
+def test_scan_is_ordered_and_skips_output_folders(tmp_path):
+    _library(str(tmp_path))
+    paths = [os.path.relpath(p, str(tmp_path)) for p, _, _ in iter_audio_files([str(tmp_path)])]
+    # Files of a folder first, then its subfolders, each in name order
+    assert paths == ["b.mp3", os.path.join("a", "y.wav"), os.path.join("a", "z.flac")]
+
+
+def test_index_skips_completed_until_file_or_settings_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanner, "SCAN_BATCH_FILES", 2)
+    files = _library(str(tmp_path / "lib"))
+    index = CompletedJobIndex(str(tmp_path / "index.sqlite3"))
+    options = {"format": "WAV", "stem_count": 4, "output_dir": "/a"}
+    fp = settings_fingerprint(options)
+    assert fp == settings_fingerprint({**options, "output_dir": "/b", "scratch_tmpfs": True})
+    assert fp != settings_fingerprint({**options, "format": "MP3"})
+
+    out = tmp_path / "out"
+    out.mkdir()
+    index.record(files[0], fp, str(out))
+
+    def scan(fingerprint):
+        batches = list(scan_batches([str(tmp_path / "lib")], lambda e: index.completed(e, fingerprint)))
+        return [p for paths, _ in batches for p in paths], sum(done for _, done in batches)
+
+    new, skipped = scan(fp)
+    assert skipped == 1 and files[0] not in new and len(new) == 2
+    assert scan(settings_fingerprint({**options, "format": "MP3"}))[1] == 0
+
+    # Renamed with the same content: found by hash and re-keyed
+    moved = str(tmp_path / "lib" / "renamed.mp3")
+    os.replace(files[0], moved)
+    assert index.completed([(moved, 1, os.stat(moved).st_mtime_ns)], fp) == {moved}
+
+    # Copied into another folder: the original is still there, so the copy gets its own outputs
+    copy = _touch(str(tmp_path / "other" / "renamed.mp3"), b"b")
+    assert index.completed([(copy, 1, os.stat(copy).st_mtime_ns)], fp) == set()
+    assert index.completed([(moved, 1, os.stat(moved).st_mtime_ns)], fp) == {moved}
+
+    # Changed content: processed again
+    _touch(moved, b"yy")
+    st = os.stat(moved)
+    assert index.completed([(moved, st.st_size, st.st_mtime_ns)], fp) == set()
+
+    # Edited in place, same size and same head/tail: the changed mtime is enough
+    monkeypatch.setattr(job_index, "quick_content_hash", lambda p: quick_content_hash(p, sample_bytes=4))
+    _touch(moved, b"head" + b"a" * 8 + b"tail")
+    index.record(moved, fp, str(out))
+    _touch(moved, b"head" + b"b" * 8 + b"tail")
+    later = os.stat(moved).st_mtime_ns + 10 ** 9
+    os.utime(moved, ns=(later, later))
+    assert index.completed([(moved, 16, later)], fp) == set()
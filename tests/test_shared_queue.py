@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from src.core import shared_queue
+from src.core.shared_queue import LEASE_SECONDS, MAX_ATTEMPTS, SharedQueue, publish, staging_dir
+
+
+def _write(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_jobs_are_claimed_once_and_not_requeued_when_done(tmp_path):
+    song = _write(str(tmp_path / "in" / "song.wav"))
+    out = str(tmp_path / "out" / "song - Stems")
+    options = {"stem_count": 4}
+    a, b = SharedQueue(str(tmp_path / "queue"), "a"), SharedQueue(str(tmp_path / "queue"), "b")
+
+    assert a.submit([(song, out)], options) == 1
+    assert b.submit([(song, out)], options) == 0  # already queued
+
+    job, lease = a.claim()
+    assert job.input == song and job.data["attempts"] == 1
+    assert b.claim() is None  # leased by a
+
+    os.makedirs(out)
+    a.complete(job, lease)
+    assert a.counts() == {"queued": 0, "done": 1, "failed": 0}
+    assert b.submit([(song, out)], options) == 0  # done with these settings
+    assert b.submit([(song, out)], {"stem_count": 2}) == 1
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    song = _write(str(tmp_path / "song.wav"))
+    a, b = SharedQueue(str(tmp_path / "queue"), "a"), SharedQueue(str(tmp_path / "queue"), "b")
+    a.submit([(song, str(tmp_path / "out"))], {})
+    job, stale = a.claim()
+    stale._stop.set()  # node a stops beating
+
+    old = time.time() - LEASE_SECONDS - 10
+    os.utime(stale.path, (old, old))
+    job, lease = b.claim()
+    assert job.data["attempts"] == 2 and job.data["claimed_by"] == "b"
+    assert lease.held() and not stale.held()
+    lease.release()
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path, monkeypatch):
+    song = _write(str(tmp_path / "song.wav"))
+    node = SharedQueue(str(tmp_path / "queue"), "a")
+    node.submit([(song, str(tmp_path / "out"))], {})
+
+    job, lease = node.claim()
+    assert node.retry(job, lease, "NAS timeout")
+    # Back in the queue, but not before the retry delay
+    assert node.counts() == {"queued": 1, "done": 0, "failed": 0}
+    assert node.claim() is None
+
+    real_now, delay = node.server_now, shared_queue.RETRY_SECONDS
+    monkeypatch.setattr(node, "server_now", lambda: real_now() + delay + 1)
+    monkeypatch.setattr(shared_queue, "RETRY_SECONDS", 0.0)
+    for attempt in range(2, MAX_ATTEMPTS + 1):
+        job, lease = node.claim()
+        assert job.data["attempts"] == attempt and job.data["last_error"] == "NAS timeout"
+        # The last attempt's failure is final
+        assert node.retry(job, lease, "NAS timeout") == (attempt < MAX_ATTEMPTS)
+    assert node.counts() == {"queued": 0, "done": 0, "failed": 1}
+
+
+def test_publish_replaces_previous_outputs(tmp_path):
+    out = str(tmp_path / "song - Stems")
+    _write(os.path.join(out, "old.wav"))
+    staging = staging_dir(out, "a")
+    _write(os.path.join(staging, "vocals.wav"))
+    _write(f"{staging}.zip")
+
+    publish(staging, out)
+    assert os.listdir(out) == ["vocals.wav"]
+    assert os.path.exists(f"{out}.zip")
+    assert sorted(os.listdir(tmp_path)) == ["song - Stems", "song - Stems.zip"]
@@ -0,0 +1,56 @@
+import os
+import sys
+import numpy as np
+import torch
+
+sys.path.append(os.getcwd())
+
+from src.core.silence import SilenceMap, find_silent_spans
+
+
+def _gappy_track(sr):
+    """2 s tone, 5 s silence, 2 s tone, 1 s pause (too short to skip), 2 s tone, 4 s silence."""
+    rng = np.random.default_rng(0)
+    t = np.arange(2 * sr) / sr
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t))[:, None] * np.ones((1, 2))
+    quiet = lambda sec: (1e-5 * rng.standard_normal((int(sec * sr), 2)))
+    return np.concatenate([tone, quiet(5), tone, quiet(1), tone, quiet(4)]).astype(np.float32)
+
+
+def test_finds_only_long_silences():
+    sr = 8000
+    audio = _gappy_track(sr)
+    spans = find_silent_spans(audio, sr)
+    assert len(spans) == 2
+    (s1, e1), (s2, e2) = spans
+    assert abs(s1 / sr - 2.0) < 0.06 and abs(e1 / sr - 7.0) < 0.06
+    assert abs(s2 / sr - 12.0) < 0.06 and e2 == len(audio)
+
+
+def test_compact_expand_round_trip():
+    sr = 8000
+    audio = _gappy_track(sr)
+    silence_map = SilenceMap.scan(audio, sr)
+    assert silence_map.worth_skipping()
+    compact = silence_map.compact(audio)
+    assert len(compact) == silence_map.active_length < len(audio)
+
+    restored = silence_map.expand(torch.from_numpy(compact).t()).t().numpy()
+    assert restored.shape == audio.shape
+    # Audible parts come back untouched; skipped spans are zero
+    tone = slice(0, 2 * sr)
+    np.testing.assert_allclose(restored[tone], audio[tone])
+    np.testing.assert_allclose(restored[9 * sr:11 * sr], audio[9 * sr:11 * sr])
+    assert not restored[3 * sr:6 * sr].any()
+    assert np.abs(restored - audio).max() < 1e-4
+
+
+def test_expand_at_model_rate():
+    sr = 8000
+    audio = _gappy_track(sr)
+    silence_map = SilenceMap.scan(audio, sr)
+    stem = torch.ones((2, silence_map.at_rate(2 * sr).active_length))
+    out = silence_map.expand(stem, 2 * sr)
+    assert out.shape[1] == 2 * len(audio)
+    assert out[:, 2 * sr:4 * sr].sum() == 2 * sr * 2  # first tone, doubled rate
+    assert not out[:, 8 * sr:12 * sr].any()
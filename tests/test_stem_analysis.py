@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import torch
+
+sys.path.append(os.getcwd())
+
+from src.core.analysis import StemAnalysis, transpose_analysis, get_filename_suffix
+
+SR = 44100
+
+
+def _drums(bpm, seconds=15):
+    y = np.zeros(int(seconds * SR), dtype=np.float32)
+    n = int(0.08 * SR)
+    t = np.arange(n) / SR
+    kick = (np.sin(2 * np.pi * 60 * t) * np.exp(-t * 40)).astype(np.float32)
+    for b in np.arange(0, seconds, 60.0 / bpm):
+        s = int(b * SR)
+        y[s:s + n] += kick[:len(y) - s]
+    return torch.from_numpy(np.stack([y, y]))
+
+
+def _chord(root_hz, intervals, seconds=15):
+    t = np.arange(int(seconds * SR)) / SR
+    y = sum(0.2 * np.sin(2 * np.pi * root_hz * 2 ** (i / 12) * t) for i in intervals)
+    return torch.from_numpy(np.stack([y, y]).astype(np.float32))
+
+
+def test_tempo_from_drums_and_key_from_harmonic_stems():
+    analysis = StemAnalysis()
+    analysis.add("drums", _drums(128), SR)
+    analysis.add("bass", _chord(110.0, (0,)), SR)             # A
+    analysis.add("other", _chord(220.0, (0, 3, 7)), SR)       # A minor triad
+    analysis.add("vocals", _chord(311.1, (0, 4, 7)), SR)      # ignored
+    result = analysis.result()
+    assert result['success'] and result['tier'] == 'stems'
+    assert abs(result['bpm'] - 128) < 2
+    assert result['key'] == "A min"
+
+
+def test_two_stem_fallback_and_missing_stems():
+    analysis = StemAnalysis()
+    analysis.add("no_vocals", _drums(100) + _chord(261.6, (0, 4, 7)) + _chord(130.8, (0, 12)), SR)
+    result = analysis.result()
+    assert result['success'] and result['key'] == "C maj"
+    assert StemAnalysis().result()['success'] is False
+
+
+def test_transposed_suffix():
+    analysis = {'success': True, 'bpm': 120.0, 'key': 'A min'}
+    shifted = transpose_analysis(analysis, semitones=3, speed=1.1)
+    assert get_filename_suffix(shifted) == "_132bpm_Cmin"
+    assert transpose_analysis(analysis) == analysis
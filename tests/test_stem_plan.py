@@ -0,0 +1,52 @@
+import os
+import sys
+import torch
+
+sys.path.append(os.getcwd())
+
+from src.core import constants
+from src.core.stem_plan import plan_stems, derive_backing
+
+
+def test_single_stem_modes_use_two_stem_models():
+    plan = plan_stems(constants.MODE_DRUMS, 4)
+    assert plan.two_stems == "drums" and plan.other_method == "none"
+    assert plan.wants("drums") and not plan.wants("bass")
+    assert plan.backing_name == "no_drums"
+
+    vocals = plan_stems(constants.MODE_VOCALS, 2)
+    assert vocals.keep == ("vocals",) and vocals.backing_name is None
+    assert vocals.single_stem == "Vocals"
+
+    inst = plan_stems(constants.MODE_INSTRUMENTAL, 2)
+    assert inst.wants("no_vocals") and not inst.wants("vocals")
+
+    # Guitar only exists in 6-source models; in an ensemble the others run all sources
+    guitar = plan_stems(constants.MODE_GUITAR, 6, [constants.MODEL_HTDEMUCS_6S, constants.MODEL_HTDEMUCS])
+    assert guitar.keep == ("guitar",) and guitar.backing_name == "no_guitar"
+    assert guitar.demucs_two_stems(constants.MODEL_HTDEMUCS_6S) == "guitar"
+    assert guitar.demucs_two_stems(constants.MODEL_HTDEMUCS) is None
+
+
+def test_missing_source_falls_back_to_all_sources():
+    # No guitar stem in a 4-source model: write what it has instead of nothing
+    plan = plan_stems(constants.MODE_GUITAR, 4, [constants.MODEL_HTDEMUCS])
+    assert plan.demucs_two_stems(constants.MODEL_HTDEMUCS) is None
+    assert plan.keep is None and plan.backing_name is None
+    assert plan.wants("other") and plan.wants("drums")
+
+
+def test_standard_modes_keep_everything():
+    assert plan_stems(constants.MODE_STANDARD, 2).two_stems == "vocals"
+    four = plan_stems(constants.MODE_STANDARD, 4)
+    assert four.two_stems is None and four.wants("other") and four.backing_name is None
+
+
+def test_backing_is_mix_minus_stem():
+    mix = torch.randn(2, 1000)
+    stem = torch.randn(2, 990)
+    backing = derive_backing(mix, stem)
+    assert backing.shape == (2, 990)
+    assert torch.allclose(backing + stem, mix[:, :990], atol=1e-6)
+    # Mono mix against a stereo stem broadcasts
+    assert derive_backing(mix[:1], stem).shape == (2, 990)
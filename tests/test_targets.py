@@ -0,0 +1,35 @@
+import os
+import sys
+sys.path.append(os.getcwd())
+
+from src.core.targets import OutputTarget, targets_from_options, audio_subtype
+
+
+def test_default_target_from_main_options():
+    targets = targets_from_options({"format": "FLAC", "bit_depth": "24-bit", "sample_rate": 48000})
+    assert len(targets) == 1
+    t = targets[0]
+    assert (t.ext, t.sample_rate, t.subtype) == ("flac", 48000, "PCM_24")
+    assert t.stem_path("out", "song", "vocals") == os.path.join("out", "vocals.flac")
+
+
+def test_extra_formats_share_settings_and_pattern():
+    targets = targets_from_options({"format": "WAV", "extra_formats": ["MP3", "FLAC"],
+                                    "filename_pattern": "{track}/{stem}", "bitrate": "192k"})
+    assert [t.ext for t in targets] == ["wav", "mp3", "flac"]
+    assert targets[1].bitrate == "192k"
+    assert targets[2].stem_path("out", "song", "bass") == os.path.join("out", "song/bass.flac")
+
+
+def test_colliding_targets_get_own_folder():
+    targets = targets_from_options({"output_targets": [
+        {"format": "WAV", "sample_rate": 44100},
+        {"format": "WAV", "sample_rate": 96000, "bit_depth": "32-bit Float"},
+    ]})
+    assert targets[1].folder == "WAV_96000"
+    assert targets[1].plain_path("out", "no_drums") == os.path.join("out", "WAV_96000", "no_drums.wav")
+    assert audio_subtype("wav", "32-bit Float") == "FLOAT"
+
+
+def test_pattern_without_stem_placeholder():
+    assert OutputTarget(filename_pattern="{track}").filename_pattern == "{track}_{stem}"
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.append(os.getcwd())
+
+from src.core.watcher import HotFolderWatcher, INOTIFY_AVAILABLE
+from src.core.headless import HeadlessRunner, _root_of
+from src.core.presets import DEFAULT_PRESETS, preset_job_options
+from src.core import constants
+
+
+def _poll_until(watcher, seconds):
+    found = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        found += watcher.poll()
+    return found
+
+
+@pytest.mark.parametrize("use_inotify", [False, pytest.param(True, marks=pytest.mark.skipif(
+    not INOTIFY_AVAILABLE, reason="inotify not available"))])
+def test_files_are_handed_out_once_settled(tmp_path, use_inotify):
+    (tmp_path / "old.wav").write_bytes(b"a" * 10)
+    watcher = HotFolderWatcher([tmp_path], settle_seconds=0.3, poll_interval=0.05, use_inotify=use_inotify)
+    try:
+        # Still being written: grows on every poll, so it never settles
+        growing = tmp_path / "sub" / "copying.flac"
+        growing.parent.mkdir()
+        ready = []
+        for i in range(12):
+            with open(growing, "ab") as f:
+                f.write(b"x" * 100)
+            ready += watcher.poll()
+            time.sleep(0.05)
+        assert str(growing) not in ready
+        assert str(tmp_path / "old.wav") in ready
+
+        ready = _poll_until(watcher, 0.8)
+        assert ready == [str(growing)]
+
+        # Unchanged files aren't reported again, changed ones are
+        assert _poll_until(watcher, 0.5) == []
+        (tmp_path / "old.wav").write_bytes(b"b" * 20)
+        (tmp_path / "notes.txt").write_text("not audio")
+        assert _poll_until(watcher, 0.8) == [str(tmp_path / "old.wav")]
+    finally:
+        watcher.close()
+
+
+def test_headless_mirrors_input_tree(tmp_path):
+    inputs, outputs = str(tmp_path / "in"), str(tmp_path / "out")
+    runner = HeadlessRunner(preset_job_options(DEFAULT_PRESETS["Karaoke Master"]), outputs)
+    song = os.path.join(inputs, "client", "album", "song.mp3")
+
+    assert _root_of(song, [inputs, os.path.join(inputs, "client")]) == os.path.join(inputs, "client")
+    assert runner.output_dir_for(song, inputs) == os.path.join(outputs, "client", "album", "song - Stems")
+    # Without an output root, outputs go next to the input as in the GUI
+    assert HeadlessRunner({}).output_dir_for(song) == os.path.join(inputs, "client", "album", "song - Stems")
+
+
+def test_preset_job_options():
+    options = preset_job_options(DEFAULT_PRESETS["Vocal Extract"])
+    assert options["mode"] == constants.MODE_VOCALS
+    assert options["dereverb"] == 50 and options["denoise"] == 50
+    assert preset_job_options(DEFAULT_PRESETS["Full Stems (DJ)"])["dereverb"] == 0
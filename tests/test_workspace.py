@@ -0,0 +1,67 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.getcwd())
+
+import src.core.workspace as workspace
+from src.core.workspace import JobWorkspace, SCRATCH_DIRNAME, SCRATCH_ENV_VAR
+
+
+def _touch(path):
+    with open(path, "wb") as f:
+        f.write(b"x")
+    return path
+
+
+def test_jobs_get_unique_roots_removed_on_exit(tmp_path, monkeypatch):
+    monkeypatch.delenv(SCRATCH_ENV_VAR, raising=False)
+    out = str(tmp_path / "out")
+    a, b = JobWorkspace(out, "song"), JobWorkspace(out, "song")
+    assert a.root != b.root
+    assert os.path.dirname(a.root) == os.path.join(out, SCRATCH_DIRNAME)
+
+    root = a.root
+    a.cleanup()
+    assert not os.path.exists(root) and os.path.isdir(b.root)
+    b.cleanup()
+    # Last job out removes the shared parent
+    assert not os.path.exists(os.path.join(out, SCRATCH_DIRNAME))
+
+
+def test_tracked_artifacts_removed_even_on_exception(tmp_path, monkeypatch):
+    monkeypatch.delenv(SCRATCH_ENV_VAR, raising=False)
+    with pytest.raises(RuntimeError):
+        with JobWorkspace(str(tmp_path), "song") as ws:
+            root = ws.root
+            reserved = _touch(ws.path("nested/input.wav"))
+            tool_output = ws.track("model/drums.wav")[0]
+            os.makedirs(os.path.dirname(tool_output))
+            _touch(tool_output)
+            assert ws.artifacts == [reserved, tool_output]
+            raise RuntimeError("separation failed")
+    assert not os.path.exists(root)
+    assert os.listdir(tmp_path) == []
+
+
+def test_scratch_parent_selection(tmp_path, monkeypatch):
+    out = str(tmp_path / "out")
+    override = str(tmp_path / "ssd")
+    monkeypatch.setenv(SCRATCH_ENV_VAR, override)
+    with JobWorkspace(out, use_tmpfs=True) as ws:
+        # The environment override wins over tmpfs
+        assert os.path.dirname(ws.root) == override
+
+    monkeypatch.delenv(SCRATCH_ENV_VAR)
+    ram = str(tmp_path / "shm")
+    os.makedirs(ram)
+    monkeypatch.setattr(workspace, "_tmpfs_root", lambda: ram)
+    with JobWorkspace(out, use_tmpfs=True) as ws:
+        assert os.path.dirname(ws.root) == ram
+    with JobWorkspace(out) as ws:
+        assert os.path.dirname(ws.root) == os.path.join(out, SCRATCH_DIRNAME)
+
+    # Requested but unavailable: falls back to the output folder
+    monkeypatch.setattr(workspace, "_tmpfs_root", lambda: None)
+    with JobWorkspace(out, use_tmpfs=True) as ws:
+        assert os.path.dirname(ws.root) == os.path.join(out, SCRATCH_DIRNAME)